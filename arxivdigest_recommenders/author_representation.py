@@ -1,11 +1,63 @@
+import sys
 import numpy as np
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Optional, Iterable, AsyncIterable
 
 from arxivdigest_recommenders import config
 
 
+class VenueCounts:
+    """Folds the papers published by an author into the number of times the author has published at each venue."""
+
+    def __init__(
+        self, venues: List[str], venue_indexes: Optional[Dict[str, int]] = None
+    ):
+        """
+        :param venues: List of venues. Venues the author has published at that are not already in this list are
+        appended.
+        :param venue_indexes: Index of each venue in the list of venues. If provided, it is used instead of searching
+        the list and kept up to date with it.
+        """
+        self._venues = venues
+        self._venue_indexes = venue_indexes
+        self.counts: Dict[int, int] = {}
+
+    def add(self, paper: Dict[str, Any]) -> Optional[int]:
+        """Count a paper.
+
+        :param paper: Paper published by the author.
+        :return: Index of the venue of the paper, or None if the paper has no venue or its venue is blacklisted.
+        """
+        author_venue = paper["venue"]
+        if not author_venue or author_venue.lower() in config.VENUE_BLACKLIST:
+            return None
+        if self._venue_indexes is not None:
+            if author_venue not in self._venue_indexes:
+                self._venue_indexes[author_venue] = len(self._venues)
+                self._venues.append(author_venue)
+            venue_index = self._venue_indexes[author_venue]
+        else:
+            if author_venue not in self._venues:
+                self._venues.append(author_venue)
+            venue_index = self._venues.index(author_venue)
+        self.counts[venue_index] = self.counts.get(venue_index, 0) + 1
+        return venue_index
+
+    def representation(self) -> np.ndarray:
+        """Get the author vector representation of the counted papers.
+
+        :return: Author vector representation, which ends at the last venue the author has published at.
+        """
+        representation = np.zeros(max(self.counts) + 1 if self.counts else 0, dtype=int)
+        for venue_index, count in self.counts.items():
+            representation[venue_index] = count
+        return representation
+
+
 def venue_author_representation(
-    venues: List[str], published_papers: List[Dict[str, Any]]
+    venues: List[str],
+    published_papers: Iterable[Dict[str, Any]],
+    venue_indexes: Optional[Dict[str, int]] = None,
 ) -> np.ndarray:
     """Create an author vector representation based on the venues an author has published at.
 
@@ -14,16 +66,175 @@ def venue_author_representation(
 
     :param venues: List of venues. Venues the author has published at that are not already in this list are appended.
     :param published_papers: Papers published by the author.
+    :param venue_indexes: Index of each venue in the list of venues. If provided, it is used instead of searching the
+    list and kept up to date with it.
+    :return: Author vector representation.
+    """
+    counts = VenueCounts(venues, venue_indexes)
+    for paper in published_papers:
+        counts.add(paper)
+    return counts.representation()
+
+
+async def stream_venue_author_representation(
+    venues: List[str],
+    published_papers: AsyncIterable[Dict[str, Any]],
+    venue_indexes: Optional[Dict[str, int]] = None,
+) -> np.ndarray:
+    """Create an author vector representation from a stream of the papers an author has published, as they arrive.
+
+    See venue_author_representation.
+
+    :param venues: List of venues. Venues the author has published at that are not already in this list are appended.
+    :param published_papers: Papers published by the author.
+    :param venue_indexes: Index of each venue in the list of venues. If provided, it is used instead of searching the
+    list and kept up to date with it.
     :return: Author vector representation.
     """
-    author_venues = (paper["venue"] for paper in published_papers if paper["venue"])
-    num_author_venues = sum(int(paper["venue"] is not None) for paper in published_papers)
-    representation = np.zeros(len(venues) + num_author_venues, dtype=int)
-    for author_venue in author_venues:
-        if author_venue.lower() in config.VENUE_BLACKLIST:
-            continue
-        if author_venue not in venues:
-            venues.append(author_venue)
-        venue_index = venues.index(author_venue)
-        representation[venue_index] += 1
-    return np.trim_zeros(representation, "b")
+    counts = VenueCounts(venues, venue_indexes)
+    async for paper in published_papers:
+        counts.add(paper)
+    return counts.representation()
+
+
+class AuthorInterner:
+    """Maps S2 author IDs to compact integer IDs."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, s2_id: str) -> int:
+        """Get the integer ID of an author, assigning a new one if the author has not been seen before.
+
+        :param s2_id: S2 author ID.
+        :return: Integer author ID.
+        """
+        return self._ids.setdefault(s2_id, len(self._ids))
+
+    def get(self, s2_id: Optional[str]) -> Optional[int]:
+        """Get the integer ID of an author without assigning a new one.
+
+        :param s2_id: S2 author ID.
+        :return: Integer author ID, or None if the author has not been seen before.
+        """
+        return self._ids.get(s2_id)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __sizeof__(self):
+        return (
+            object.__sizeof__(self)
+            + sys.getsizeof(self._ids)
+            + sum(sys.getsizeof(s2_id) for s2_id in self._ids)
+        )
+
+
+class CitationProfile:
+    """Number of times an author has cited other authors.
+
+    Cited authors are stored as a sorted array of interned author IDs alongside an array of citation counts, which is
+    far more compact than a dictionary. Looking up authors that have not been cited does not modify the profile.
+    """
+
+    __slots__ = ("_interner", "author_ids", "counts")
+
+    def __init__(
+        self, interner: AuthorInterner, author_ids: np.ndarray, counts: np.ndarray
+    ):
+        """
+        :param interner: Interner used to assign the author IDs.
+        :param author_ids: Sorted interned IDs of the cited authors.
+        :param counts: Citation count of each cited author.
+        """
+        self._interner = interner
+        self.author_ids = author_ids
+        self.counts = counts
+
+    def __getitem__(self, s2_id: Optional[str]) -> int:
+        author_id = self._interner.get(s2_id)
+        if author_id is None:
+            return 0
+        i = np.searchsorted(self.author_ids, author_id)
+        if i < len(self.author_ids) and self.author_ids[i] == author_id:
+            return int(self.counts[i])
+        return 0
+
+    def __len__(self):
+        return len(self.author_ids)
+
+    def __sizeof__(self):
+        return (
+            object.__sizeof__(self)
+            + sys.getsizeof(self.author_ids)
+            + sys.getsizeof(self.counts)
+        )
+
+
+class CitationCounts:
+    """Folds the papers published by an author into the number of times the author has cited other authors."""
+
+    def __init__(self, interner: AuthorInterner):
+        """
+        :param interner: Author interner. Cited authors that have not been seen before are interned.
+        """
+        self._interner = interner
+        self.counts: Counter = Counter()
+
+    def add(self, paper: Dict[str, Any]):
+        """Count the citations of a paper.
+
+        :param paper: Paper published by the author.
+        """
+        self.counts.update(
+            self._interner.intern(author["authorId"])
+            for reference in paper["references"]
+            for author in reference["authors"]
+            if author["authorId"]
+        )
+
+    def profile(self) -> CitationProfile:
+        """Get the citation profile of the counted papers.
+
+        :return: Citation profile.
+        """
+        author_ids = np.fromiter(
+            self.counts.keys(), dtype=np.int32, count=len(self.counts)
+        )
+        counts = np.fromiter(
+            self.counts.values(), dtype=np.int32, count=len(self.counts)
+        )
+        order = np.argsort(author_ids)
+        return CitationProfile(self._interner, author_ids[order], counts[order])
+
+
+def citation_author_representation(
+    interner: AuthorInterner, published_papers: Iterable[Dict[str, Any]]
+) -> CitationProfile:
+    """Create an author representation based on the authors that the author has cited.
+
+    :param interner: Author interner. Cited authors that have not been seen before are interned.
+    :param published_papers: Papers published by the author.
+    :return: Citation profile.
+    """
+    counts = CitationCounts(interner)
+    for paper in published_papers:
+        counts.add(paper)
+    return counts.profile()
+
+
+async def stream_citation_author_representation(
+    interner: AuthorInterner, published_papers: AsyncIterable[Dict[str, Any]]
+) -> CitationProfile:
+    """Create an author representation from a stream of the papers an author has published, as they arrive.
+
+    See citation_author_representation.
+
+    :param interner: Author interner. Cited authors that have not been seen before are interned.
+    :param published_papers: Papers published by the author.
+    :return: Citation profile.
+    """
+    counts = CitationCounts(interner)
+    async for paper in published_papers:
+        counts.add(paper)
+    return counts.profile()
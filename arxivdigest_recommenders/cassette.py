@@ -0,0 +1,142 @@
+import atexit
+import gzip
+import json
+import os
+from typing import Any, Dict, Optional, Set
+
+from arxivdigest_recommenders import config
+
+
+class CassetteError(LookupError):
+    """Raised when a replayed request or call was not recorded."""
+
+    pass
+
+
+class Cassette:
+    """Archive of recorded Semantic Scholar responses and arXivDigest connector calls, stored as gzipped JSON lines.
+
+    In record mode, the first response to each request is appended to the archive. In replay mode, the archive is read
+    into memory and the recorded responses are served instead of contacting the APIs.
+    """
+
+    def __init__(self, path: str, mode: str):
+        """
+        :param path: Path of the archive.
+        :param mode: Either "record" or "replay".
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}.")
+        self.path = path
+        self.mode = mode
+        self._interactions: Dict[str, Dict[str, Any]] = {}
+        self._recorded: Set[str] = set()
+        self._file = None
+        if mode == "replay":
+            with gzip.open(path, "rt") as file:
+                for line in file:
+                    interaction = json.loads(line)
+                    self._interactions[interaction["key"]] = interaction
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def record(
+        self,
+        key: str,
+        response: Any = None,
+        status: Optional[int] = None,
+        message: Optional[str] = None,
+    ):
+        """Record the response to a request, unless a response has already been recorded for it.
+
+        :param key: Request key.
+        :param response: Response.
+        :param status: HTTP status code, if the request failed.
+        :param message: Error message, if the request failed.
+        """
+        if key in self._recorded:
+            return
+        if self._file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._file = gzip.open(self.path, "wt")
+            # The gzip trailer is only written when the file is closed.
+            atexit.register(self.close)
+        interaction = {"key": key}
+        if status is None:
+            interaction["response"] = response
+        else:
+            interaction.update({"status": status, "message": message})
+        self._file.write(json.dumps(interaction) + "\n")
+        self._recorded.add(key)
+
+    def replay(self, key: str) -> Dict[str, Any]:
+        """Get the recorded response to a request.
+
+        :param key: Request key.
+        :return: Interaction containing either the response, or the status code and message of a failed request.
+        """
+        if key not in self._interactions:
+            raise CassetteError(f"{key} was not recorded in {self.path}.")
+        return self._interactions[key]
+
+    def close(self):
+        """Finish writing the archive."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def connector(self, connector) -> "CassetteConnector":
+        """Wrap an arXivDigest connector so that its calls are recorded or replayed.
+
+        :param connector: arXivDigest connector.
+        :return: Wrapped connector.
+        """
+        return CassetteConnector(connector, self)
+
+
+class CassetteConnector:
+    """arXivDigest connector wrapper that records or replays calls. Submissions are passed through when recording, and
+    skipped when replaying."""
+
+    _submissions = {"send_article_recommendations"}
+
+    def __init__(self, connector, cassette: Cassette):
+        self._connector = connector
+        self._cassette = cassette
+
+    def __getattr__(self, name: str):
+        method = getattr(self._connector, name)
+
+        def call(*args):
+            if name in CassetteConnector._submissions:
+                return None if self._cassette.replaying else method(*args)
+            key = f"arxivdigest {name} {json.dumps(args)}"
+            if self._cassette.replaying:
+                return self._cassette.replay(key)["response"]
+            result = method(*args)
+            self._cassette.record(key, result)
+            return result
+
+        return call
+
+
+_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Get the cassette configured for this process.
+
+    :return: Cassette, or None if neither recording nor replaying.
+    """
+    global _cassette
+    if config.CASSETTE_MODE is None:
+        return None
+    if _cassette is None:
+        _cassette = Cassette(config.CASSETTE_PATH, config.CASSETTE_MODE)
+    return _cassette
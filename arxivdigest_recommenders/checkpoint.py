@@ -0,0 +1,90 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class Checkpoint:
+    """Progress of a recommend() run, stored in a JSON file so that an interrupted run can be resumed.
+
+    The checkpoint contains the candidate papers of the run, the offset of the current user batch, the users of the
+    batch that have been processed, and the recommendations that have been generated for the batch but not yet been
+    submitted.
+    """
+
+    def __init__(self, path: str, paper_ids: Sequence[str]):
+        """
+        :param path: Path of the checkpoint file.
+        :param paper_ids: arXiv IDs of candidate papers.
+        """
+        self.path = path
+        self.paper_ids = list(paper_ids)
+        self.user_offset = 0
+        self.processed_users: List[str] = []
+        self.pending: Dict[str, List[Dict[str, Any]]] = {}
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Checkpoint"]:
+        """Load a checkpoint.
+
+        :param path: Path of the checkpoint file.
+        :return: Checkpoint, or None if there is no checkpoint file.
+        """
+        if not os.path.isfile(path):
+            return None
+        with open(path) as file:
+            state = json.load(file)
+        checkpoint = cls(path, state["paper_ids"])
+        checkpoint.user_offset = state["user_offset"]
+        checkpoint.processed_users = state["processed_users"]
+        checkpoint.pending = state["pending"]
+        return checkpoint
+
+    def save(self):
+        """Write the checkpoint to disk.
+
+        The checkpoint is written to a temporary file that replaces the checkpoint file, so that a crash while
+        writing does not corrupt the existing checkpoint.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(
+                {
+                    "paper_ids": self.paper_ids,
+                    "user_offset": self.user_offset,
+                    "processed_users": self.processed_users,
+                    "pending": self.pending,
+                },
+                file,
+                # Scores can be NumPy scalars.
+                default=lambda o: o.item(),
+            )
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def user_processed(self, user_id: str, recommendations: List[Dict[str, Any]]):
+        """Record that recommendations have been generated for a user of the current batch.
+
+        :param user_id: User ID.
+        :param recommendations: Recommendations for the user.
+        """
+        self.processed_users.append(user_id)
+        if recommendations:
+            self.pending[user_id] = recommendations
+        self.save()
+
+    def batch_submitted(self, batch_size: int):
+        """Record that the recommendations for the current batch have been submitted.
+
+        :param batch_size: Number of users in the batch.
+        """
+        self.user_offset += batch_size
+        self.processed_users = []
+        self.pending = {}
+        self.save()
+
+    def delete(self):
+        """Delete the checkpoint file."""
+        if os.path.isfile(self.path):
+            os.remove(self.path)
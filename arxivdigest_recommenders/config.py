@@ -1,6 +1,12 @@
+"""Settings of the recommenders, read from the first config file found at one of the file locations.
+
+The config file is only read when a setting is first accessed (see __getattr__ below), so that importing the package
+does not read it. Settings can be overridden by assigning them, either before or after the file is read.
+"""
+
 import os
 import json
-from typing import List
+from typing import Any, Dict, List
 
 
 file_locations = [
@@ -21,52 +27,149 @@ def get_config_from_file(file_paths: List[str]):
     return {}
 
 
-config_file = get_config_from_file(file_locations)
+def _settings() -> Dict[str, Any]:
+    config_file = get_config_from_file(file_locations)
+    LOG_LEVEL = config_file.get("log_level", "INFO").upper()
+    ARXIVDIGEST_BASE_URL = config_file.get(
+        "arxivdigest_base_url", "https://api.arxivdigest.org/"
+    )
+    MONGODB_CONFIG = config_file.get("mongodb", {})
+    MONGODB_HOST = MONGODB_CONFIG.get("host", "127.0.0.1")
+    MONGODB_PORT = MONGODB_CONFIG.get("port", 27017)
+    REDIS_CONFIG = config_file.get("redis", {})
+    REDIS_HOST = REDIS_CONFIG.get("host", "127.0.0.1")
+    REDIS_PORT = REDIS_CONFIG.get("port", 6379)
+    ELASTICSEARCH_HOST = config_file.get(
+        "elasticsearch", {"host": "127.0.0.1", "port": 9200}
+    )
+    S2_CONFIG = config_file.get("semantic_scholar", {})
+    S2_API_KEY = S2_CONFIG.get("api_key")
+    S2_BASE_URL = S2_CONFIG.get("base_url")
+    S2_MAX_CONCURRENT_REQUESTS = S2_CONFIG.get("max_concurrent_requests", 100)
+    S2_MAX_REQUESTS = S2_CONFIG.get("max_requests", 100)
+    S2_WINDOW_SIZE = S2_CONFIG.get("window_size", 300)
+    S2_CACHE_RESPONSES = S2_CONFIG.get("cache_responses", True)
+    S2_CACHE_BACKEND = S2_CONFIG.get("cache_backend", "redis").lower()
+    S2_MONGODB_DB = S2_CONFIG.get("mongodb_db", "s2cache")
+    S2_MONGODB_COLLECTION = S2_CONFIG.get("mongodb_collection", "s2cache")
+    S2_SQLITE_PATH = S2_CONFIG.get(
+        "sqlite_path", os.path.expanduser("~") + "/arxivdigest-recommenders/s2cache.db"
+    )
+    S2_SQLITE_MMAP_SIZE = S2_CONFIG.get("sqlite_mmap_size", 1024) * 2 ** 20
+    S2_SQLITE_BUSY_TIMEOUT = S2_CONFIG.get("sqlite_busy_timeout", 30)
+    S2_SQLITE_SWEEP_INTERVAL = S2_CONFIG.get("sqlite_sweep_interval", 3600)
+    S2_BATCH_REQUESTS = S2_CONFIG.get("batch_requests", False)
+    S2_BATCH_BASE_URL = S2_CONFIG.get("batch_base_url")
+    S2_BATCH_WINDOW = S2_CONFIG.get("batch_window", 0.05)
+    S2_BATCH_RETRIES = S2_CONFIG.get("batch_retries", 2)
+    S2_BATCH_RETRY_DELAY = S2_CONFIG.get("batch_retry_delay", 5)
+    S2_PAPER_BATCH_SIZE = S2_CONFIG.get("paper_batch_size", 500)
+    S2_AUTHOR_BATCH_SIZE = S2_CONFIG.get("author_batch_size", 1000)
+    S2_PAPER_FIELDS = S2_CONFIG.get(
+        "paper_fields",
+        "paperId,externalIds,title,abstract,venue,year,fieldsOfStudy,influentialCitationCount,authors,"
+        "references.paperId,references.authors",
+    )
+    S2_AUTHOR_FIELDS = S2_CONFIG.get(
+        "author_fields", "authorId,name,papers.paperId,papers.year"
+    )
+    S2_AUTHOR_PAPERS_CONCURRENCY = S2_CONFIG.get("author_papers_concurrency", 50)
+    S2_SINGLE_FLIGHT = S2_CONFIG.get("single_flight", False)
+    S2_SINGLE_FLIGHT_LEASE = S2_CONFIG.get("single_flight_lease", 60)
+    S2_SINGLE_FLIGHT_TIMEOUT = S2_CONFIG.get("single_flight_timeout", 30)
+    S2_SINGLE_FLIGHT_POLL_INTERVAL = S2_CONFIG.get("single_flight_poll_interval", 0.2)
+    S2_PAPER_EXPIRATION = S2_CONFIG.get("paper_cache_expiration", 30)
+    S2_AUTHOR_EXPIRATION = S2_CONFIG.get("author_cache_expiration", 7)
+    S2_EXPIRATION_JITTER = S2_CONFIG.get("cache_expiration_jitter", 0.25)
+    S2_STALE_GRACE_PERIOD = S2_CONFIG.get("stale_grace_period", 0)
+    MAX_PAPER_AGE = config_file.get("max_paper_age", 5)
+    MAX_EXPLANATION_VENUES = config_file.get("max_explanation_venues", 3)
+    USER_TIME_BUDGET = config_file.get("user_time_budget")
+    MAX_CACHE_SIZE = config_file.get("max_cache_size", 256) * 2 ** 20
+    CHECKPOINT_DIR = config_file.get("checkpoint_dir")
+    VENUE_BLACKLIST = [
+        venue.lower() for venue in config_file.get("venue_blacklist", ["arxiv"])
+    ]
+    FREQUENT_VENUES_API_KEY = config_file.get("frequent_venues_recommender", {}).get(
+        "arxivdigest_api_key", ""
+    )
+    VENUE_COPUB_CONFIG = config_file.get("venue_copub_recommender", {})
+    VENUE_COPUB_API_KEY = VENUE_COPUB_CONFIG.get("arxivdigest_api_key", "")
+    WEIGHTED_INF_CONFIG = config_file.get("weighted_inf_recommender", {})
+    WEIGHTED_INF_API_KEY = WEIGHTED_INF_CONFIG.get("arxivdigest_api_key", "")
+    WEIGHTED_INF_MIN_INFLUENCE = WEIGHTED_INF_CONFIG.get("min_influence", 20)
+    PREV_CITED_API_KEY = config_file.get("prev_cited_recommender", {}).get(
+        "arxivdigest_api_key", ""
+    )
+    PREV_CITED_COLLAB_API_KEY = config_file.get(
+        "prev_cited_collab_recommender", {}
+    ).get("arxivdigest_api_key", "")
+    PREV_CITED_TOPIC_CONFIG = config_file.get("prev_cited_topic_recommender", {})
+    PREV_CITED_TOPIC_API_KEY = PREV_CITED_TOPIC_CONFIG.get("arxivdigest_api_key", "")
+    PREV_CITED_TOPIC_INDEX = PREV_CITED_TOPIC_CONFIG.get("index", "arxivdigest_papers")
+    MAX_EXPLANATION_TOPICS = PREV_CITED_TOPIC_CONFIG.get("max_explanation_topics", 3)
+    PLANNER_CONFIG = config_file.get("planner", {})
+    PLANNER_ENABLED = PLANNER_CONFIG.get("enabled", False)
+    PLANNER_DEADLINE = PLANNER_CONFIG.get("deadline")
+    PLANNER_DEFAULT_PAPER_AUTHORS = PLANNER_CONFIG.get("default_paper_authors", 5)
+    PLANNER_DEFAULT_AUTHOR_PAPERS = PLANNER_CONFIG.get("default_author_papers", 20)
+    PREFETCH_CONFIG = config_file.get("prefetch", {})
+    PREFETCH_ENABLED = PREFETCH_CONFIG.get("enabled", False)
+    PREFETCH_API_KEY = PREFETCH_CONFIG.get("arxivdigest_api_key", "")
+    PREFETCH_CONCURRENCY = PREFETCH_CONFIG.get("concurrency", 200)
+    INCREMENTAL_CONFIG = config_file.get("incremental", {})
+    INCREMENTAL_ENABLED = INCREMENTAL_CONFIG.get("enabled", False)
+    INCREMENTAL_EXPIRATION = INCREMENTAL_CONFIG.get("expiration", 7)
+    WORK_QUEUE_CONFIG = config_file.get("work_queue", {})
+    WORK_QUEUE_NAME = WORK_QUEUE_CONFIG.get("name", "arxivdigest-recommenders")
+    WORK_QUEUE_VISIBILITY_TIMEOUT = WORK_QUEUE_CONFIG.get("visibility_timeout", 1800)
+    WORK_QUEUE_MAX_ATTEMPTS = WORK_QUEUE_CONFIG.get("max_attempts", 3)
+    WORK_QUEUE_POLL_INTERVAL = WORK_QUEUE_CONFIG.get("poll_interval", 5)
+    EXECUTOR_CONFIG = config_file.get("executor", {})
+    EXECUTOR_DECODE_THREADS = EXECUTOR_CONFIG.get("decode_threads", 0)
+    EXECUTOR_DECODE_MIN_SIZE = EXECUTOR_CONFIG.get("decode_min_size", 65536)
+    EXECUTOR_PROCESSES = EXECUTOR_CONFIG.get("processes", 0)
+    CASSETTE_CONFIG = config_file.get("cassette", {})
+    CASSETTE_MODE = CASSETTE_CONFIG.get("mode")
+    CASSETTE_PATH = CASSETTE_CONFIG.get(
+        "path", os.path.expanduser("~") + "/arxivdigest-recommenders/cassette.jsonl.gz"
+    )
+    CASSETTE_LATENCY = CASSETTE_CONFIG.get("latency", 0)
+    CASSETTE_RATE_LIMIT = CASSETTE_CONFIG.get("rate_limit", False)
+    METRICS_CONFIG = config_file.get("metrics", {})
+    METRICS_PATH = METRICS_CONFIG.get("path")
+    METRICS_FORMAT = METRICS_CONFIG.get("format")
+    PROFILING_CONFIG = config_file.get("profiling", {})
+    PROFILING_ENABLED = PROFILING_CONFIG.get("enabled", False)
+    PROFILING_DIR = PROFILING_CONFIG.get(
+        "dir", os.path.expanduser("~") + "/arxivdigest-recommenders/profiles"
+    )
+    PROFILING_SAMPLE_INTERVAL = PROFILING_CONFIG.get("sample_interval", 0.005)
+    PROFILING_LOOP_LAG_INTERVAL = PROFILING_CONFIG.get("loop_lag_interval", 0.05)
+    PROFILING_TRACEMALLOC_FRAMES = PROFILING_CONFIG.get("tracemalloc_frames", 1)
+    PROFILING_TOP = PROFILING_CONFIG.get("top", 10)
+    return {name: value for name, value in locals().items() if name.isupper()}
 
-LOG_LEVEL = config_file.get("log_level", "INFO").upper()
-ARXIVDIGEST_BASE_URL = config_file.get(
-    "arxivdigest_base_url", "https://api.arxivdigest.org/"
-)
-MONGODB_CONFIG = config_file.get("mongodb", {})
-MONGODB_HOST = MONGODB_CONFIG.get("host", "127.0.0.1")
-MONGODB_PORT = MONGODB_CONFIG.get("port", 27017)
-REDIS_CONFIG = config_file.get("redis", {})
-REDIS_HOST = REDIS_CONFIG.get("host", "127.0.0.1")
-REDIS_PORT = REDIS_CONFIG.get("port", 6379)
-ELASTICSEARCH_HOST = config_file.get(
-    "elasticsearch", {"host": "127.0.0.1", "port": 9200}
-)
-S2_CONFIG = config_file.get("semantic_scholar", {})
-S2_API_KEY = S2_CONFIG.get("api_key")
-S2_MAX_CONCURRENT_REQUESTS = S2_CONFIG.get("max_concurrent_requests", 100)
-S2_MAX_REQUESTS = S2_CONFIG.get("max_requests", 100)
-S2_WINDOW_SIZE = S2_CONFIG.get("window_size", 300)
-S2_CACHE_RESPONSES = S2_CONFIG.get("cache_responses", True)
-S2_CACHE_BACKEND = S2_CONFIG.get("cache_backend", "redis").lower()
-S2_MONGODB_DB = S2_CONFIG.get("mongodb_db", "s2cache")
-S2_MONGODB_COLLECTION = S2_CONFIG.get("mongodb_collection", "s2cache")
-S2_PAPER_EXPIRATION = S2_CONFIG.get("paper_cache_expiration", 30)
-S2_AUTHOR_EXPIRATION = S2_CONFIG.get("author_cache_expiration", 7)
-MAX_PAPER_AGE = config_file.get("max_paper_age", 5)
-MAX_EXPLANATION_VENUES = config_file.get("max_explanation_venues", 3)
-VENUE_BLACKLIST = [
-    venue.lower() for venue in config_file.get("venue_blacklist", ["arxiv"])
-]
-FREQUENT_VENUES_API_KEY = config_file.get("frequent_venues_recommender", {}).get(
-    "arxivdigest_api_key", ""
-)
-VENUE_COPUB_CONFIG = config_file.get("venue_copub_recommender", {})
-VENUE_COPUB_API_KEY = VENUE_COPUB_CONFIG.get("arxivdigest_api_key", "")
-WEIGHTED_INF_CONFIG = config_file.get("weighted_inf_recommender", {})
-WEIGHTED_INF_API_KEY = WEIGHTED_INF_CONFIG.get("arxivdigest_api_key", "")
-WEIGHTED_INF_MIN_INFLUENCE = WEIGHTED_INF_CONFIG.get("min_influence", 20)
-PREV_CITED_API_KEY = config_file.get("prev_cited_recommender", {}).get(
-    "arxivdigest_api_key", ""
-)
-PREV_CITED_COLLAB_API_KEY = config_file.get("prev_cited_collab_recommender", {}).get(
-    "arxivdigest_api_key", ""
-)
-PREV_CITED_TOPIC_CONFIG = config_file.get("prev_cited_topic_recommender", {})
-PREV_CITED_TOPIC_API_KEY = PREV_CITED_TOPIC_CONFIG.get("arxivdigest_api_key", "")
-PREV_CITED_TOPIC_INDEX = PREV_CITED_TOPIC_CONFIG.get("index", "arxivdigest_papers")
-MAX_EXPLANATION_TOPICS = PREV_CITED_TOPIC_CONFIG.get("max_explanation_topics", 3)
+
+_loaded = False
+
+
+def load():
+    """Read the config file and set the settings of this module.
+
+    Settings that have already been assigned (e.g., overridden from the command line) are kept.
+    """
+    global _loaded
+    _loaded = True
+    for name, value in _settings().items():
+        globals().setdefault(name, value)
+
+
+def __getattr__(name: str) -> Any:
+    # The config file is read on the first access to a setting rather than on import, so that importing the package is
+    # cheap.
+    if not _loaded and name.isupper():
+        load()
+        if name in globals():
+            return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,63 @@
+import asyncio
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from arxivdigest_recommenders import config
+
+T = TypeVar("T")
+
+_decode_pool: Optional[ThreadPoolExecutor] = None
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_decode_pool() -> ThreadPoolExecutor:
+    global _decode_pool
+    if _decode_pool is None:
+        _decode_pool = ThreadPoolExecutor(
+            config.EXECUTOR_DECODE_THREADS, thread_name_prefix="decode"
+        )
+    return _decode_pool
+
+
+def _get_cpu_pool() -> ProcessPoolExecutor:
+    global _cpu_pool
+    if _cpu_pool is None:
+        _cpu_pool = ProcessPoolExecutor(
+            config.EXECUTOR_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _cpu_pool
+
+
+async def decode_json(raw: str) -> Any:
+    """Decode a JSON document, in the decoding thread pool if it is enabled and the document is large.
+
+    Decoding still holds the GIL, but the interpreter switches between the decoding thread and the event loop while a
+    large document is decoded, so that other coroutines are not stalled until decoding finishes.
+
+    :param raw: JSON document.
+    :return: Decoded document.
+    """
+    if (
+        config.EXECUTOR_DECODE_THREADS > 0
+        and len(raw) >= config.EXECUTOR_DECODE_MIN_SIZE
+    ):
+        return await asyncio.get_running_loop().run_in_executor(
+            _get_decode_pool(), json.loads, raw
+        )
+    return json.loads(raw)
+
+
+async def run_cpu(func: Callable[..., T], *args: Any) -> T:
+    """Run a CPU-bound function in the process pool if it is enabled, or directly otherwise.
+
+    :param func: Function. The function, its arguments, and its return value must be picklable.
+    :param args: Arguments.
+    :return: Return value of the function.
+    """
+    if config.EXECUTOR_PROCESSES > 0:
+        return await asyncio.get_running_loop().run_in_executor(
+            _get_cpu_pool(), func, *args
+        )
+    return func(*args)
@@ -1,23 +1,23 @@
 import asyncio
 import numpy as np
-from typing import List, Dict
+from collections import defaultdict
+from typing import Any, List, Dict, MutableMapping, Optional, Sequence
 
-from arxivdigest_recommenders.recommender import ArxivdigestRecommender
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender, run
 from arxivdigest_recommenders.semantic_scholar import SemanticScholar
-from arxivdigest_recommenders.author_representation import venue_author_representation
-from arxivdigest_recommenders.util import pad_shortest
+from arxivdigest_recommenders.author_representation import (
+    stream_venue_author_representation,
+)
+from arxivdigest_recommenders.checkpoint import Checkpoint
+from arxivdigest_recommenders.score_store import paper_fingerprint
+from arxivdigest_recommenders.util import LRUCache
 from arxivdigest_recommenders import config
 
 
-def explanation(
-    venues: List[str],
-    user: List[int],
-    paper: List[int],
-) -> str:
-    venue_index = paper.index(1)
+def explanation(venue: str, num_papers: int) -> str:
     return (
-        f"This article is published at **{venues[venue_index]}**, where you have published {user[venue_index]} "
-        f"{'paper' if user[venue_index] == 1 else 'papers'} in the last {config.MAX_PAPER_AGE} years."
+        f"This article is published at **{venue}**, where you have published {num_papers} "
+        f"{'paper' if num_papers == 1 else 'papers'} in the last {config.MAX_PAPER_AGE} years."
     )
 
 
@@ -27,36 +27,114 @@ class FrequentVenuesRecommender(ArxivdigestRecommender):
     def __init__(self):
         super().__init__(config.FREQUENT_VENUES_API_KEY, "FrequentVenuesRecommender")
         self._venues: List[str] = []
-        self._authors: Dict[str, np.ndarray] = {}
+        self._venue_indexes: Dict[str, int] = {}
+        self._authors: MutableMapping[str, np.ndarray] = LRUCache(config.MAX_CACHE_SIZE)
+        self._paper_venues: Dict[str, Optional[str]] = {}
+        self._venue_papers: Dict[str, List[str]] = {}
+        self._unindexed_paper_ids: List[str] = []
+        self._indexed_paper_ids: Optional[List[str]] = None
+
+    async def index_papers(self, paper_ids: Sequence[str]):
+        """Look up the venues of the candidate papers once and group the papers by venue, so that papers are not looked
+        up for every user, and each user's ranking only needs the papers published at the user's venues.
+
+        :param paper_ids: arXiv IDs of candidate papers.
+        """
+        self._logger.info("Indexing candidate papers by venue.")
+        async with SemanticScholar() as s2:
+            papers = await asyncio.gather(
+                *[s2.paper(arxiv_id=paper_id) for paper_id in paper_ids],
+                return_exceptions=True,
+            )
+        self._paper_venues = {}
+        self._venue_papers = defaultdict(list)
+        self._unindexed_paper_ids = []
+        for paper_id, paper in zip(paper_ids, papers):
+            if isinstance(paper, BaseException):
+                self._unindexed_paper_ids.append(paper_id)
+                continue
+            self._paper_venues[paper_id] = paper["venue"]
+            if paper["venue"]:
+                self._venue_papers[paper["venue"]].append(paper_id)
+        self._indexed_paper_ids = list(paper_ids)
+
+    async def recommendations(
+        self,
+        users: dict,
+        interleaved_papers: dict,
+        paper_ids: Sequence[str],
+        max_recommendations=10,
+        checkpoint: Optional[Checkpoint] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        # The candidate papers are the same for every user batch of a run, so they are only indexed once.
+        if self._indexed_paper_ids != list(paper_ids):
+            await self.index_papers(paper_ids)
+        return await super().recommendations(
+            users, interleaved_papers, paper_ids, max_recommendations, checkpoint
+        )
+
+    async def user_ranking(
+        self, user: dict, user_s2_id: str, paper_ids: Sequence[str], batch_size=10
+    ) -> List[Dict[str, Any]]:
+        # Only papers published at venues that the user has published at get a score, so if the candidate papers are
+        # indexed, the ranking is limited to the indexed papers of those venues and the papers that could not be
+        # indexed. The papers are still scored by the base class, so that stored scores, the user time budget, and
+        # the scoring metrics apply.
+        if self._indexed_paper_ids == list(paper_ids):
+            try:
+                user_representation = await self.author_representation(user_s2_id)
+            except Exception:
+                # The papers are scored one by one, which handles the error for each of them.
+                pass
+            else:
+                paper_ids = [
+                    paper_id
+                    for venue_index in np.flatnonzero(user_representation)
+                    for paper_id in self._venue_papers.get(
+                        self._venues[venue_index], []
+                    )
+                ] + self._unindexed_paper_ids
+        return await super().user_ranking(user, user_s2_id, paper_ids, batch_size)
 
     async def author_representation(self, s2_id: str) -> np.ndarray:
         if s2_id not in self._authors:
             async with SemanticScholar() as s2:
-                papers = await s2.author_papers(s2_id)
-            self._authors[s2_id] = venue_author_representation(self._venues, papers)
+                self._authors[s2_id] = await stream_venue_author_representation(
+                    self._venues,
+                    s2.iter_author_papers(
+                        s2_id, max_papers=self._plan.max_author_papers
+                    ),
+                    self._venue_indexes,
+                )
         return self._authors[s2_id]
 
+    def paper_fingerprint(self, paper: dict) -> str:
+        # Papers are scored by their venue.
+        return paper_fingerprint(paper, paper["venue"])
+
     async def score_paper(self, user, user_s2_id, paper_id):
-        async with SemanticScholar() as s2:
-            paper = await s2.paper(arxiv_id=paper_id)
+        if paper_id in self._paper_venues:
+            venue = self._paper_venues[paper_id]
+        else:
+            # Papers that are not indexed (e.g., because they could not be looked up when they were indexed) are looked
+            # up again.
+            async with SemanticScholar() as s2:
+                venue = (await s2.paper(arxiv_id=paper_id))["venue"]
         user_representation = await self.author_representation(user_s2_id)
-        if not paper["venue"] or paper["venue"] not in self._venues:
+        if not venue or venue not in self._venue_indexes:
             return
-        paper_representation, user_representation = pad_shortest(
-            [int(v == paper["venue"]) for v in self._venues], user_representation
+        venue_index = self._venue_indexes[venue]
+        score = (
+            int(user_representation[venue_index])
+            if venue_index < len(user_representation)
+            else 0
         )
-        score = int(np.dot(paper_representation, user_representation))
         return {
             "article_id": paper_id,
             "score": score,
-            "explanation": explanation(
-                self._venues, user_representation, paper_representation
-            )
-            if score > 0
-            else "",
+            "explanation": explanation(venue, score) if score > 0 else "",
         }
 
 
 if __name__ == "__main__":
-    recommender = FrequentVenuesRecommender()
-    asyncio.run(recommender.recommend())
+    run(FrequentVenuesRecommender())
@@ -12,6 +12,19 @@ LOG_LEVELS = {
 }
 
 
+class PrefixedLogger(logging.LoggerAdapter):
+    """Logger that prefixes messages. The level of the logger is set from the config when the logger is first used
+    rather than when it is created, since loggers are created when modules are imported."""
+
+    _level_set = False
+
+    def isEnabledFor(self, level: int) -> bool:
+        if not self._level_set:
+            self.logger.setLevel(LOG_LEVELS.get(config.LOG_LEVEL, 20))
+            self._level_set = True
+        return super().isEnabledFor(level)
+
+
 def get_logger(name: str, prefix: str):
     formatter = logging.Formatter(
         fmt="%(asctime)s [%(levelname)s] %(prefix)s - %(message)s"
@@ -19,7 +32,6 @@ def get_logger(name: str, prefix: str):
     handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(formatter)
     logger = logging.getLogger(name)
-    logger.setLevel(LOG_LEVELS.get(config.LOG_LEVEL, 20))
     logger.addHandler(handler)
-    logger = logging.LoggerAdapter(logger, {"prefix": prefix})
+    logger = PrefixedLogger(logger, {"prefix": prefix})
     return logger
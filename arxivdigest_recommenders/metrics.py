@@ -0,0 +1,337 @@
+import bisect
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from arxivdigest_recommenders import config
+
+# Upper bounds (in seconds) of the latency histogram buckets, spanning in-memory cache hits to rate limit waits.
+BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    25.0,
+    50.0,
+    100.0,
+    250.0,
+)
+
+DESCRIPTIONS = {
+    "s2_request_seconds": "Semantic Scholar API requests by endpoint type.",
+    "cache_get_seconds": "Cache lookups by backend.",
+    "cache_set_seconds": "Cache writes by backend.",
+    "rate_limiter_wait_seconds": "Time spent waiting for the Semantic Scholar rate limiter.",
+    "user_ranking_seconds": "Ranking of the candidate papers for a user by recommender.",
+    "score_paper_seconds": "Scoring of a candidate paper for a user by recommender.",
+    "arxivdigest_call_seconds": "arXivDigest connector calls by method.",
+    "loop_lag_seconds": "Event loop lag measured while profiling.",
+    "s2_batched_ids": "IDs looked up with Semantic Scholar batch requests by endpoint type.",
+    "s2_coalesced_fetches": "Semantic Scholar lookups served from responses cached by other processes.",
+    "s2_single_flight_timeouts": "Semantic Scholar lookups that timed out waiting for other processes.",
+    "partial_rankings": "User rankings cut short by the user time budget by recommender.",
+    "unscored_papers": "Candidate papers left out of partial user rankings by recommender.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Latency histogram with fixed buckets."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other: "Histogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation within the bucket that contains it.
+
+        :param q: Quantile between 0 and 1.
+        :return: Estimated quantile. Quantiles in the last, unbounded, bucket are estimated as its lower bound.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count > 0:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class Metrics:
+    """Registry of the latency histograms and counters of a process."""
+
+    def __init__(self):
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.counters: Dict[str, Dict[Labels, int]] = {}
+
+    def observe(self, name: str, seconds: float, **labels: str):
+        """Record a latency.
+
+        :param name: Histogram name.
+        :param seconds: Latency in seconds.
+        :param labels: Labels of the histogram.
+        """
+        key = tuple(sorted(labels.items()))
+        histograms = self.histograms.setdefault(name, {})
+        if key not in histograms:
+            histograms[key] = Histogram()
+        histograms[key].observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str):
+        """Context manager that records the time spent inside it, also when an exception is raised.
+
+        :param name: Histogram name.
+        :param labels: Labels of the histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def increment(self, name: str, value=1, **labels: str):
+        """Increment a counter.
+
+        :param name: Counter name.
+        :param value: Increment.
+        :param labels: Labels of the counter.
+        """
+        counters = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        counters[key] = counters.get(key, 0) + value
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get the histograms and counters in a picklable form that can be merged into another registry (e.g., to
+        collect the metrics of worker processes)."""
+        return {
+            "histograms": {
+                name: {
+                    labels: (histogram.counts, histogram.count, histogram.sum)
+                    for labels, histogram in histograms.items()
+                }
+                for name, histograms in self.histograms.items()
+            },
+            "counters": {
+                name: dict(counters) for name, counters in self.counters.items()
+            },
+        }
+
+    def merge(self, snapshot: Dict[str, Any]):
+        """Add the histograms and counters of a snapshot to the registry.
+
+        :param snapshot: Snapshot from Metrics.snapshot.
+        """
+        for name, histograms in snapshot["histograms"].items():
+            for labels, (counts, count, total) in histograms.items():
+                other = Histogram()
+                other.counts, other.count, other.sum = list(counts), count, total
+                self.histograms.setdefault(name, {}).setdefault(
+                    labels, Histogram()
+                ).merge(other)
+        for name, counters in snapshot["counters"].items():
+            for labels, value in counters.items():
+                self.increment(name, value, **dict(labels))
+
+    def report(self) -> Dict[str, Any]:
+        """Create a run report with summary statistics of each histogram and the value of each counter.
+
+        :return: Report.
+        """
+        return {
+            "histograms": {
+                name: [
+                    {
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "mean": histogram.sum / histogram.count,
+                        "p50": histogram.quantile(0.5),
+                        "p90": histogram.quantile(0.9),
+                        "p99": histogram.quantile(0.99),
+                    }
+                    for labels, histogram in sorted(histograms.items())
+                ]
+                for name, histograms in sorted(self.histograms.items())
+            },
+            "counters": {
+                name: [
+                    {"labels": dict(labels), "value": value}
+                    for labels, value in sorted(counters.items())
+                ]
+                for name, counters in sorted(self.counters.items())
+            },
+        }
+
+    def prometheus(self, prefix="arxivdigest_recommenders_") -> str:
+        """Export the histograms and counters in the Prometheus text exposition format.
+
+        :param prefix: Prefix of the metric names.
+        :return: Exported metrics.
+        """
+
+        def format_labels(labels: Labels, *extra: Tuple[str, str]) -> str:
+            pairs = [
+                '{}="{}"'.format(
+                    key, str(value).replace("\\", "\\\\").replace('"', '\\"')
+                )
+                for key, value in labels + extra
+            ]
+            return "{" + ",".join(pairs) + "}" if pairs else ""
+
+        lines = []
+        for name, histograms in sorted(self.histograms.items()):
+            if name in DESCRIPTIONS:
+                lines.append(f"# HELP {prefix}{name} {DESCRIPTIONS[name]}")
+            lines.append(f"# TYPE {prefix}{name} histogram")
+            for labels, histogram in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(
+                    [str(bound) for bound in histogram.buckets] + ["+Inf"],
+                    histogram.counts,
+                ):
+                    cumulative += count
+                    lines.append(
+                        f"{prefix}{name}_bucket{format_labels(labels, ('le', bound))} {cumulative}"
+                    )
+                lines.append(
+                    f"{prefix}{name}_sum{format_labels(labels)} {histogram.sum}"
+                )
+                lines.append(
+                    f"{prefix}{name}_count{format_labels(labels)} {histogram.count}"
+                )
+        for name, counters in sorted(self.counters.items()):
+            if name in DESCRIPTIONS:
+                lines.append(f"# HELP {prefix}{name} {DESCRIPTIONS[name]}")
+            lines.append(f"# TYPE {prefix}{name} counter")
+            # Counter samples are suffixed with _total, as required by OpenMetrics and expected by Prometheus.
+            for labels, value in sorted(counters.items()):
+                lines.append(f"{prefix}{name}_total{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, fmt: Optional[str] = None, **extra: Any):
+        """Write the metrics to a file.
+
+        :param path: Path of the file.
+        :param fmt: Either "json" (run report) or "prometheus". Defaults to "prometheus" for paths ending with ".prom",
+        and "json" otherwise.
+        :param extra: Additional entries of the JSON run report (e.g., run stats).
+        """
+        if fmt is None:
+            fmt = "prometheus" if path.endswith(".prom") else "json"
+        if fmt not in ("json", "prometheus"):
+            raise ValueError(f"Unknown metrics format: {fmt}.")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as file:
+            if fmt == "prometheus":
+                file.write(self.prometheus())
+            else:
+                json.dump({**extra, **self.report()}, file, indent=2)
+
+
+metrics = Metrics()
+
+
+class InstrumentedConnector:
+    """arXivDigest connector wrapper that records the latency of each call."""
+
+    def __init__(self, connector):
+        self._connector = connector
+
+    def __getattr__(self, name: str):
+        method = getattr(self._connector, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            with metrics.timer("arxivdigest_call_seconds", method=name):
+                return method(*args, **kwargs)
+
+        return call
+
+
+def summary(top=10) -> List[str]:
+    """Summarize where time was spent, as lines with the histograms that have the largest total time first.
+
+    :param top: Max number of lines.
+    :return: Summary lines.
+    """
+    histograms = sorted(
+        (
+            (name, labels, histogram)
+            for name, histograms in metrics.histograms.items()
+            for labels, histogram in histograms.items()
+        ),
+        key=lambda entry: entry[2].sum,
+        reverse=True,
+    )
+    return [
+        f"{name}{dict(labels) if labels else ''}: {histogram.sum:.1f} s in {histogram.count} observations "
+        f"(p50 {histogram.quantile(0.5) * 1000:.1f} ms, p99 {histogram.quantile(0.99) * 1000:.1f} ms)"
+        for name, labels, histogram in histograms[:top]
+    ]
+
+
+def metrics_path(worker: Optional[str] = None) -> Optional[str]:
+    """Get the path that the metrics of this process are written to.
+
+    :param worker: ID of the worker of a distributed run. Several workers may run on the same host, so the ID is
+    inserted before the extension of the configured path.
+    :return: Path, or None if metrics are not written.
+    """
+    if config.METRICS_PATH is None or worker is None:
+        return config.METRICS_PATH
+    root, ext = os.path.splitext(config.METRICS_PATH)
+    worker = re.sub(r"[^\w.-]", "-", worker)
+    return f"{root}.{worker}{ext}"
+
+
+def write_metrics(worker: Optional[str] = None, **extra: Any):
+    """Write the metrics of this process to the configured path, if any.
+
+    :param worker: ID of the worker of a distributed run, which is added to the path and the JSON run report.
+    :param extra: Additional entries of the JSON run report.
+    """
+    path = metrics_path(worker)
+    if path is None:
+        return
+    if worker is not None:
+        extra["worker"] = worker
+    metrics.write(path, config.METRICS_FORMAT, **extra)
@@ -0,0 +1,103 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from arxivdigest_recommenders.semantic_scholar import SemanticScholar
+from arxivdigest_recommenders.planner import RunPlan
+from arxivdigest_recommenders.metrics import metrics
+from arxivdigest_recommenders.util import SharedRateLimiter
+from arxivdigest_recommenders import config
+
+# State of a worker process. Each worker keeps one recommender and one event loop for all the batches it processes,
+# so that the recommender's in-memory caches are reused between batches.
+_recommender = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_paper_ids: Sequence[str] = []
+
+
+def _init_worker(
+    recommender_cls: Type,
+    paper_ids: Sequence[str],
+    plan: RunPlan,
+    limiter: SharedRateLimiter,
+    cassette: Tuple[Optional[str], Optional[str]],
+):
+    global _recommender, _loop, _paper_ids
+    # Spawned workers read the config file again, so settings that were overridden in the main process (e.g., with
+    # --replay) are passed on.
+    config.CASSETTE_MODE, config.CASSETTE_PATH = cassette
+    SemanticScholar._limiter = limiter
+    _loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_loop)
+    _recommender = recommender_cls()
+    _recommender._plan = plan
+    _paper_ids = paper_ids
+
+
+def _recommend_batch(
+    user_ids: List[str],
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+    recommendations = _loop.run_until_complete(
+        _recommender.recommend_batch(_recommender.connector(), user_ids, _paper_ids)
+    )
+    stats = {
+        "pid": os.getpid(),
+        "requests": SemanticScholar.requests,
+        "cache_hits": SemanticScholar.cache_hits,
+        "stale_cache_hits": SemanticScholar.stale_cache_hits,
+        "cache_misses": SemanticScholar.cache_misses,
+        "errors": SemanticScholar.errors,
+        "metrics": metrics.snapshot(),
+    }
+    return recommendations, stats
+
+
+def worker_pool(
+    recommender_cls: Type, workers: int, paper_ids: Sequence[str], plan: RunPlan
+) -> ProcessPoolExecutor:
+    """Start a pool of worker processes that generate recommendations for user batches.
+
+    The workers share a Semantic Scholar rate limit, and use the configured cache backend. If a cassette is replayed,
+    the workers replay it as well. Cassettes cannot be recorded by several workers, since each of them would overwrite
+    the cassette.
+
+    :param recommender_cls: Recommender system class. It is instantiated without arguments in each worker.
+    :param workers: Number of worker processes.
+    :param paper_ids: arXiv IDs of candidate papers.
+    :param plan: Run plan.
+    :return: Process pool.
+    """
+    if config.CASSETTE_MODE == "record":
+        raise ValueError("Cassettes cannot be recorded by multiple worker processes.")
+    # Worker processes are spawned rather than forked, so that they do not inherit the event loop and connections of
+    # the parent process.
+    context = multiprocessing.get_context("spawn")
+    limiter = SharedRateLimiter(config.S2_MAX_REQUESTS, config.S2_WINDOW_SIZE, context)
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(
+            recommender_cls,
+            paper_ids,
+            plan,
+            limiter,
+            (config.CASSETTE_MODE, config.CASSETTE_PATH),
+        ),
+    )
+
+
+async def recommend_batch(
+    pool: ProcessPoolExecutor, user_ids: List[str]
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+    """Generate recommendations for a user batch in a worker process.
+
+    :param pool: Worker pool.
+    :param user_ids: User IDs.
+    :return: Recommendations, and the Semantic Scholar API stats and metrics snapshot of the worker.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        pool, _recommend_batch, user_ids
+    )
@@ -0,0 +1,207 @@
+import asyncio
+import math
+from itertools import accumulate
+from typing import NamedTuple, Optional, Sequence, List, Dict, Set, Tuple
+
+from arxivdigest_recommenders.semantic_scholar import SemanticScholar
+from arxivdigest_recommenders.log import get_logger
+from arxivdigest_recommenders import config
+
+
+logger = get_logger(__name__, "Planner")
+
+# Default argument that stands for a value in the config, so that the config file is not read on import and None keeps
+# its own meaning.
+_DEFAULT = object()
+
+# Increasingly degraded (max_paper_authors, max_author_papers) limits. None means unlimited.
+DEGRADATION_LADDER: List[Tuple[Optional[int], Optional[int]]] = [
+    (None, None),
+    (None, 100),
+    (10, 100),
+    (10, 50),
+    (5, 50),
+    (5, 20),
+    (3, 20),
+    (3, 10),
+    (1, 10),
+    (1, 5),
+]
+
+
+class RunPlan(NamedTuple):
+    """Limits on the amount of data fetched from Semantic Scholar during a run."""
+
+    max_paper_authors: Optional[int] = None
+    max_author_papers: Optional[int] = None
+    estimated_requests: int = 0
+    estimated_seconds: int = 0
+
+    @property
+    def degraded(self) -> bool:
+        return self.max_paper_authors is not None or self.max_author_papers is not None
+
+
+def estimated_seconds(requests: int) -> int:
+    """Estimate the time needed to make a number of rate-limited requests.
+
+    :param requests: Number of requests.
+    :return: Estimated time in seconds.
+    """
+    # A window that is only partly used still has to be waited for.
+    return math.ceil(requests / config.S2_MAX_REQUESTS) * config.S2_WINDOW_SIZE
+
+
+async def _missing_paper_counts(s2: SemanticScholar, s2_id: str) -> Optional[List[int]]:
+    """Count uncached papers among an author's most recent papers.
+
+    :param s2: Semantic Scholar client.
+    :param s2_id: S2 author ID.
+    :return: List where the i-th value is the number of uncached papers among the author's i most recent papers, or
+    None if the author is not cached.
+    """
+    author = await s2.cached_author(s2_id)
+    if author is None:
+        return None
+    cached = await s2.cached_papers(s2_ids=SemanticScholar.recent_paper_ids(author))
+    return [0] + list(accumulate(int(paper is None) for paper in cached))
+
+
+async def plan_run(
+    paper_ids: Sequence[str],
+    user_s2_ids: Sequence[str],
+    candidate_authors: bool,
+    collaborators: bool,
+    deadline: Optional[float] = _DEFAULT,
+) -> RunPlan:
+    """Estimate the Semantic Scholar requests needed for a run and pick the least degraded plan that meets a deadline.
+
+    Authors and papers that are not cached are assumed to have an average number of papers and authors, respectively.
+    The collaborators of users that are not cached cannot be known in advance and are left out of the estimate.
+
+    :param paper_ids: arXiv IDs of candidate papers.
+    :param user_s2_ids: S2 author IDs of users.
+    :param candidate_authors: Whether the papers of the authors of candidate papers are needed.
+    :param collaborators: Whether the papers of the users' collaborators are needed.
+    :param deadline: Deadline in hours. If None, the undegraded plan is returned. Defaults to the deadline in the config.
+    :return: Run plan.
+    """
+    if deadline is _DEFAULT:
+        deadline = config.PLANNER_DEADLINE
+    async with SemanticScholar() as s2:
+        candidates = await s2.cached_papers(arxiv_ids=list(paper_ids))
+        cached_candidates = [paper for paper in candidates if paper is not None]
+        missing_candidates = len(candidates) - len(cached_candidates)
+        user_papers: Dict[str, List[dict]] = {}
+        if collaborators:
+            for s2_id in user_s2_ids:
+                user = await s2.cached_author(s2_id)
+                if user is None:
+                    continue
+                papers = await s2.cached_papers(
+                    s2_ids=SemanticScholar.recent_paper_ids(user)
+                )
+                user_papers[s2_id] = [paper for paper in papers if paper is not None]
+
+        def needed_authors(max_paper_authors: Optional[int]) -> Set[str]:
+            authors = set(user_s2_ids)
+            papers = []
+            if candidate_authors:
+                papers.extend(cached_candidates)
+            for papers_of_user in user_papers.values():
+                papers.extend(papers_of_user)
+            for paper in papers:
+                authors.update(
+                    a["authorId"]
+                    for a in paper["authors"][:max_paper_authors]
+                    if a["authorId"]
+                )
+            return authors
+
+        author_ids = list(needed_authors(None))
+        missing_counts = dict(
+            zip(
+                author_ids,
+                await asyncio.gather(
+                    *[_missing_paper_counts(s2, s2_id) for s2_id in author_ids]
+                ),
+            )
+        )
+
+    known_counts = [c for c in missing_counts.values() if c is not None]
+    avg_author_papers = (
+        sum(len(c) - 1 for c in known_counts) / len(known_counts)
+        if known_counts
+        else config.PLANNER_DEFAULT_AUTHOR_PAPERS
+    )
+    avg_paper_authors = (
+        sum(len(p["authors"]) for p in cached_candidates) / len(cached_candidates)
+        if cached_candidates
+        else config.PLANNER_DEFAULT_PAPER_AUTHORS
+    )
+
+    def estimated_requests(
+        max_paper_authors: Optional[int], max_author_papers: Optional[int]
+    ) -> int:
+        author_papers = min(
+            avg_author_papers,
+            avg_author_papers if max_author_papers is None else max_author_papers,
+        )
+        papers = missing_candidates
+        authors = 0
+        if candidate_authors:
+            paper_authors = min(
+                avg_paper_authors,
+                avg_paper_authors if max_paper_authors is None else max_paper_authors,
+            )
+            authors += missing_candidates * paper_authors
+            papers += missing_candidates * paper_authors * author_papers
+        for s2_id in needed_authors(max_paper_authors):
+            counts = missing_counts[s2_id]
+            if counts is None:
+                authors += 1
+                papers += author_papers
+            else:
+                num_papers = len(counts) - 1
+                if max_author_papers is not None:
+                    num_papers = min(num_papers, max_author_papers)
+                papers += counts[num_papers]
+        if config.S2_BATCH_REQUESTS:
+            # Lookups are coalesced into batch requests. Batches are not always full, since lookups are only batched
+            # with those made within the batch window, so this is a lower bound.
+            return math.ceil(papers / config.S2_PAPER_BATCH_SIZE) + math.ceil(
+                authors / config.S2_AUTHOR_BATCH_SIZE
+            )
+        return int(papers + authors)
+
+    plan = None
+    for max_paper_authors, max_author_papers in DEGRADATION_LADDER:
+        requests = estimated_requests(max_paper_authors, max_author_papers)
+        plan = RunPlan(
+            max_paper_authors,
+            max_author_papers,
+            requests,
+            estimated_seconds(requests),
+        )
+        if deadline is None or plan.estimated_seconds <= deadline * 3600:
+            break
+    else:
+        logger.warning(
+            "No plan finishes within the deadline of %s hours. Using the most degraded plan.",
+            deadline,
+        )
+    logger.info(
+        "%d of %d candidate papers and %d of %d authors are not cached.",
+        missing_candidates,
+        len(paper_ids),
+        sum(c is None for c in missing_counts.values()),
+        len(missing_counts),
+    )
+    logger.info(
+        "Plan: max %s authors per paper and %s papers per author. Estimated %d requests and %d seconds.",
+        plan.max_paper_authors or "all",
+        plan.max_author_papers or "all",
+        plan.estimated_requests,
+        plan.estimated_seconds,
+    )
+    return plan
@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import time
+from typing import Sequence, List, Awaitable
+
+from arxivdigest_recommenders.semantic_scholar import SemanticScholar
+from arxivdigest_recommenders.planner import RunPlan, plan_run
+from arxivdigest_recommenders.util import gather, get_user_s2_ids
+from arxivdigest_recommenders.log import get_logger
+from arxivdigest_recommenders import config
+
+
+logger = get_logger(__name__, "Prefetch")
+
+
+async def prefetch(
+    paper_ids: Sequence[str],
+    user_s2_ids: Sequence[str],
+    candidate_authors=True,
+    collaborators=True,
+    plan=RunPlan(),
+    concurrency: int = None,
+):
+    """Fill the Semantic Scholar cache with the data needed to score candidate papers for a set of users.
+
+    Papers and authors are looked up concurrently, so that the rate limiter is kept busy until all data is cached.
+
+    :param paper_ids: arXiv IDs of candidate papers.
+    :param user_s2_ids: S2 author IDs of users.
+    :param candidate_authors: Fetch the papers of the authors of candidate papers.
+    :param collaborators: Fetch the papers of the users' collaborators.
+    :param plan: Run plan limiting the number of authors per paper and papers per author.
+    :param concurrency: Max number of papers and authors looked up at a time. Defaults to the value in the config.
+    """
+    if concurrency is None:
+        concurrency = config.PREFETCH_CONCURRENCY
+    # Every lookup is bounded by the same semaphore, rather than only the top-level lookups, since each author fans
+    # out into lookups of their papers.
+    sem = asyncio.Semaphore(concurrency)
+    start_time = time.monotonic()
+    start_requests = SemanticScholar.requests
+    async with SemanticScholar() as s2:
+
+        async def bounded(lookup: Awaitable[dict]) -> dict:
+            async with sem:
+                return await lookup
+
+        async def author_papers(s2_id: str) -> List[dict]:
+            author = await bounded(s2.author(s2_id))
+            return await gather(
+                *[
+                    bounded(s2.paper(s2_id=paper_id))
+                    for paper_id in SemanticScholar.recent_paper_ids(
+                        author, max_papers=plan.max_author_papers
+                    )
+                ]
+            )
+
+        async def prefetch_author_papers(s2_id: str):
+            # The papers are only fetched to fill the cache, so they are not kept around.
+            await author_papers(s2_id)
+
+        papers, user_papers = await asyncio.gather(
+            gather(*[bounded(s2.paper(arxiv_id=paper_id)) for paper_id in paper_ids]),
+            gather(*[author_papers(s2_id) for s2_id in user_s2_ids]),
+        )
+        if not candidate_authors:
+            papers = []
+        if collaborators:
+            papers.extend(
+                paper for papers_of_user in user_papers for paper in papers_of_user
+            )
+        author_ids = {
+            author["authorId"]
+            for paper in papers
+            for author in paper["authors"][: plan.max_paper_authors]
+            if author["authorId"]
+        }.difference(user_s2_ids)
+        await gather(*[prefetch_author_papers(s2_id) for s2_id in author_ids])
+    logger.info(
+        "Prefetched %d candidate papers, %d users, and %d authors using %d requests in %d seconds.",
+        len(paper_ids),
+        len(user_s2_ids),
+        len(author_ids),
+        SemanticScholar.requests - start_requests,
+        time.monotonic() - start_time,
+    )
+
+
+async def _plan_and_prefetch(
+    paper_ids: Sequence[str],
+    user_s2_ids: Sequence[str],
+    candidate_authors: bool,
+    collaborators: bool,
+):
+    plan = RunPlan()
+    if config.PLANNER_ENABLED:
+        plan = await plan_run(paper_ids, user_s2_ids, candidate_authors, collaborators)
+    await prefetch(paper_ids, user_s2_ids, candidate_authors, collaborators, plan)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fill the Semantic Scholar cache with the data needed by the recommender systems."
+    )
+    parser.add_argument(
+        "--skip-candidate-authors",
+        action="store_true",
+        help="do not fetch the papers of the authors of candidate papers",
+    )
+    parser.add_argument(
+        "--skip-collaborators",
+        action="store_true",
+        help="do not fetch the papers of the users' collaborators",
+    )
+    args = parser.parse_args()
+    from arxivdigest.connector import ArxivdigestConnector
+
+    connector = ArxivdigestConnector(
+        config.PREFETCH_API_KEY, config.ARXIVDIGEST_BASE_URL
+    )
+    paper_ids = connector.get_article_ids()
+    user_s2_ids = get_user_s2_ids(connector, connector.get_number_of_users())
+    asyncio.run(
+        _plan_and_prefetch(
+            paper_ids,
+            user_s2_ids,
+            not args.skip_candidate_authors,
+            not args.skip_collaborators,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
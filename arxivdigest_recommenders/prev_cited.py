@@ -1,9 +1,13 @@
-import asyncio
-from collections import defaultdict
-from typing import DefaultDict
+from typing import MutableMapping
 
-from arxivdigest_recommenders.recommender import ArxivdigestRecommender
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender, run
 from arxivdigest_recommenders.semantic_scholar import SemanticScholar
+from arxivdigest_recommenders.author_representation import (
+    AuthorInterner,
+    CitationProfile,
+    stream_citation_author_representation,
+)
+from arxivdigest_recommenders.util import LRUCache
 from arxivdigest_recommenders import config
 
 
@@ -19,19 +23,21 @@ class PrevCitedRecommender(ArxivdigestRecommender):
 
     def __init__(self):
         super().__init__(config.PREV_CITED_API_KEY, "PrevCitedRecommender")
-        self._citation_counts: DefaultDict[str, DefaultDict[str, int]] = defaultdict(
-            lambda: defaultdict(int)
+        self._cited_authors = AuthorInterner()
+        self._citation_counts: MutableMapping[str, CitationProfile] = LRUCache(
+            config.MAX_CACHE_SIZE
         )
 
-    async def citation_counts(self, s2_id: str) -> DefaultDict[str, int]:
+    async def citation_counts(self, s2_id: str) -> CitationProfile:
         if s2_id not in self._citation_counts:
             async with SemanticScholar() as s2:
-                papers = await s2.author_papers(s2_id)
-            for paper in papers:
-                for reference in paper["references"]:
-                    for author in reference["authors"]:
-                        if author["authorId"]:
-                            self._citation_counts[s2_id][author["authorId"]] += 1
+                profile = await stream_citation_author_representation(
+                    self._cited_authors,
+                    s2.iter_author_papers(
+                        s2_id, max_papers=self._plan.max_author_papers
+                    ),
+                )
+            self._citation_counts[s2_id] = profile
         return self._citation_counts[s2_id]
 
     async def score_paper(self, user, user_s2_id, paper_id):
@@ -54,5 +60,4 @@ class PrevCitedRecommender(ArxivdigestRecommender):
 
 
 if __name__ == "__main__":
-    recommender = PrevCitedRecommender()
-    asyncio.run(recommender.recommend())
+    run(PrevCitedRecommender())
@@ -1,9 +1,13 @@
-import asyncio
-from collections import defaultdict
-from typing import DefaultDict, Dict, Any
+from typing import Dict, Any, MutableMapping
 
-from arxivdigest_recommenders.recommender import ArxivdigestRecommender
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender, run
 from arxivdigest_recommenders.semantic_scholar import SemanticScholar
+from arxivdigest_recommenders.author_representation import (
+    AuthorInterner,
+    CitationProfile,
+    stream_citation_author_representation,
+)
+from arxivdigest_recommenders.util import LRUCache
 from arxivdigest_recommenders import config
 
 
@@ -19,32 +23,41 @@ class PrevCitedCollabRecommender(ArxivdigestRecommender):
     """Recommender system that recommends papers published by authors that have been cited by the user's previous
     collaborators."""
 
+    _uses_collaborators = True
+
     def __init__(self):
         super().__init__(config.PREV_CITED_COLLAB_API_KEY, "PrevCitedCollabRecommender")
-        self._citation_counts: DefaultDict[str, DefaultDict[str, int]] = defaultdict(
-            lambda: defaultdict(int)
+        self._cited_authors = AuthorInterner()
+        self._citation_counts: MutableMapping[str, CitationProfile] = LRUCache(
+            config.MAX_CACHE_SIZE
+        )
+        self._collaborators: MutableMapping[str, Dict[str, Any]] = LRUCache(
+            config.MAX_CACHE_SIZE
         )
-        self._collaborators: DefaultDict[str, Dict[str, Any]] = defaultdict(dict)
 
-    async def citation_counts(self, s2_id: str) -> DefaultDict[str, int]:
+    async def citation_counts(self, s2_id: str) -> CitationProfile:
         if s2_id not in self._citation_counts:
             async with SemanticScholar() as s2:
-                papers = await s2.author_papers(s2_id)
-            for paper in papers:
-                for reference in paper["references"]:
-                    for author in reference["authors"]:
-                        if author["authorId"]:
-                            self._citation_counts[s2_id][author["authorId"]] += 1
+                profile = await stream_citation_author_representation(
+                    self._cited_authors,
+                    s2.iter_author_papers(
+                        s2_id, max_papers=self._plan.max_author_papers
+                    ),
+                )
+            self._citation_counts[s2_id] = profile
         return self._citation_counts[s2_id]
 
     async def collaborators(self, s2_id: str) -> Dict[str, Any]:
         if s2_id not in self._collaborators:
+            collaborators = {}
             async with SemanticScholar() as s2:
-                papers = await s2.author_papers(s2_id)
-            for paper in papers:
-                for author in paper["authors"]:
-                    if author["authorId"] and author["authorId"] != s2_id:
-                        self._collaborators[s2_id][author["authorId"]] = author
+                async for paper in s2.iter_author_papers(
+                    s2_id, max_papers=self._plan.max_author_papers
+                ):
+                    for author in paper["authors"][: self._plan.max_paper_authors]:
+                        if author["authorId"] and author["authorId"] != s2_id:
+                            collaborators[author["authorId"]] = author
+            self._collaborators[s2_id] = collaborators
         return self._collaborators[s2_id]
 
     async def score_paper(self, user, user_s2_id, paper_id):
@@ -83,5 +96,4 @@ class PrevCitedCollabRecommender(ArxivdigestRecommender):
 
 
 if __name__ == "__main__":
-    recommender = PrevCitedCollabRecommender()
-    asyncio.run(recommender.recommend())
+    run(PrevCitedCollabRecommender())
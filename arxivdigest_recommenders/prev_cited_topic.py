@@ -1,12 +1,16 @@
 import asyncio
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
-from arxivdigest.connector import ArxivdigestConnector
 from collections import defaultdict
-from typing import DefaultDict, Dict, Sequence
+from typing import DefaultDict, Dict, Sequence, MutableMapping
 
-from arxivdigest_recommenders.recommender import ArxivdigestRecommender
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender, run
 from arxivdigest_recommenders.semantic_scholar import SemanticScholar
+from arxivdigest_recommenders.author_representation import (
+    AuthorInterner,
+    CitationProfile,
+    stream_citation_author_representation,
+)
+from arxivdigest_recommenders.score_store import paper_fingerprint
+from arxivdigest_recommenders.util import LRUCache
 from arxivdigest_recommenders import config
 
 
@@ -29,14 +33,27 @@ class PrevCitedTopicSearchRecommender(ArxivdigestRecommender):
         super().__init__(
             config.PREV_CITED_TOPIC_API_KEY, "PrevCitedTopicSearchRecommender"
         )
-        self._citation_counts: DefaultDict[str, DefaultDict[str, int]] = defaultdict(
-            lambda: defaultdict(int)
+        self._cited_authors = AuthorInterner()
+        self._citation_counts: MutableMapping[str, CitationProfile] = LRUCache(
+            config.MAX_CACHE_SIZE
         )
-        self._topic_scores: Dict[str, Dict[str, DefaultDict[str, int]]] = {}
+        self._topic_scores: MutableMapping[
+            str, Dict[str, DefaultDict[str, int]]
+        ] = LRUCache(config.MAX_CACHE_SIZE)
         self._indexing_run = False
-        self._es = Elasticsearch(hosts=[config.ELASTICSEARCH_HOST])
-        if not self._es.indices.exists(config.PREV_CITED_TOPIC_INDEX):
-            self._es.indices.create(config.PREV_CITED_TOPIC_INDEX)
+        self._es_client = None
+
+    @property
+    def _es(self):
+        # The Elasticsearch client is created, and the index is created if needed, on first use rather than when the
+        # recommender is created.
+        if self._es_client is None:
+            from elasticsearch import Elasticsearch
+
+            self._es_client = Elasticsearch(hosts=[config.ELASTICSEARCH_HOST])
+            if not self._es_client.indices.exists(config.PREV_CITED_TOPIC_INDEX):
+                self._es_client.indices.create(config.PREV_CITED_TOPIC_INDEX)
+        return self._es_client
 
     async def index_papers(self, paper_ids: Sequence[str]):
         self._logger.info("Indexing candidate papers in Elasticsearch.")
@@ -45,9 +62,9 @@ class PrevCitedTopicSearchRecommender(ArxivdigestRecommender):
                 *[s2.paper(arxiv_id=paper_id) for paper_id in paper_ids],
                 return_exceptions=True,
             )
-        paper_data = ArxivdigestConnector(
-            config.PREV_CITED_TOPIC_API_KEY
-        ).get_article_data(paper_ids)
+        paper_data = self.connector().get_article_data(paper_ids)
+        from elasticsearch.helpers import bulk
+
         bulk(
             self._es,
             (
@@ -84,15 +101,16 @@ class PrevCitedTopicSearchRecommender(ArxivdigestRecommender):
             index=config.PREV_CITED_TOPIC_INDEX, body=query, size=10000, _source=False
         )["hits"]["hits"]
 
-    async def citation_counts(self, s2_id: str) -> DefaultDict[str, int]:
+    async def citation_counts(self, s2_id: str) -> CitationProfile:
         if s2_id not in self._citation_counts:
             async with SemanticScholar() as s2:
-                papers = await s2.author_papers(s2_id)
-            for paper in papers:
-                for reference in paper["references"]:
-                    for author in reference["authors"]:
-                        if author["authorId"]:
-                            self._citation_counts[s2_id][author["authorId"]] += 1
+                profile = await stream_citation_author_representation(
+                    self._cited_authors,
+                    s2.iter_author_papers(
+                        s2_id, max_papers=self._plan.max_author_papers
+                    ),
+                )
+            self._citation_counts[s2_id] = profile
         return self._citation_counts[s2_id]
 
     def topic_scores(
@@ -111,6 +129,17 @@ class PrevCitedTopicSearchRecommender(ArxivdigestRecommender):
             }
         return self._topic_scores[user_s2_id]
 
+    def paper_fingerprint(self, paper: dict) -> str:
+        # Papers are matched with the user's topics by the fields they are indexed with.
+        return paper_fingerprint(
+            paper,
+            paper["title"],
+            paper["abstract"],
+            paper["fieldsOfStudy"],
+            # Topics are not available from the Graph API.
+            [t["topic"] for t in paper.get("topics") or []],
+        )
+
     async def score_paper(self, user, user_s2_id, paper_id):
         async with SemanticScholar() as s2:
             paper = await s2.paper(arxiv_id=paper_id)
@@ -122,7 +151,7 @@ class PrevCitedTopicSearchRecommender(ArxivdigestRecommender):
         citation_counts = await self.citation_counts(user_s2_id)
         top_topics = sorted(
             [
-                (topic, paper_scores[paper_id])
+                (topic, paper_scores.get(paper_id, 0))
                 for topic, paper_scores in topic_scores.items()
             ],
             key=lambda t: t[1],
@@ -152,5 +181,4 @@ class PrevCitedTopicSearchRecommender(ArxivdigestRecommender):
 
 
 if __name__ == "__main__":
-    recommender = PrevCitedTopicSearchRecommender()
-    asyncio.run(recommender.recommend())
+    run(PrevCitedTopicSearchRecommender())
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.metrics import metrics
+from arxivdigest_recommenders.log import get_logger
+
+logger = get_logger(__name__, "Profiler")
+
+# Frames of the event loop machinery that sit between the loop and the coroutine of the running task.
+_LOOP_FRAMES = {"_run_once", "_run", "__step", "__step_run_and_handle_result"}
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    # Qualified names are only available in Python 3.11+.
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class CpuSampler:
+    """Samples the stack of the thread running the event loop from a background thread.
+
+    Samples are attributed to the task that is running when they are taken: the frames of the event loop machinery
+    are replaced with the name of the task's coroutine, so that time spent in coroutines is grouped by the task they
+    run in. Samples taken while the loop waits for I/O are attributed to "<idle>".
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, interval: float):
+        """
+        :param loop: Event loop. It must run in the thread that creates the sampler.
+        :param interval: Time between samples in seconds.
+        """
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._loop = loop
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._sample_loop, name="cpu-sampler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[self._stack(frame)] += 1
+
+    def _stack(self, frame) -> Tuple[str, ...]:
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        task = asyncio.current_task(self._loop)
+        if task is None and frames[-1].f_code.co_name in ("select", "poll", "control"):
+            return ("<idle>",)
+        # The frames from the start of the thread up to the task step or callback are event loop machinery.
+        names = [frame.f_code.co_name for frame in frames]
+        if "_run_once" in names:
+            start = names.index("_run_once")
+            while start < len(frames) and names[start] in _LOOP_FRAMES:
+                start += 1
+            frames = frames[start:]
+        root = (
+            "<callback>" if task is None else f"<task {task.get_coro().__qualname__}>"
+        )
+        return (root,) + tuple(_frame_name(frame) for frame in frames)
+
+    def top(self, n: int) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        """Get the functions with the most samples.
+
+        :param n: Number of functions.
+        :return: Functions with the most samples where they were running (self) and where they were on the stack
+        (inclusive), with their sample counts.
+        """
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for name in set(stack):
+                inclusive[name] += count
+        return own.most_common(n), inclusive.most_common(n)
+
+    def write(self, path: str):
+        """Write the samples as collapsed stacks, which flame graph tools (e.g., flamegraph.pl and speedscope) read.
+
+        :param path: Path of the file.
+        """
+        with open(path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{';'.join(stack)} {count}\n")
+
+
+class LoopLagMonitor:
+    """Measures how late a coroutine that sleeps at a fixed interval wakes up, which is how long the event loop was
+    blocked by other work."""
+
+    def __init__(self, interval: float):
+        """
+        :param interval: Time between measurements in seconds.
+        """
+        self.interval = interval
+        self.lags: List[Tuple[float, float]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._start = time.monotonic()
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._monitor())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _monitor(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - start - self.interval, 0.0)
+            metrics.observe("loop_lag_seconds", lag)
+            self.lags.append((start - self._start, lag))
+
+    def stalls(self, n: int) -> List[Tuple[float, float]]:
+        """Get the longest stalls of the event loop.
+
+        :param n: Number of stalls.
+        :return: Time since the monitor started and lag of each stall, in seconds.
+        """
+        return sorted(self.lags, key=lambda lag: lag[1], reverse=True)[:n]
+
+    def write(self, path: str, top: int):
+        lags = sorted(lag for _, lag in self.lags)
+        with open(path, "w") as file:
+            json.dump(
+                {
+                    "interval": self.interval,
+                    "count": len(lags),
+                    "mean": sum(lags) / len(lags) if lags else 0.0,
+                    "p99": lags[int(len(lags) * 0.99)] if lags else 0.0,
+                    "max": lags[-1] if lags else 0.0,
+                    "stalls": [
+                        {"offset": offset, "lag": lag}
+                        for offset, lag in self.stalls(top)
+                    ],
+                },
+                file,
+                indent=2,
+            )
+
+
+class Profiler:
+    """Profiles a run with a CPU sampler, tracemalloc snapshots at user batch boundaries, and an event loop lag
+    monitor, as configured in the profiling config.
+
+    Artifacts are written to a directory per run when the profiler stops, and a summary of the top entries of each
+    profile is logged.
+    """
+
+    def __init__(self, name: str):
+        """
+        :param name: Name of the profiled run, used as the prefix of its artifact directory.
+        """
+        self.directory = os.path.join(
+            config.PROFILING_DIR, f"{name}-{datetime.now():%Y%m%d-%H%M%S}"
+        )
+        self._sampler: Optional[CpuSampler] = None
+        self._monitor: Optional[LoopLagMonitor] = None
+        self._first_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._last_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._batches = 0
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *err):
+        await self.stop()
+
+    async def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if config.PROFILING_SAMPLE_INTERVAL:
+            self._sampler = CpuSampler(
+                asyncio.get_running_loop(), config.PROFILING_SAMPLE_INTERVAL
+            )
+            self._sampler.start()
+        if config.PROFILING_LOOP_LAG_INTERVAL:
+            self._monitor = LoopLagMonitor(config.PROFILING_LOOP_LAG_INTERVAL)
+            self._monitor.start()
+        if config.PROFILING_TRACEMALLOC_FRAMES and not tracemalloc.is_tracing():
+            tracemalloc.start(config.PROFILING_TRACEMALLOC_FRAMES)
+            self._first_snapshot = self._snapshot()
+        logger.info("Profiling to %s.", self.directory)
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        # Snapshots are not filtered here, since filtering every trace takes longer than taking the snapshot.
+        return tracemalloc.take_snapshot()
+
+    def batch_boundary(self):
+        """Take a memory snapshot after a user batch has been processed."""
+        self._batches += 1
+        if self._first_snapshot is None:
+            return
+        self._last_snapshot = self._snapshot()
+        self._last_snapshot.dump(
+            os.path.join(self.directory, f"batch-{self._batches:04d}.tracemalloc")
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        logger.debug(
+            "Batch %d: %.1f MB traced (peak %.1f MB).",
+            self._batches,
+            current / 2**20,
+            peak / 2**20,
+        )
+
+    async def stop(self):
+        """Stop profiling, write the artifacts, and log a summary."""
+        lines = []
+        top = config.PROFILING_TOP
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler.write(os.path.join(self.directory, "cpu.folded"))
+            samples = sum(self._sampler.stacks.values())
+            own, inclusive = self._sampler.top(top)
+            lines.append(f"CPU samples ({samples} samples), by self time:")
+            lines.extend(
+                f"  {count / samples:6.1%} {name}" for name, count in own if samples
+            )
+            lines.append("CPU samples, by inclusive time:")
+            lines.extend(
+                f"  {count / samples:6.1%} {name}"
+                for name, count in inclusive
+                if samples
+            )
+        if self._monitor is not None:
+            await self._monitor.stop()
+            self._monitor.write(os.path.join(self.directory, "loop_lag.json"), top)
+            lines.append("Longest event loop stalls:")
+            lines.extend(
+                f"  {lag * 1000:8.1f} ms at {offset:.1f} s"
+                for offset, lag in self._monitor.stalls(top)
+            )
+        if self._first_snapshot is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append(
+                f"Memory: {current / 2 ** 20:.1f} MB traced (peak {peak / 2 ** 20:.1f} MB), "
+                f"largest growth since the start of the run:"
+            )
+            last = self._last_snapshot or self._snapshot()
+            stats = [
+                stat
+                for stat in last.compare_to(self._first_snapshot, "lineno")
+                if stat.traceback[0].filename != tracemalloc.__file__
+            ]
+            lines.extend(f"  {stat}" for stat in stats[:top])
+            tracemalloc.stop()
+        with open(os.path.join(self.directory, "summary.txt"), "w") as file:
+            file.write("\n".join(lines) + "\n")
+        for line in lines:
+            logger.info("%s", line)
+        logger.info("Profiling artifacts written to %s.", self.directory)
@@ -1,20 +1,61 @@
+import argparse
 import asyncio
+import logging
+import os
+import socket
+import sys
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Sequence, Optional
-from arxivdigest.connector import ArxivdigestConnector
+from typing import List, Dict, Any, Sequence, Optional, Set, Tuple, TYPE_CHECKING
 
 from arxivdigest_recommenders import config
 from arxivdigest_recommenders.semantic_scholar import SemanticScholar
-from arxivdigest_recommenders.util import extract_s2_id, chunks
+from arxivdigest_recommenders.planner import RunPlan, plan_run
+from arxivdigest_recommenders.author_representation import AuthorInterner
+from arxivdigest_recommenders.prefetch import prefetch
+from arxivdigest_recommenders.checkpoint import Checkpoint
+from arxivdigest_recommenders.cassette import get_cassette
+from arxivdigest_recommenders.metrics import (
+    metrics,
+    summary,
+    write_metrics,
+    InstrumentedConnector,
+)
+from arxivdigest_recommenders.profiling import Profiler
+from arxivdigest_recommenders.parallel import worker_pool, recommend_batch
+from arxivdigest_recommenders.work_queue import Lease, WorkQueue, RedisWorkQueue
+from arxivdigest_recommenders.score_store import (
+    ScoreStore,
+    fingerprint,
+    paper_fingerprint,
+)
+from arxivdigest_recommenders.util import (
+    extract_s2_id,
+    get_user_s2_ids,
+    chunks,
+    LRUCache,
+)
 from arxivdigest_recommenders.log import get_logger
 
+if TYPE_CHECKING:
+    from arxivdigest.connector import ArxivdigestConnector
+
 
 class ArxivdigestRecommender(ABC):
     """Base class for arXivDigest recommender systems."""
 
+    # Whether scoring needs the papers of the authors of candidate papers and of the users' collaborators. Used to
+    # estimate the amount of data needed for a run.
+    _uses_candidate_authors = False
+    _uses_collaborators = False
+
     def __init__(self, arxivdigest_api_key: str, name: str):
         self._arxivdigest_api_key = arxivdigest_api_key
+        self._name = name
         self._logger = get_logger(name, name)
+        self._plan = RunPlan()
+        self._score_store = ScoreStore(name, SemanticScholar.cache_backend())
+        self._background_scoring: Set[asyncio.Future] = set()
 
     @abstractmethod
     async def score_paper(
@@ -32,27 +73,158 @@ class ArxivdigestRecommender(ABC):
         """
         pass
 
+    def user_fingerprint(self, user: dict, author: dict) -> str:
+        """Create a fingerprint of the user data that paper scores are based on.
+
+        Stored scores of a user are discarded when the fingerprint of the user changes.
+
+        :param user: User data.
+        :param author: S2 author metadata of the user.
+        :return: Fingerprint.
+        """
+        return fingerprint(
+            SemanticScholar.recent_paper_ids(
+                author, max_papers=self._plan.max_author_papers
+            ),
+            sorted(user.get("topics", [])),
+            # The limits also apply to the authors of candidate papers, so scores depend on them even if the user's
+            # own papers are not affected.
+            self._plan.max_paper_authors,
+            self._plan.max_author_papers,
+        )
+
+    def paper_fingerprint(self, paper: dict) -> str:
+        """Create a fingerprint of the paper data that the scores of a paper are based on, i.e., its set of authors by
+        default. Recommenders whose scores depend on other paper metadata should add it to the fingerprint.
+
+        Stored scores of a paper are discarded when the fingerprint of the paper changes. Changes to the other papers of
+        the paper's authors are not part of the fingerprint, and are only picked up once the stored scores expire.
+
+        :param paper: S2 paper metadata.
+        :return: Fingerprint.
+        """
+        return paper_fingerprint(paper)
+
+    async def _score_paper(
+        self, user: dict, user_s2_id: str, paper_id: str
+    ) -> Optional[Dict[str, Any]]:
+        with metrics.timer("score_paper_seconds", recommender=self._name):
+            return await self.score_paper(user, user_s2_id, paper_id)
+
+    def _background_scoring_done(self, task: asyncio.Future):
+        self._background_scoring.discard(task)
+        # Retrieve the exception so that it is not logged as never retrieved.
+        if not task.cancelled():
+            task.exception()
+
+    async def wait_for_background_scoring(self):
+        """Wait for the scoring that was left running when user time budgets ran out to finish."""
+        await asyncio.gather(*self._background_scoring, return_exceptions=True)
+
+    def _partial_ranking(self, user_s2_id: str, unscored: int):
+        metrics.increment("partial_rankings", recommender=self._name)
+        metrics.increment("unscored_papers", unscored, recommender=self._name)
+        self._logger.warning(
+            "User %s: time budget ran out with %d papers left unscored.",
+            user_s2_id,
+            unscored,
+        )
+
     async def user_ranking(
         self, user: dict, user_s2_id: str, paper_ids: Sequence[str], batch_size=10
     ) -> List[Dict[str, Any]]:
         """Generate ranking of papers for a user.
 
+        If incremental runs are enabled, papers are only scored if they have not been scored for the user before, or
+        if the user or the paper has changed since they were scored.
+
+        If a user time budget is configured and it runs out, the ranking only contains the papers scored so far. The
+        papers that are still being scored when it runs out are scored in the background, and are not stored, so that
+        they are scored again next time.
+
         :param user: User data.
         :param user_s2_id: S2 author ID of the user.
         :param paper_ids: arXiv IDs of papers.
         :param batch_size: Number of papers scored concurrently.
         :return: Ranking of candidate papers.
         """
-        results = []
-        for paper_id_chunk in chunks(paper_ids, 5):
-            chunk_results = await asyncio.gather(
-                *[self.score_paper(user, user_s2_id, p) for p in paper_id_chunk],
-                return_exceptions=True
+        stored_scores = {}
+        paper_fingerprints = {}
+        if config.INCREMENTAL_ENABLED:
+            async with SemanticScholar() as s2:
+                user_fingerprint = self.user_fingerprint(
+                    user, await s2.author(user_s2_id)
+                )
+                papers = await asyncio.gather(
+                    *[s2.paper(arxiv_id=paper_id) for paper_id in paper_ids],
+                    return_exceptions=True,
+                )
+            paper_fingerprints = {
+                paper_id: self.paper_fingerprint(paper)
+                for paper_id, paper in zip(paper_ids, papers)
+                if not isinstance(paper, BaseException)
+            }
+            stored_scores = {
+                paper_id: (stored_fingerprint, result)
+                for paper_id, (stored_fingerprint, result) in (
+                    await self._score_store.load(user_s2_id, user_fingerprint)
+                ).items()
+                if paper_fingerprints.get(paper_id) == stored_fingerprint
+            }
+            self._logger.debug(
+                "User %s: reusing %d stored scores.", user_s2_id, len(stored_scores)
             )
-            results.extend(
-                r for r in chunk_results if isinstance(r, dict) and r["score"] > 0
+        scores = dict(stored_scores)
+        unscored = [p for p in paper_ids if p not in stored_scores]
+        deadline = (
+            None
+            if config.USER_TIME_BUDGET is None
+            else time.monotonic() + config.USER_TIME_BUDGET
+        )
+        finished = 0
+        for paper_id_chunk in chunks(unscored, 5):
+            timeout = None if deadline is None else deadline - time.monotonic()
+            if timeout is not None and timeout <= 0:
+                self._partial_ranking(user_s2_id, len(unscored) - finished)
+                break
+            tasks = [
+                asyncio.ensure_future(self._score_paper(user, user_s2_id, p))
+                for p in paper_id_chunk
+            ]
+            try:
+                _, pending = await asyncio.wait(tasks, timeout=timeout)
+            except asyncio.CancelledError:
+                for task in tasks:
+                    task.cancel()
+                raise
+            for paper_id, task in zip(paper_id_chunk, tasks):
+                # Papers that could not be scored because of errors are left out, so that they are retried next time.
+                if task in pending or task.cancelled() or task.exception() is not None:
+                    continue
+                result = task.result()
+                if not isinstance(result, dict) or result["score"] <= 0:
+                    result = None
+                scores[paper_id] = (paper_fingerprints.get(paper_id), result)
+            finished += len(tasks) - len(pending)
+            if pending:
+                # The papers that are still being scored are left out of the ranking, but the scoring keeps running
+                # so that the data it fetches is cached for the next users and runs.
+                for task in pending:
+                    self._background_scoring.add(task)
+                    task.add_done_callback(self._background_scoring_done)
+                self._partial_ranking(user_s2_id, len(unscored) - finished)
+                break
+        if config.INCREMENTAL_ENABLED:
+            await self._score_store.save(
+                user_s2_id,
+                user_fingerprint,
+                {
+                    paper_id: entry
+                    for paper_id, entry in scores.items()
+                    if paper_id in paper_fingerprints
+                },
             )
-        return results
+        return [result for _, result in scores.values() if result is not None]
 
     async def recommendations(
         self,
@@ -60,6 +232,7 @@ class ArxivdigestRecommender(ABC):
         interleaved_papers: dict,
         paper_ids: Sequence[str],
         max_recommendations=10,
+        checkpoint: Optional[Checkpoint] = None,
     ) -> Dict[str, List[Dict[str, Any]]]:
         """Generate recommendations for a user batch.
 
@@ -68,10 +241,16 @@ class ArxivdigestRecommender(ABC):
         before submission.
         :param paper_ids: arXiv IDs of candidate papers.
         :param max_recommendations: Max number of recommendations per user.
+        :param checkpoint: Run checkpoint. Users that have already been processed according to the checkpoint are
+        skipped, and the checkpoint is updated as users are processed.
         :return: Recommendations.
         """
         recommendations = {}
         for user_id, user_data in users.items():
+            if checkpoint is not None and str(user_id) in checkpoint.processed_users:
+                if str(user_id) in checkpoint.pending:
+                    recommendations[user_id] = checkpoint.pending[str(user_id)]
+                continue
             s2_id = extract_s2_id(user_data)
             if s2_id is None:
                 self._logger.info("User %s: skipped (no S2 ID provided).", user_id)
@@ -82,12 +261,14 @@ class ArxivdigestRecommender(ABC):
                     await s2.author(s2_id)
             except Exception:
                 self._logger.error(
-                    "User %: unable to get author details for S2 ID %s.", user_id, s2_id
+                    "User %s: unable to get author details for S2 ID %s.", user_id, s2_id
                 )
                 continue
+            with metrics.timer("user_ranking_seconds", recommender=self._name):
+                user_ranking = await self.user_ranking(user_data, s2_id, paper_ids)
             user_ranking = [
                 r
-                for r in await self.user_ranking(user_data, s2_id, paper_ids)
+                for r in user_ranking
                 if r["article_id"] not in interleaved_papers[user_id]
             ]
             user_recommendations = sorted(
@@ -97,48 +278,581 @@ class ArxivdigestRecommender(ABC):
                 "User %s: recommended %d papers.", user_id, len(user_recommendations)
             )
             recommendations[user_id] = user_recommendations
+            if checkpoint is not None:
+                checkpoint.user_processed(str(user_id), user_recommendations)
         return {
             user_id: user_recommendations
             for user_id, user_recommendations in recommendations.items()
             if len(user_recommendations) > 0
         }
 
+    def memory_usage(self) -> Dict[str, Tuple[int, int]]:
+        """Get the approximate memory footprint of the in-memory caches used by the recommender.
+
+        :return: Approximate size in bytes and number of entries of each cache.
+        """
+        usage = {}
+        for name, value in vars(self).items():
+            if isinstance(value, LRUCache):
+                usage[name] = (value.size, len(value))
+            elif isinstance(value, AuthorInterner):
+                usage[name] = (sys.getsizeof(value), len(value))
+        if SemanticScholar._errors is not None:
+            usage["SemanticScholar._errors"] = (
+                SemanticScholar._errors.size,
+                len(SemanticScholar._errors),
+            )
+        return usage
+
+    def _log_memory_usage(self, level=logging.DEBUG):
+        if not self._logger.isEnabledFor(level):
+            return
+        for name, (size, entries) in self.memory_usage().items():
+            self._logger.log(
+                level,
+                "Memory usage of %s: %.1f MB (%d entries).",
+                name,
+                size / 2 ** 20,
+                entries,
+            )
+        self._logger.log(
+            level,
+            "%d Semantic Scholar requests in flight.",
+            len(SemanticScholar._locks),
+        )
+
+    async def plan(
+        self,
+        connector: "ArxivdigestConnector",
+        paper_ids: Sequence[str],
+        total_users: int,
+    ) -> RunPlan:
+        """Plan a run so that it finishes within the configured deadline.
+
+        :param connector: arXivDigest connector.
+        :param paper_ids: arXiv IDs of candidate papers.
+        :param total_users: Number of users.
+        :return: Run plan.
+        """
+        return await plan_run(
+            paper_ids,
+            get_user_s2_ids(connector, total_users),
+            self._uses_candidate_authors,
+            self._uses_collaborators,
+        )
+
+    def connector(self) -> "ArxivdigestConnector":
+        """Create an arXivDigest connector for the recommender system. The connector's calls are recorded or replayed
+        if a cassette is configured, and their latencies are recorded in the run metrics.
+
+        :return: arXivDigest connector.
+        """
+        from arxivdigest.connector import ArxivdigestConnector
+
+        connector = ArxivdigestConnector(
+            self._arxivdigest_api_key, config.ARXIVDIGEST_BASE_URL
+        )
+        cassette = get_cassette()
+        if cassette is not None:
+            connector = cassette.connector(connector)
+        return InstrumentedConnector(connector)
+
+    async def recommend_batch(
+        self,
+        connector: "ArxivdigestConnector",
+        user_ids: List[str],
+        paper_ids: Sequence[str],
+        prefetch_papers=False,
+        checkpoint: Optional[Checkpoint] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Generate recommendations for a user batch, prefetching the data needed for the batch if enabled.
+
+        :param connector: arXivDigest connector.
+        :param user_ids: User IDs.
+        :param paper_ids: arXiv IDs of candidate papers.
+        :param prefetch_papers: Also prefetch the candidate papers (and their authors).
+        :param checkpoint: Run checkpoint.
+        :return: Recommendations.
+        """
+        users = connector.get_user_info(user_ids)
+        interleaved = connector.get_interleaved_articles(user_ids)
+        if config.PREFETCH_ENABLED:
+            await prefetch(
+                paper_ids if prefetch_papers else [],
+                [
+                    s2_id
+                    for s2_id in (extract_s2_id(user) for user in users.values())
+                    if s2_id is not None
+                ],
+                self._uses_candidate_authors,
+                self._uses_collaborators,
+                self._plan,
+            )
+        return await self.recommendations(
+            users, interleaved, paper_ids, checkpoint=checkpoint
+        )
+
+    def _checkpoint_path(self) -> str:
+        return os.path.join(config.CHECKPOINT_DIR, f"{self._name}.json")
+
+    def _log_stats(
+        self,
+        stats: Dict[str, int],
+        start_time: float,
+    ):
+        for line in summary():
+            self._logger.debug("Time spent on %s.", line)
+        write_metrics(
+            recommender=self._name,
+            seconds=time.monotonic() - start_time,
+            semantic_scholar=stats,
+        )
+        self._logger.info(
+            "Semantic Scholar API: %d cache hits (%d stale), %d cache misses, %d requests, and %d errors.",
+            stats["cache_hits"],
+            stats["stale_cache_hits"],
+            stats["cache_misses"],
+            stats["requests"],
+            stats["errors"],
+        )
+        if config.PLANNER_ENABLED:
+            self._logger.info(
+                "Estimated %d requests and %d seconds, needed %d requests and %d seconds.",
+                self._plan.estimated_requests,
+                self._plan.estimated_seconds,
+                stats["requests"],
+                time.monotonic() - start_time,
+            )
+
     async def recommend(
-        self, submit_recommendations=True
+        self, submit_recommendations=True, resume=False, profile: Optional[bool] = None
     ) -> Dict[str, List[Dict[str, Any]]]:
         """Generate and submit recommendations for all users.
 
         :param submit_recommendations: Submit recommendations to arXivDigest.
+        :param resume: Resume the last run from its checkpoint, reusing its candidate papers and skipping the users
+        that were processed before it was interrupted.
+        :param profile: Profile the run as configured in the profiling config. Defaults to the enabled setting of the
+        profiling config.
         :return: Recommendations.
         """
-        connector = ArxivdigestConnector(
-            self._arxivdigest_api_key, config.ARXIVDIGEST_BASE_URL
-        )
-        paper_ids = connector.get_article_ids()
+        if profile is None:
+            profile = config.PROFILING_ENABLED
+        if not profile:
+            return await self._recommend(submit_recommendations, resume)
+        async with Profiler(self._name) as profiler:
+            return await self._recommend(submit_recommendations, resume, profiler)
+
+    async def _recommend(
+        self,
+        submit_recommendations: bool,
+        resume: bool,
+        profiler: Optional[Profiler] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        connector = self.connector()
+        checkpoint = None
+        if resume and config.CHECKPOINT_DIR is None:
+            self._logger.warning(
+                "Checkpointing is disabled, so there is no checkpoint to resume from."
+            )
+        elif resume:
+            checkpoint = Checkpoint.load(self._checkpoint_path())
+            if checkpoint is None:
+                self._logger.warning("No checkpoint to resume from.")
+        if checkpoint is not None:
+            paper_ids = checkpoint.paper_ids
+            self._logger.info("Resuming from user %d.", checkpoint.user_offset)
+        else:
+            paper_ids = connector.get_article_ids()
+            if config.CHECKPOINT_DIR is not None:
+                if os.path.exists(self._checkpoint_path()):
+                    self._logger.warning(
+                        "Overwriting the checkpoint of an interrupted run at %s. Use --resume to resume it instead.",
+                        self._checkpoint_path(),
+                    )
+                checkpoint = Checkpoint(self._checkpoint_path(), paper_ids)
+                checkpoint.save()
         total_users = connector.get_number_of_users()
         self._logger.info(
             "%d candidate papers and %d users.", len(paper_ids), total_users
         )
-        recommendation_count = 0
+        if config.PLANNER_ENABLED:
+            self._plan = await self.plan(connector, paper_ids, total_users)
+        start_time = time.monotonic()
+        start_requests = SemanticScholar.requests
+        recommendation_count = 0 if checkpoint is None else checkpoint.user_offset
         recommendations = {}
+        prefetch_papers = True
         while recommendation_count < total_users:
             user_ids = connector.get_user_ids(recommendation_count)
-            users = connector.get_user_info(user_ids)
-            interleaved = connector.get_interleaved_articles(user_ids)
-            batch_recommendations = await self.recommendations(
-                users, interleaved, paper_ids
+            batch_recommendations = await self.recommend_batch(
+                connector, user_ids, paper_ids, prefetch_papers, checkpoint
             )
+            # Candidate papers and their authors only need to be prefetched once.
+            prefetch_papers = False
             recommendations.update(batch_recommendations)
             if batch_recommendations and submit_recommendations:
                 connector.send_article_recommendations(batch_recommendations)
             recommendation_count += len(user_ids)
+            if checkpoint is not None:
+                checkpoint.batch_submitted(len(user_ids))
+            if profiler is not None:
+                profiler.batch_boundary()
             self._logger.info("Processed %d users.", recommendation_count)
+            self._log_memory_usage()
         self._logger.info("Finished recommending.")
+        if checkpoint is not None:
+            checkpoint.delete()
+        self._log_memory_usage(logging.INFO)
+        await self.wait_for_background_scoring()
+        await SemanticScholar.wait_for_refreshes()
+        self._log_stats(
+            {
+                "requests": SemanticScholar.requests - start_requests,
+                "cache_hits": SemanticScholar.cache_hits,
+                "stale_cache_hits": SemanticScholar.stale_cache_hits,
+                "cache_misses": SemanticScholar.cache_misses,
+                "errors": SemanticScholar.errors,
+            },
+            start_time,
+        )
+        return recommendations
+
+    async def recommend_parallel(
+        self, workers: int, submit_recommendations=True
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Generate and submit recommendations for all users, dividing the user batches between worker processes.
+
+        The worker processes share the Semantic Scholar rate limit and use the configured cache backend, while
+        recommendations are submitted by this process as each batch finishes.
+
+        :param workers: Number of worker processes.
+        :param submit_recommendations: Submit recommendations to arXivDigest.
+        :return: Recommendations.
+        """
+        connector = self.connector()
+        paper_ids = connector.get_article_ids()
+        total_users = connector.get_number_of_users()
         self._logger.info(
-            "Semantic Scholar API: %d cache hits, %d cache misses, %d requests, and %d errors.",
-            SemanticScholar.cache_hits,
-            SemanticScholar.cache_misses,
-            SemanticScholar.requests,
-            SemanticScholar.errors,
+            "%d candidate papers and %d users, using %d workers.",
+            len(paper_ids),
+            total_users,
+            workers,
+        )
+        if config.PLANNER_ENABLED:
+            self._plan = await self.plan(connector, paper_ids, total_users)
+        start_time = time.monotonic()
+        if config.PREFETCH_ENABLED:
+            # The candidate papers are prefetched before the workers start, so that the workers do not all fetch them.
+            await prefetch(
+                paper_ids, [], self._uses_candidate_authors, False, self._plan
+            )
+        batches = []
+        user_count = 0
+        while user_count < total_users:
+            batches.append(connector.get_user_ids(user_count))
+            user_count += len(batches[-1])
+        recommendations = {}
+        # The stats of a worker are cumulative, so only the latest stats of each worker are kept.
+        worker_stats = {}
+        with worker_pool(type(self), workers, paper_ids, self._plan) as pool:
+            for i, batch in enumerate(
+                asyncio.as_completed(
+                    [recommend_batch(pool, user_ids) for user_ids in batches]
+                ),
+                1,
+            ):
+                batch_recommendations, stats = await batch
+                recommendations.update(batch_recommendations)
+                if batch_recommendations and submit_recommendations:
+                    connector.send_article_recommendations(batch_recommendations)
+                worker_stats[stats.pop("pid")] = stats
+                self._logger.info("Processed %d of %d user batches.", i, len(batches))
+        self._logger.info("Finished recommending.")
+        for stats in worker_stats.values():
+            metrics.merge(stats.pop("metrics"))
+        self._log_stats(
+            {
+                key: sum(stats[key] for stats in worker_stats.values())
+                for key in (
+                    "requests",
+                    "cache_hits",
+                    "stale_cache_hits",
+                    "cache_misses",
+                    "errors",
+                )
+            },
+            start_time,
         )
         return recommendations
+
+    def _work_queue(self) -> WorkQueue:
+        return RedisWorkQueue(f"{config.WORK_QUEUE_NAME}:{self._name}")
+
+    async def coordinate(
+        self, queue: Optional[WorkQueue] = None
+    ) -> List[Dict[str, Any]]:
+        """Coordinate a distributed run by queueing the user batches for workers to lease, and collecting the stats
+        reported by the workers until all batches have been processed.
+
+        :param queue: Work queue. Defaults to a Redis work queue for the recommender system.
+        :return: Batch stats reported by the workers.
+        """
+        queue = queue or self._work_queue()
+        connector = self.connector()
+        paper_ids = connector.get_article_ids()
+        total_users = connector.get_number_of_users()
+        self._logger.info(
+            "%d candidate papers and %d users.", len(paper_ids), total_users
+        )
+        if config.PLANNER_ENABLED:
+            self._plan = await self.plan(connector, paper_ids, total_users)
+        offsets = []
+        user_count = 0
+        while user_count < total_users:
+            offsets.append(user_count)
+            user_count += len(connector.get_user_ids(user_count))
+        await queue.reset()
+        await queue.put([{"offset": offset, "attempts": 0} for offset in offsets])
+        # The context is set after the batches are queued, since workers stop once the context is set and the queue
+        # is empty.
+        await queue.set_context(
+            {"paper_ids": list(paper_ids), "plan": self._plan._asdict()}
+        )
+        self._logger.info("Queued %d user batches.", len(offsets))
+        reports = []
+        while True:
+            # Workers report batches before completing them, so every report has arrived once nothing is pending, as
+            # long as the pending batches are counted before the reports are read.
+            pending = await queue.pending()
+            requeued = await queue.requeue_expired()
+            if requeued:
+                self._logger.warning("Requeued %d expired user batches.", requeued)
+            for report in await queue.reports():
+                self._logger.info(
+                    "Batch %d (%s, %d previous attempts): %s.",
+                    report["offset"],
+                    report["worker"],
+                    report["attempts"],
+                    report["status"],
+                )
+                reports.append(report)
+            if pending == 0:
+                break
+            await asyncio.sleep(config.WORK_QUEUE_POLL_INTERVAL)
+        # A batch is reported twice if its lease expired while it was processed and another worker processed it again.
+        done = list(
+            {
+                report["offset"]: report
+                for report in reports
+                if report["status"] == "done"
+            }.values()
+        )
+        self._logger.info(
+            "Finished recommending: %d of %d user batches done, %d users, %d recommendations, and %d Semantic Scholar "
+            "requests.",
+            len(done),
+            len(offsets),
+            sum(report["users"] for report in done),
+            sum(report["recommendations"] for report in done),
+            sum(report["requests"] for report in done),
+        )
+        return reports
+
+    async def _keep_lease(self, queue: WorkQueue, lease: Lease):
+        # The lease is extended a few times per visibility timeout while the batch is processed, so that batches that
+        # take longer than the timeout are not handed to other workers, while the batches of workers that die are
+        # still requeued within the timeout.
+        while True:
+            await asyncio.sleep(config.WORK_QUEUE_VISIBILITY_TIMEOUT / 3)
+            try:
+                extended = await queue.extend(
+                    lease, config.WORK_QUEUE_VISIBILITY_TIMEOUT
+                )
+            except Exception:
+                self._logger.exception(
+                    "Batch %d: failed to extend the lease.", lease.item["offset"]
+                )
+                continue
+            if not extended:
+                self._logger.warning(
+                    "Batch %d: lease expired before it was extended.",
+                    lease.item["offset"],
+                )
+                return
+
+    async def work(
+        self, queue: Optional[WorkQueue] = None, submit_recommendations=True
+    ):
+        """Process user batches leased from the work queue of a distributed run until all batches have been processed.
+
+        The recommendations for each batch are submitted by the worker, and batch stats are reported back to the
+        coordinator. Batches that fail are requeued until they have been attempted the configured number of times.
+
+        :param queue: Work queue. Defaults to a Redis work queue for the recommender system.
+        :param submit_recommendations: Submit recommendations to arXivDigest.
+        """
+        queue = queue or self._work_queue()
+        connector = self.connector()
+        context = await queue.get_context()
+        while context is None:
+            self._logger.info("Waiting for the coordinator.")
+            await asyncio.sleep(config.WORK_QUEUE_POLL_INTERVAL)
+            context = await queue.get_context()
+        paper_ids = context["paper_ids"]
+        self._plan = RunPlan(**context["plan"])
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        prefetch_papers = True
+        while True:
+            lease = await queue.lease(config.WORK_QUEUE_VISIBILITY_TIMEOUT)
+            if lease is None:
+                if await queue.requeue_expired() == 0 and await queue.pending() == 0:
+                    break
+                await asyncio.sleep(config.WORK_QUEUE_POLL_INTERVAL)
+                continue
+            offset = lease.item["offset"]
+            report = {
+                "worker": worker,
+                "offset": offset,
+                "attempts": lease.item["attempts"],
+            }
+            if lease.item["attempts"] >= config.WORK_QUEUE_MAX_ATTEMPTS:
+                self._logger.error(
+                    "Batch %d: giving up after %d attempts.",
+                    offset,
+                    lease.item["attempts"],
+                )
+                # Reports are sent before the lease is completed, so that the coordinator has received the report of
+                # each batch by the time it sees that no batches are pending.
+                await queue.report({**report, "status": "failed"})
+                await queue.complete(lease)
+                continue
+            start_time = time.monotonic()
+            start_requests = SemanticScholar.requests
+            start_errors = SemanticScholar.errors
+            heartbeat = asyncio.ensure_future(self._keep_lease(queue, lease))
+            try:
+                try:
+                    user_ids = connector.get_user_ids(offset)
+                    batch_recommendations = await self.recommend_batch(
+                        connector, user_ids, paper_ids, prefetch_papers
+                    )
+                    prefetch_papers = False
+                    if batch_recommendations and submit_recommendations:
+                        connector.send_article_recommendations(batch_recommendations)
+                finally:
+                    heartbeat.cancel()
+            except Exception:
+                self._logger.exception("Batch %d: failed.", offset)
+                await queue.report({**report, "status": "requeued"})
+                await queue.requeue(lease)
+                continue
+            await queue.report(
+                {
+                    **report,
+                    "status": "done",
+                    "users": len(user_ids),
+                    "recommendations": len(batch_recommendations),
+                    "seconds": time.monotonic() - start_time,
+                    "requests": SemanticScholar.requests - start_requests,
+                    "errors": SemanticScholar.errors - start_errors,
+                }
+            )
+            if not await queue.complete(lease):
+                # The batch has been requeued, so it may be processed and reported again.
+                self._logger.warning(
+                    "Batch %d: lease expired before the batch was finished.", offset
+                )
+            self._logger.info("Batch %d: done.", offset)
+        await self.wait_for_background_scoring()
+        await SemanticScholar.wait_for_refreshes()
+        self._logger.info("No user batches left.")
+        write_metrics(recommender=self._name, worker=worker)
+
+
+def run(recommender: ArxivdigestRecommender):
+    """Run a recommender system from the command line.
+
+    :param recommender: Recommender system.
+    """
+    parser = argparse.ArgumentParser(
+        description="Generate and submit recommendations for all arXivDigest users."
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="resume the last run from its checkpoint",
+    )
+    parser.add_argument(
+        "--no-submit",
+        action="store_true",
+        help="generate recommendations without submitting them",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of worker processes to divide the users between",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record",
+        metavar="PATH",
+        help="record Semantic Scholar responses and arXivDigest calls to a cassette",
+    )
+    cassette.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="replay Semantic Scholar responses and arXivDigest calls from a cassette",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile the run, writing CPU samples, memory snapshots, and event loop lag to the profiling directory",
+    )
+    role = parser.add_mutually_exclusive_group()
+    role.add_argument(
+        "--coordinator",
+        action="store_true",
+        help="coordinate a distributed run, queueing user batches for workers",
+    )
+    role.add_argument(
+        "--worker",
+        action="store_true",
+        help="process user batches leased from the queue of a distributed run",
+    )
+    args = parser.parse_args()
+    if args.record or args.replay:
+        config.CASSETTE_MODE = "record" if args.record else "replay"
+        config.CASSETTE_PATH = args.record or args.replay
+    if args.replay:
+        # The recommender was constructed before the cassette was configured, so its cache backend is replaced with
+        # the one used for replays.
+        SemanticScholar._cache = None
+        recommender._score_store = ScoreStore(
+            recommender._name, SemanticScholar.cache_backend()
+        )
+    if args.profile and (args.coordinator or args.worker or args.workers > 1):
+        parser.error("--profile can only be used with single-process runs")
+    if args.record and args.workers > 1:
+        parser.error("--record cannot be used with multiple workers")
+    if args.coordinator:
+        asyncio.run(recommender.coordinate())
+    elif args.worker:
+        asyncio.run(recommender.work(submit_recommendations=not args.no_submit))
+    elif args.workers > 1:
+        if args.resume:
+            parser.error("--resume cannot be used with multiple workers")
+        asyncio.run(
+            recommender.recommend_parallel(
+                args.workers, submit_recommendations=not args.no_submit
+            )
+        )
+    else:
+        asyncio.run(
+            recommender.recommend(
+                submit_recommendations=not args.no_submit,
+                resume=args.resume,
+                profile=args.profile or None,
+            )
+        )
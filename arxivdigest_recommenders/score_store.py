@@ -0,0 +1,110 @@
+import hashlib
+import json
+from datetime import date, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from arxivdigest_recommenders.semantic_scholar import CacheBackend
+from arxivdigest_recommenders import config
+
+
+def fingerprint(*values: Any) -> str:
+    """Create a short fingerprint of JSON-serializable values.
+
+    :param values: Values.
+    :return: Fingerprint.
+    """
+    return hashlib.sha1(
+        json.dumps(values, sort_keys=True, default=str).encode()
+    ).hexdigest()[:16]
+
+
+def paper_fingerprint(paper: dict, *inputs: Any) -> str:
+    """Create a fingerprint of the inputs to the scoring of a paper, i.e., its set of authors and any other metadata
+    that scores of the paper are based on.
+
+    :param paper: Paper metadata.
+    :param inputs: Other JSON-serializable score inputs (e.g., the venue of the paper).
+    :return: Fingerprint.
+    """
+    return fingerprint(
+        sorted(a["authorId"] or a["name"] for a in paper["authors"]), *inputs
+    )
+
+
+class ScoreStore:
+    """Persistent store of the scores a recommender has given candidate papers for its users.
+
+    The scores of a user are stored in a single cache backend entry together with a fingerprint of the user's profile.
+    Each score is stored together with a fingerprint of the scored paper.
+    """
+
+    def __init__(self, recommender: str, backend: CacheBackend):
+        """
+        :param recommender: Recommender name.
+        :param backend: Cache backend the scores are stored in.
+        """
+        self._recommender = recommender
+        self._backend = backend
+
+    def _key(self, user_s2_id: str) -> str:
+        return f"scores/{self._recommender}/{user_s2_id}"
+
+    async def load(
+        self, user_s2_id: str, user_fingerprint: str
+    ) -> Dict[str, Tuple[str, Optional[Dict[str, Any]]]]:
+        """Load the stored scores of a user.
+
+        :param user_s2_id: S2 author ID of the user.
+        :param user_fingerprint: Fingerprint of the user's current profile. Nothing is returned if the scores were
+        stored for a different profile.
+        :return: Paper fingerprint and result (None if the paper could not be scored) of each stored paper.
+        """
+        key = self._key(user_s2_id)
+        if not await self._backend.exists(key):
+            return {}
+        doc = await self._backend.get(key)
+        if (
+            date.fromisoformat(doc["expiration"]) < date.today()
+            or doc["data"]["user_fingerprint"] != user_fingerprint
+        ):
+            return {}
+        return {
+            entry["paper_id"]: (entry["fingerprint"], entry["result"])
+            for entry in doc["data"]["papers"]
+        }
+
+    async def save(
+        self,
+        user_s2_id: str,
+        user_fingerprint: str,
+        scores: Dict[str, Tuple[str, Optional[Dict[str, Any]]]],
+    ):
+        """Store the scores of a user, replacing any previously stored scores.
+
+        :param user_s2_id: S2 author ID of the user.
+        :param user_fingerprint: Fingerprint of the user's profile.
+        :param scores: Paper fingerprint and result (None if the paper could not be scored) of each paper.
+        """
+        await self._backend.set(
+            self._key(user_s2_id),
+            {
+                "expiration": (
+                    date.today() + timedelta(days=config.INCREMENTAL_EXPIRATION)
+                ).isoformat(),
+                "data": {
+                    "user_fingerprint": user_fingerprint,
+                    # Paper IDs contain dots, which are not allowed in MongoDB field names, so the scores are stored
+                    # as a list.
+                    "papers": [
+                        {
+                            "paper_id": paper_id,
+                            "fingerprint": paper_fingerprint,
+                            "result": None
+                            if result is None
+                            else {**result, "score": float(result["score"])},
+                        }
+                        for paper_id, (paper_fingerprint, result) in scores.items()
+                    ],
+                },
+            },
+        )
@@ -1,20 +1,39 @@
 import asyncio
 import json
+import os
+import random
+import re
+import time
+import uuid
 from abc import ABC, abstractmethod
-from aiohttp import ClientSession, ClientResponseError
-from motor.motor_asyncio import AsyncIOMotorClient
-from aioredis import Redis
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta, date
-from collections import defaultdict
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Dict, Tuple, TYPE_CHECKING
 
-from arxivdigest_recommenders.util import gather, AsyncRateLimiter
+from arxivdigest_recommenders.util import (
+    gather,
+    AsyncRateLimiter,
+    KeyedLocks,
+    LRUCache,
+    MicroBatcher,
+    BatchRequestError,
+)
+from arxivdigest_recommenders.executor import decode_json
+from arxivdigest_recommenders.cassette import Cassette, get_cassette
+from arxivdigest_recommenders.metrics import metrics
 from arxivdigest_recommenders.log import get_logger
 from arxivdigest_recommenders import config
 
 
+if TYPE_CHECKING:
+    from aiohttp import ClientSession
+
 logger = get_logger(__name__, "SemanticScholar")
 
+# Default argument that stands for a value in the config, so that the config file is not read on import and None keeps
+# its own meaning.
+_DEFAULT = object()
+
 
 class CacheBackend(ABC):
     @abstractmethod
@@ -29,6 +48,62 @@ class CacheBackend(ABC):
     async def set(self, key: str, value: dict):
         pass
 
+    async def get_many(self, keys: List[str]) -> List[Optional[dict]]:
+        """Get multiple entries.
+
+        Backends that support it fetch all of the entries in a single round trip.
+
+        :param keys: Keys.
+        :return: Entry of each key, or None if the key does not exist.
+        """
+
+        async def get(key: str) -> Optional[dict]:
+            return await self.get(key) if await self.exists(key) else None
+
+        return await asyncio.gather(*[get(key) for key in keys])
+
+    async def set_many(self, entries: Dict[str, dict]):
+        """Set multiple entries.
+
+        Backends that support it set all of the entries in a single round trip.
+
+        :param entries: Entries by key.
+        """
+        await asyncio.gather(*[self.set(key, value) for key, value in entries.items()])
+
+    def scan(
+        self, prefix: str = "", batch_size: int = 1000
+    ) -> AsyncIterator[Dict[str, dict]]:
+        """Iterate over the entries whose keys start with a prefix, in batches.
+
+        Entries that are set or deleted during the scan may or may not be included.
+
+        :param prefix: Key prefix.
+        :param batch_size: Number of entries per batch.
+        :return: Async iterator of batches of entries by key.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support scans.")
+
+    async def acquire_lease(self, key: str, ttl: float) -> Optional[str]:
+        """Try to lease a key, so that other processes that use the backend know that the key is being worked on.
+
+        A lease is held until it is released or until it expires, so that a key is not leased forever by a process
+        that dies while it holds the lease.
+
+        :param key: Key.
+        :param ttl: Time (in seconds) until the lease expires.
+        :return: Token of the lease, or None if the key is already leased.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support leases.")
+
+    async def release_lease(self, key: str, token: str):
+        """Release a lease. Nothing is released if the lease has expired and the key has been leased again since.
+
+        :param key: Key.
+        :param token: Token of the lease.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support leases.")
+
 
 class MongoDbBackend(CacheBackend):
     def __init__(self):
@@ -36,6 +111,8 @@ class MongoDbBackend(CacheBackend):
 
     def _set_up(self):
         if self._db is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
             self._db = AsyncIOMotorClient(config.MONGODB_HOST, config.MONGODB_PORT)[
                 config.S2_MONGODB_DB
             ]
@@ -58,48 +135,452 @@ class MongoDbBackend(CacheBackend):
             {"_id": key}, value, upsert=True
         )
 
+    async def get_many(self, keys: List[str]) -> List[Optional[dict]]:
+        self._set_up()
+        docs = {
+            doc["_id"]: doc
+            async for doc in self._db[config.S2_MONGODB_COLLECTION].find(
+                {"_id": {"$in": keys}}
+            )
+        }
+        return [docs.get(key) for key in keys]
+
+    async def set_many(self, entries: Dict[str, dict]):
+        from pymongo import ReplaceOne
+
+        self._set_up()
+        if entries:
+            await self._db[config.S2_MONGODB_COLLECTION].bulk_write(
+                [
+                    ReplaceOne({"_id": key}, value, upsert=True)
+                    for key, value in entries.items()
+                ],
+                ordered=False,
+            )
+
+    async def scan(self, prefix: str = "", batch_size: int = 1000):
+        self._set_up()
+        batch = {}
+        async for doc in self._db[config.S2_MONGODB_COLLECTION].find(
+            {"_id": {"$regex": f"^{re.escape(prefix)}"}}, batch_size=batch_size
+        ):
+            batch[doc.pop("_id")] = doc
+            if len(batch) == batch_size:
+                yield batch
+                batch = {}
+        if batch:
+            yield batch
+
+    async def acquire_lease(self, key: str, ttl: float) -> Optional[str]:
+        from pymongo.errors import DuplicateKeyError
+
+        self._set_up()
+        token = uuid.uuid4().hex
+        now = time.time()
+        try:
+            # An expired lease is taken over, and a missing one is inserted. The insert fails if the key is leased.
+            await self._db[f"{config.S2_MONGODB_COLLECTION}_leases"].update_one(
+                {"_id": key, "expires": {"$lte": now}},
+                {"$set": {"token": token, "expires": now + ttl}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return None
+        return token
+
+    async def release_lease(self, key: str, token: str):
+        self._set_up()
+        await self._db[f"{config.S2_MONGODB_COLLECTION}_leases"].delete_one(
+            {"_id": key, "token": token}
+        )
+
 
 class RedisBackend(CacheBackend):
+    # Deletes a lease only if it is still held with the given token.
+    _release_script = (
+        'if redis.call("get", KEYS[1]) == ARGV[1] then '
+        'return redis.call("del", KEYS[1]) end return 0'
+    )
+
     def __init__(self):
-        self._redis = Redis(
-            host=config.REDIS_HOST, port=config.REDIS_PORT, decode_responses=True
-        )
+        self._client = None
+
+    @property
+    def _redis(self):
+        if self._client is None:
+            from aioredis import Redis
+
+            self._client = Redis(
+                host=config.REDIS_HOST, port=config.REDIS_PORT, decode_responses=True
+            )
+        return self._client
 
     async def exists(self, key: str) -> bool:
         return await self._redis.exists(key)
 
     async def get(self, key: str) -> dict:
-        return json.loads(await self._redis.get(key))
+        return await decode_json(await self._redis.get(key))
 
     async def set(self, key: str, value: dict):
         await self._redis.set(key, json.dumps(value))
 
+    async def get_many(self, keys: List[str]) -> List[Optional[dict]]:
+        if not keys:
+            return []
+        return [
+            None if raw is None else await decode_json(raw)
+            for raw in await self._redis.mget(keys)
+        ]
+
+    async def set_many(self, entries: Dict[str, dict]):
+        if entries:
+            await self._redis.mset(
+                {key: json.dumps(value) for key, value in entries.items()}
+            )
+
+    async def scan(self, prefix: str = "", batch_size: int = 1000):
+        keys = []
+        async for key in self._redis.scan_iter(
+            match=re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*", count=batch_size
+        ):
+            keys.append(key)
+            if len(keys) == batch_size:
+                yield await self._scan_batch(keys)
+                keys = []
+        if keys:
+            yield await self._scan_batch(keys)
+
+    async def acquire_lease(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        if await self._redis.set(f"lease:{key}", token, nx=True, px=int(ttl * 1000)):
+            return token
+        return None
+
+    async def release_lease(self, key: str, token: str):
+        await self._redis.eval(self._release_script, 1, f"lease:{key}", token)
+
+    async def _scan_batch(self, keys: List[str]) -> Dict[str, dict]:
+        # Keys that were deleted after they were scanned, and keys of other types than strings (e.g., the work queue's
+        # keys), are left out.
+        return {
+            key: value
+            for key, value in zip(keys, await self.get_many(keys))
+            if value is not None
+        }
+
+
+class MemoryBackend(CacheBackend):
+    """Cache backend that keeps entries in memory, for runs without a database (e.g., when replaying a cassette)."""
+
+    def __init__(self):
+        self._docs: Dict[str, dict] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    async def exists(self, key: str) -> bool:
+        return key in self._docs
+
+    async def get(self, key: str) -> dict:
+        return self._docs[key]
+
+    async def set(self, key: str, value: dict):
+        self._docs[key] = value
+
+    async def get_many(self, keys: List[str]) -> List[Optional[dict]]:
+        return [self._docs.get(key) for key in keys]
+
+    async def set_many(self, entries: Dict[str, dict]):
+        self._docs.update(entries)
+
+    async def scan(self, prefix: str = "", batch_size: int = 1000):
+        keys = [key for key in self._docs if key.startswith(prefix)]
+        for i in range(0, len(keys), batch_size):
+            yield {key: self._docs[key] for key in keys[i : i + batch_size]}
+
+    async def acquire_lease(self, key: str, ttl: float) -> Optional[str]:
+        if key in self._leases and self._leases[key][1] > time.monotonic():
+            return None
+        token = uuid.uuid4().hex
+        self._leases[key] = (token, time.monotonic() + ttl)
+        return token
+
+    async def release_lease(self, key: str, token: str):
+        if key in self._leases and self._leases[key][0] == token:
+            del self._leases[key]
+
+
+class SqliteBackend(CacheBackend):
+    """Cache backend that stores entries in an embedded SQLite database in WAL mode, for single-node deployments.
+
+    The database file is memory-mapped, so that reads of cached entries are served from the page cache instead of
+    making round trips to a database server. Reads run on the event loop, since readers are never blocked in WAL mode.
+    Writes run in a dedicated thread, so that the event loop is not blocked while the database is locked by a writer
+    in another process.
+
+    Each process opens its own connections, so the database can be shared by the worker processes of a parallel run.
+    Expired entries are swept periodically by the processes that write to the database.
+    """
+
+    # Max number of keys per query, which is below SQLite's default limit on the number of query parameters.
+    _chunk_size = 500
+
+    def __init__(self, path: str = None):
+        """
+        :param path: Path of the database file. Defaults to the path in the config.
+        """
+        self._path = os.path.expanduser(path or config.S2_SQLITE_PATH)
+        self._pid: Optional[int] = None
+        self._reader = None
+        self._writer = None
+        self._write_pool: Optional[ThreadPoolExecutor] = None
+        self._last_sweep: Optional[float] = None
+
+    def _connect(self):
+        import sqlite3
+
+        connection = sqlite3.connect(
+            self._path,
+            timeout=config.S2_SQLITE_BUSY_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute(f"PRAGMA mmap_size = {config.S2_SQLITE_MMAP_SIZE}")
+        return connection
+
+    def _set_up(self):
+        # Connections are not shared with processes forked after they were opened.
+        if self._pid == os.getpid():
+            return
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._write_pool = ThreadPoolExecutor(1, thread_name_prefix="sqlite-writer")
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode = WAL")
+        # Commits are not synced to disk in WAL mode, only checkpoints. The database cannot be corrupted by a crash,
+        # but the latest entries may be lost, which is acceptable for a cache.
+        self._writer.execute("PRAGMA synchronous = NORMAL")
+        self._writer.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expiration TEXT) WITHOUT ROWID"
+        )
+        self._writer.execute(
+            "CREATE INDEX IF NOT EXISTS cache_expiration ON cache (expiration)"
+        )
+        self._writer.execute(
+            "CREATE TABLE IF NOT EXISTS leases "
+            "(key TEXT PRIMARY KEY, token TEXT NOT NULL, expires REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._reader = self._connect()
+        self._pid = os.getpid()
+        self._last_sweep = None
+
+    async def _write(self, func, *args):
+        self._set_up()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._write_pool, func, *args
+        )
+
+    async def exists(self, key: str) -> bool:
+        self._set_up()
+        return (
+            self._reader.execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone()
+            is not None
+        )
+
+    async def get(self, key: str) -> dict:
+        self._set_up()
+        row = self._reader.execute(
+            "SELECT value FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        return None if row is None else await decode_json(row[0])
+
+    async def set(self, key: str, value: dict):
+        await self.set_many({key: value})
+
+    async def get_many(self, keys: List[str]) -> List[Optional[dict]]:
+        self._set_up()
+        raw_values = {}
+        for i in range(0, len(keys), self._chunk_size):
+            chunk = keys[i : i + self._chunk_size]
+            placeholders = ",".join("?" * len(chunk))
+            raw_values.update(
+                self._reader.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({placeholders})", chunk
+                )
+            )
+        return [
+            None if key not in raw_values else await decode_json(raw_values[key])
+            for key in keys
+        ]
+
+    async def scan(self, prefix: str = "", batch_size: int = 1000):
+        self._set_up()
+        # Keys are scanned in order, starting after the last key of the previous batch.
+        condition, start = "key >= ?", prefix
+        while True:
+            rows = self._reader.execute(
+                f"SELECT key, value FROM cache WHERE {condition} ORDER BY key LIMIT ?",
+                (start, batch_size),
+            ).fetchall()
+            batch = {
+                key: await decode_json(value)
+                for key, value in rows
+                if key.startswith(prefix)
+            }
+            if batch:
+                yield batch
+            if len(batch) < batch_size:
+                return
+            condition, start = "key > ?", rows[-1][0]
+
+    async def set_many(self, entries: Dict[str, dict]):
+        rows = [
+            (key, json.dumps(value), value.get("expiration"))
+            for key, value in entries.items()
+        ]
+        await self._write(self._insert, rows)
+
+    def _insert(self, rows: List[tuple]):
+        with self._writer:
+            self._writer.execute("BEGIN IMMEDIATE")
+            self._writer.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expiration) VALUES (?, ?, ?)",
+                rows,
+            )
+        if config.S2_SQLITE_SWEEP_INTERVAL and (
+            self._last_sweep is None
+            or time.monotonic() - self._last_sweep >= config.S2_SQLITE_SWEEP_INTERVAL
+        ):
+            self._sweep()
+
+    def _sweep(self) -> int:
+        # Entries are kept until they are past the stale grace period, since stale entries are still served.
+        cutoff = (
+            date.today() - timedelta(days=config.S2_STALE_GRACE_PERIOD)
+        ).isoformat()
+        deleted = 0
+        while True:
+            # Entries are deleted in chunks, so that the database is not locked for long at a time.
+            with self._writer:
+                self._writer.execute("BEGIN IMMEDIATE")
+                count = self._writer.execute(
+                    "DELETE FROM cache WHERE key IN "
+                    "(SELECT key FROM cache WHERE expiration < ? LIMIT ?)",
+                    (cutoff, self._chunk_size),
+                ).rowcount
+            deleted += count
+            if count < self._chunk_size:
+                break
+        with self._writer:
+            self._writer.execute(
+                "DELETE FROM leases WHERE expires <= ?", (time.time(),)
+            )
+        self._last_sweep = time.monotonic()
+        if deleted:
+            logger.debug("Swept %d expired cache entries.", deleted)
+        return deleted
+
+    async def sweep(self) -> int:
+        """Delete the entries that are past their expiration and the stale grace period.
+
+        :return: Number of deleted entries.
+        """
+        return await self._write(self._sweep)
+
+    async def acquire_lease(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        return token if await self._write(self._acquire, key, token, ttl) else None
+
+    def _acquire(self, key: str, token: str, ttl: float) -> bool:
+        # Leases are shared by processes, so they expire by the wall clock rather than by a monotonic clock.
+        now = time.time()
+        with self._writer:
+            self._writer.execute("BEGIN IMMEDIATE")
+            self._writer.execute(
+                "DELETE FROM leases WHERE key = ? AND expires <= ?", (key, now)
+            )
+            return (
+                self._writer.execute(
+                    "INSERT OR IGNORE INTO leases (key, token, expires) VALUES (?, ?, ?)",
+                    (key, token, now + ttl),
+                ).rowcount
+                == 1
+            )
+
+    async def release_lease(self, key: str, token: str):
+        await self._write(self._release, key, token)
+
+    def _release(self, key: str, token: str):
+        with self._writer:
+            self._writer.execute(
+                "DELETE FROM leases WHERE key = ? AND token = ?", (key, token)
+            )
+
+
+_cache_backends = {
+    "redis": RedisBackend,
+    "mongodb": MongoDbBackend,
+    "memory": MemoryBackend,
+    "sqlite": SqliteBackend,
+}
+
 
 class SemanticScholar:
     """Wrapper for the Semantic Scholar RESTful API."""
 
-    _limiter = AsyncRateLimiter(
-        config.S2_MAX_REQUESTS,
-        config.S2_WINDOW_SIZE,
-    )
-    _base_url = (
-        "https://partner.semanticscholar.org/v1"
-        if config.S2_API_KEY is not None
-        else "https://api.semanticscholar.org/v1"
-    )
-    _cache = RedisBackend() if config.S2_CACHE_BACKEND == "redis" else MongoDbBackend()
-    _locks = defaultdict(asyncio.Lock)
-    _sem = asyncio.BoundedSemaphore(config.S2_MAX_CONCURRENT_REQUESTS)
-    _errors = {}
+    # The rate limiter, semaphore, error cache, and base URLs are set up from the config when the first client is
+    # entered, so that importing this module does not read the config file. They are only set up if they have not been
+    # assigned before (e.g., by worker processes and tests).
+    _limiter: Optional[AsyncRateLimiter] = None
+    _base_url: Optional[str] = None
+    _batch_base_url: Optional[str] = None
+    _batchers: Dict[str, MicroBatcher] = {}
+    # The cache backend is created on first use, so that its client library is only imported if it is used.
+    _cache: Optional[CacheBackend] = None
+    _locks = KeyedLocks()
+    _sem: Optional[asyncio.BoundedSemaphore] = None
+    _errors: Optional[LRUCache] = None
+    _refreshes: Dict[str, asyncio.Future] = {}
     requests = 0
     cache_hits = 0
+    stale_cache_hits = 0
     cache_misses = 0
     errors = 0
 
     def __init__(self):
-        self._session: Optional[ClientSession] = None
+        self._session: Optional["ClientSession"] = None
+
+    @staticmethod
+    def _set_up():
+        if SemanticScholar._limiter is None:
+            SemanticScholar._limiter = AsyncRateLimiter(
+                config.S2_MAX_REQUESTS,
+                config.S2_WINDOW_SIZE,
+            )
+        if SemanticScholar._base_url is None:
+            SemanticScholar._base_url = config.S2_BASE_URL or (
+                "https://partner.semanticscholar.org/v1"
+                if config.S2_API_KEY is not None
+                else "https://api.semanticscholar.org/v1"
+            )
+        if SemanticScholar._batch_base_url is None:
+            # The batch endpoints are only available in the Graph API.
+            SemanticScholar._batch_base_url = config.S2_BATCH_BASE_URL or (
+                "https://partner.semanticscholar.org/graph/v1"
+                if config.S2_API_KEY is not None
+                else "https://api.semanticscholar.org/graph/v1"
+            )
+        if SemanticScholar._sem is None:
+            SemanticScholar._sem = asyncio.BoundedSemaphore(
+                config.S2_MAX_CONCURRENT_REQUESTS
+            )
+        if SemanticScholar._errors is None:
+            SemanticScholar._errors = LRUCache(config.MAX_CACHE_SIZE)
 
     async def __aenter__(self):
+        from aiohttp import ClientSession
+
+        SemanticScholar._set_up()
         self._session = ClientSession(raise_for_status=True)
         if config.S2_API_KEY is not None:
             self._session.headers.update({"x-api-key": config.S2_API_KEY})
@@ -109,12 +590,59 @@ class SemanticScholar:
         await self._session.close()
         self._session = None
 
+    @staticmethod
+    def _response_error(url: str, method: str, status: int, message: str):
+        from aiohttp import ClientResponseError, RequestInfo
+        from multidict import CIMultiDict, CIMultiDictProxy
+        from yarl import URL
+
+        return ClientResponseError(
+            RequestInfo(URL(url), method, CIMultiDictProxy(CIMultiDict()), URL(url)),
+            (),
+            status=status,
+            message=message,
+        )
+
+    @staticmethod
+    async def _replay(cassette: Cassette, endpoint: str) -> dict:
+        url = f"{SemanticScholar._base_url}{endpoint}"
+        interaction = cassette.replay(f"s2 {endpoint}")
+        if config.CASSETTE_RATE_LIMIT:
+            with metrics.timer("rate_limiter_wait_seconds"):
+                async with SemanticScholar._limiter:
+                    pass
+        with metrics.timer(
+            "s2_request_seconds", endpoint=SemanticScholar._endpoint_type(endpoint)
+        ):
+            await asyncio.sleep(config.CASSETTE_LATENCY)
+        SemanticScholar.requests += 1
+        if "status" in interaction:
+            raise SemanticScholar._response_error(
+                url, "GET", interaction["status"], interaction["message"]
+            )
+        return interaction["response"]
+
     async def _get(self, endpoint: str, **kwargs) -> dict:
+        cassette = get_cassette()
+        if cassette is not None and cassette.replaying:
+            return await SemanticScholar._replay(cassette, endpoint)
+        wait_start = time.perf_counter()
         async with SemanticScholar._limiter:
+            metrics.observe(
+                "rate_limiter_wait_seconds", time.perf_counter() - wait_start
+            )
             async with SemanticScholar._sem:
+                # Time spent waiting for the semaphore is left out, so that the latency of the API itself is measured.
+                request_start = time.perf_counter()
                 res = await self._session.get(
                     f"{SemanticScholar._base_url}{endpoint}", **kwargs
                 )
+            data = await res.json()
+            metrics.observe(
+                "s2_request_seconds",
+                time.perf_counter() - request_start,
+                endpoint=SemanticScholar._endpoint_type(endpoint),
+            )
             SemanticScholar.requests += 1
             if SemanticScholar.requests % 100 == 0:
                 logger.debug(
@@ -122,37 +650,318 @@ class SemanticScholar:
                     SemanticScholar.requests,
                     SemanticScholar.errors,
                 )
-            return await res.json()
+            return data
+
+    @staticmethod
+    def _endpoint_type(endpoint: str) -> str:
+        return endpoint.split("/")[1]
+
+    async def _fetch(self, endpoint: str) -> dict:
+        cassette = get_cassette()
+        endpoint_type = SemanticScholar._endpoint_type(endpoint)
+        if (
+            not config.S2_BATCH_REQUESTS
+            or (cassette is not None and cassette.replaying)
+            or endpoint_type not in ("paper", "author")
+        ):
+            return await self._get(endpoint)
+        if endpoint_type not in SemanticScholar._batchers:
+            batch_size = (
+                config.S2_PAPER_BATCH_SIZE
+                if endpoint_type == "paper"
+                else config.S2_AUTHOR_BATCH_SIZE
+            )
+            SemanticScholar._batchers[endpoint_type] = MicroBatcher(
+                lambda ids: SemanticScholar._post_batch(endpoint_type, ids),
+                batch_size,
+                config.S2_BATCH_WINDOW,
+            )
+        for attempt in range(config.S2_BATCH_RETRIES + 1):
+            try:
+                return await SemanticScholar._batchers[endpoint_type].get(
+                    endpoint.split("/", 2)[2]
+                )
+            except BatchRequestError:
+                if attempt == config.S2_BATCH_RETRIES:
+                    raise
+                # The IDs of a failed batch are retried at about the same time, so they are batched together again.
+                await asyncio.sleep(config.S2_BATCH_RETRY_DELAY * 2 ** attempt)
+
+    @staticmethod
+    async def _post_batch(endpoint_type: str, ids: List[str]) -> List[object]:
+        from aiohttp import ClientError, ClientSession
+
+        url = f"{SemanticScholar._batch_base_url}/{endpoint_type}/batch"
+        fields = (
+            config.S2_PAPER_FIELDS
+            if endpoint_type == "paper"
+            else config.S2_AUTHOR_FIELDS
+        )
+        headers = {} if config.S2_API_KEY is None else {"x-api-key": config.S2_API_KEY}
+        wait_start = time.perf_counter()
+        try:
+            async with SemanticScholar._limiter:
+                metrics.observe(
+                    "rate_limiter_wait_seconds", time.perf_counter() - wait_start
+                )
+                async with SemanticScholar._sem:
+                    request_start = time.perf_counter()
+                    # Batches are fetched on behalf of several clients, so they are not fetched with the session of
+                    # any one of them, which could be closed before the batch is done.
+                    async with ClientSession(
+                        raise_for_status=True, headers=headers
+                    ) as session:
+                        res = await session.post(
+                            url,
+                            params={} if fields is None else {"fields": fields},
+                            json={"ids": ids},
+                        )
+                        docs = await res.json()
+                metrics.observe(
+                    "s2_request_seconds",
+                    time.perf_counter() - request_start,
+                    endpoint=f"{endpoint_type}/batch",
+                )
+        except (ClientError, asyncio.TimeoutError) as e:
+            raise BatchRequestError(f"{url}: {e!r}") from e
+        metrics.increment("s2_batched_ids", len(ids), endpoint=endpoint_type)
+        SemanticScholar.requests += 1
+        # IDs that are not found are null in the response.
+        return [
+            SemanticScholar._response_error(
+                f"{SemanticScholar._base_url}/{endpoint_type}/{s2_id}",
+                "POST",
+                404,
+                "Not Found",
+            )
+            if doc is None
+            else SemanticScholar._from_graph(endpoint_type, doc)
+            for s2_id, doc in zip(ids, docs)
+        ]
+
+    @staticmethod
+    def _from_graph(endpoint_type: str, doc: dict) -> dict:
+        # Documents from the Graph API are converted to the shape of the documents from the /paper and /author
+        # endpoints that the recommenders use.
+        if endpoint_type == "paper":
+            doc.setdefault("arxivId", (doc.get("externalIds") or {}).get("ArXiv"))
+            doc.setdefault("topics", [])
+            doc["fieldsOfStudy"] = doc.get("fieldsOfStudy") or []
+        return doc
+
+    @staticmethod
+    def cache_backend() -> CacheBackend:
+        """Get the backend used to cache responses.
+
+        While a cassette is replaying, a fresh memory backend is used instead of the configured one, so that responses
+        cached (or revalidated) outside of the recorded run cannot change the replay.
+        """
+        if SemanticScholar._cache is None:
+            # The mode is checked instead of the cassette itself, so that the archive is not loaded before it is used.
+            if config.CASSETTE_MODE == "replay":
+                SemanticScholar._cache = MemoryBackend()
+            else:
+                SemanticScholar._cache = _cache_backends.get(
+                    config.S2_CACHE_BACKEND, MongoDbBackend
+                )()
+        return SemanticScholar._cache
+
+    @staticmethod
+    async def _cached_doc(endpoint: str) -> Optional[dict]:
+        if not config.S2_CACHE_RESPONSES:
+            return None
+        with metrics.timer(
+            "cache_get_seconds", backend=type(SemanticScholar.cache_backend()).__name__
+        ):
+            if not await SemanticScholar.cache_backend().exists(endpoint):
+                return None
+            return await SemanticScholar.cache_backend().get(endpoint)
+
+    @staticmethod
+    async def _cache_set(endpoint: str, doc: dict):
+        with metrics.timer(
+            "cache_set_seconds", backend=type(SemanticScholar.cache_backend()).__name__
+        ):
+            await SemanticScholar.cache_backend().set(endpoint, doc)
+
+    @staticmethod
+    def _expired(doc: dict, grace_period: int = 0) -> bool:
+        expiration = date.fromisoformat(doc["expiration"])
+        return expiration + timedelta(days=grace_period) < date.today()
+
+    @staticmethod
+    def _cache_doc(data: dict, max_age: int) -> dict:
+        # Expirations are spread out so that entries cached on the same day are not all refetched on the same day.
+        max_age += random.randint(0, int(max_age * config.S2_EXPIRATION_JITTER))
+        return {
+            "expiration": (date.today() + timedelta(days=max_age)).isoformat(),
+            "data": data,
+        }
+
+    @staticmethod
+    async def _cache_lookup(endpoint: str) -> Optional[dict]:
+        cached = await SemanticScholar._cached_doc(endpoint)
+        if cached is None or SemanticScholar._expired(
+            cached, config.S2_STALE_GRACE_PERIOD
+        ):
+            return None
+        return cached["data"]
+
+    @staticmethod
+    async def _cache_lookup_many(endpoints: List[str]) -> List[Optional[dict]]:
+        if not config.S2_CACHE_RESPONSES:
+            return [None] * len(endpoints)
+        return [
+            None
+            if cached is None
+            or SemanticScholar._expired(cached, config.S2_STALE_GRACE_PERIOD)
+            else cached["data"]
+            for cached in await SemanticScholar.cache_backend().get_many(endpoints)
+        ]
+
+    @staticmethod
+    async def _refresh(endpoint: str, max_age: int):
+        from aiohttp import ClientError, ClientResponseError
+
+        token = None
+        try:
+            if config.S2_SINGLE_FLIGHT:
+                token = await SemanticScholar.cache_backend().acquire_lease(
+                    endpoint, config.S2_SINGLE_FLIGHT_LEASE
+                )
+                # The entry is already being refreshed by another process.
+                if token is None:
+                    return
+            async with SemanticScholar() as s2:
+                doc = SemanticScholar._cache_doc(await s2._fetch(endpoint), max_age)
+            await SemanticScholar._cache_set(endpoint, doc)
+        # The stale entry is kept if the refresh fails, and it will be served until it is past the grace period. Nothing
+        # awaits refreshes, so their errors are logged rather than raised.
+        except ClientResponseError as e:
+            logger.warning("%s: %s %s (refresh).", endpoint, e.status, e.message)
+            SemanticScholar.errors += 1
+        except (ClientError, asyncio.TimeoutError, BatchRequestError) as e:
+            logger.warning("%s: %r (refresh).", endpoint, e)
+            SemanticScholar.errors += 1
+        except Exception:
+            logger.exception("%s: refresh failed.", endpoint)
+        finally:
+            del SemanticScholar._refreshes[endpoint]
+            if token is not None:
+                try:
+                    await SemanticScholar.cache_backend().release_lease(endpoint, token)
+                except Exception:
+                    logger.exception("%s: failed to release the lease.", endpoint)
+
+    @staticmethod
+    def _revalidate(endpoint: str, max_age: int):
+        if endpoint not in SemanticScholar._refreshes:
+            SemanticScholar._refreshes[endpoint] = asyncio.ensure_future(
+                SemanticScholar._refresh(endpoint, max_age)
+            )
+
+    @staticmethod
+    async def wait_for_refreshes():
+        """Wait for background refreshes of stale cache entries to finish."""
+        await asyncio.gather(
+            *SemanticScholar._refreshes.values(), return_exceptions=True
+        )
 
     async def _cached_get(self, endpoint: str, max_age: int) -> dict:
         if endpoint in SemanticScholar._errors:
             # There's no point in refetching and relogging exceptions for endpoints that have already responded with
             # error codes, so we just reraise any previous exception.
             raise SemanticScholar._errors[endpoint]
-        async with SemanticScholar._locks[endpoint]:
+        cassette = get_cassette()
+        if cassette is not None and cassette.recording:
+            from aiohttp import ClientResponseError
+
+            # Responses are recorded where they are served rather than in _get, so that responses served from the
+            # cache are recorded as well.
+            try:
+                data = await self._serve(endpoint, max_age)
+            except ClientResponseError as e:
+                cassette.record(f"s2 {endpoint}", status=e.status, message=e.message)
+                raise
+            cassette.record(f"s2 {endpoint}", data)
+            return data
+        return await self._serve(endpoint, max_age)
+
+    async def _serve(self, endpoint: str, max_age: int) -> dict:
+        # aiohttp is imported where it is needed, so that importing this module does not import it.
+        from aiohttp import ClientResponseError
+
+        async with SemanticScholar._locks(endpoint):
             try:
                 if config.S2_CACHE_RESPONSES:
-                    if await SemanticScholar._cache.exists(endpoint):
-                        cached = await SemanticScholar._cache.get(endpoint)
-                        if date.fromisoformat(cached["expiration"]) >= date.today():
-                            SemanticScholar.cache_hits += 1
-                            return cached["data"]
+                    cached = await SemanticScholar._cached_doc(endpoint)
+                    if cached is not None and not SemanticScholar._expired(cached):
+                        SemanticScholar.cache_hits += 1
+                        return cached["data"]
+                    if cached is not None and not SemanticScholar._expired(
+                        cached, config.S2_STALE_GRACE_PERIOD
+                    ):
+                        # Serve the stale entry and refresh it in the background.
+                        SemanticScholar.cache_hits += 1
+                        SemanticScholar.stale_cache_hits += 1
+                        SemanticScholar._revalidate(endpoint, max_age)
+                        return cached["data"]
                     SemanticScholar.cache_misses += 1
-                    doc = {
-                        "expiration": (
-                            date.today() + timedelta(days=max_age)
-                        ).isoformat(),
-                        "data": await self._get(endpoint),
-                    }
-                    await SemanticScholar._cache.set(endpoint, doc)
-                    return doc["data"]
+                    if config.S2_SINGLE_FLIGHT:
+                        return await self._single_flight(endpoint, max_age)
+                    return await self._fetch_to_cache(endpoint, max_age)
                 else:
-                    return await self._get(endpoint)
+                    return await self._fetch(endpoint)
             except ClientResponseError as e:
-                logger.warn("%s: %s %s.", endpoint, e.status, e.message)
+                logger.warning("%s: %s %s.", endpoint, e.status, e.message)
                 SemanticScholar.errors += 1
                 SemanticScholar._errors[endpoint] = e
                 raise
+            except BatchRequestError as e:
+                # The endpoint is looked up again the next time it is requested.
+                logger.warning("%s: %s.", endpoint, e)
+                SemanticScholar.errors += 1
+                raise
+
+    async def _single_flight(self, endpoint: str, max_age: int) -> dict:
+        # Only one of the processes that share the cache backend fetches an endpoint at a time, while the others wait
+        # for the response to be cached. Within a process, fetches are already deduplicated by the endpoint locks.
+        backend = SemanticScholar.cache_backend()
+        deadline = time.monotonic() + config.S2_SINGLE_FLIGHT_TIMEOUT
+        while time.monotonic() < deadline:
+            token = await backend.acquire_lease(endpoint, config.S2_SINGLE_FLIGHT_LEASE)
+            if token is not None:
+                try:
+                    # The response may have been cached by a process that released the lease after the cache miss.
+                    cached = await SemanticScholar._cached_doc(endpoint)
+                    if cached is not None and not SemanticScholar._expired(cached):
+                        metrics.increment("s2_coalesced_fetches")
+                        return cached["data"]
+                    return await self._fetch_to_cache(endpoint, max_age)
+                finally:
+                    await backend.release_lease(endpoint, token)
+            await asyncio.sleep(config.S2_SINGLE_FLIGHT_POLL_INTERVAL)
+            cached = await SemanticScholar._cached_doc(endpoint)
+            if cached is not None and not SemanticScholar._expired(cached):
+                metrics.increment("s2_coalesced_fetches")
+                return cached["data"]
+        # The process that holds the lease is taking too long (e.g., because it is waiting for the rate limiter), so
+        # the endpoint is fetched without it.
+        logger.debug("%s: single-flight timeout.", endpoint)
+        metrics.increment("s2_single_flight_timeouts")
+        return await self._fetch_to_cache(endpoint, max_age)
+
+    async def _fetch_to_cache(self, endpoint: str, max_age: int) -> dict:
+        doc = SemanticScholar._cache_doc(await self._fetch(endpoint), max_age)
+        await SemanticScholar._cache_set(endpoint, doc)
+        return doc["data"]
+
+    @staticmethod
+    def _paper_endpoint(s2_id: str = None, arxiv_id: str = None) -> str:
+        if sum(i is None for i in (s2_id, arxiv_id)) != 1:
+            raise ValueError("Exactly one type of paper ID must be provided.")
+        paper_id = s2_id if s2_id is not None else f"arXiv:{arxiv_id}"
+        return f"/paper/{paper_id}"
 
     async def paper(self, s2_id: str = None, arxiv_id: str = None):
         """Get paper metadata.
@@ -163,15 +972,49 @@ class SemanticScholar:
         :param arxiv_id: arXiv paper ID.
         :return: Paper metadata.
         """
-        if sum(i is None for i in (s2_id, arxiv_id)) != 1:
-            raise ValueError("Exactly one type of paper ID must be provided.")
-
-        paper_id = s2_id if s2_id is not None else f"arXiv:{arxiv_id}"
         return await self._cached_get(
-            f"/paper/{paper_id}",
+            SemanticScholar._paper_endpoint(s2_id, arxiv_id),
             config.S2_PAPER_EXPIRATION,
         )
 
+    async def cached_paper(
+        self, s2_id: str = None, arxiv_id: str = None
+    ) -> Optional[dict]:
+        """Get paper metadata from the cache without querying the API.
+
+        Exactly one type of paper ID must be provided.
+
+        :param s2_id: S2 paper ID.
+        :param arxiv_id: arXiv paper ID.
+        :return: Paper metadata, or None if the paper is not cached or the cached entry has expired.
+        """
+        return await SemanticScholar._cache_lookup(
+            SemanticScholar._paper_endpoint(s2_id, arxiv_id)
+        )
+
+    async def cached_papers(
+        self, s2_ids: List[str] = None, arxiv_ids: List[str] = None
+    ) -> List[Optional[dict]]:
+        """Get metadata of multiple papers from the cache without querying the API.
+
+        The entries are fetched from the cache backend in a single batch. Exactly one type of paper IDs must be
+        provided.
+
+        :param s2_ids: S2 paper IDs.
+        :param arxiv_ids: arXiv paper IDs.
+        :return: Metadata of each paper, or None if the paper is not cached or the cached entry has expired.
+        """
+        if sum(i is None for i in (s2_ids, arxiv_ids)) != 1:
+            raise ValueError("Exactly one type of paper IDs must be provided.")
+        return await SemanticScholar._cache_lookup_many(
+            [SemanticScholar._paper_endpoint(s2_id=paper_id) for paper_id in s2_ids]
+            if s2_ids is not None
+            else [
+                SemanticScholar._paper_endpoint(arxiv_id=paper_id)
+                for paper_id in arxiv_ids
+            ]
+        )
+
     async def author(self, s2_id: str):
         """Get author metadata.
 
@@ -183,22 +1026,97 @@ class SemanticScholar:
             config.S2_AUTHOR_EXPIRATION,
         )
 
+    async def cached_author(self, s2_id: str) -> Optional[dict]:
+        """Get author metadata from the cache without querying the API.
+
+        :param s2_id: S2 author ID.
+        :return: Author metadata, or None if the author is not cached or the cached entry has expired.
+        """
+        return await SemanticScholar._cache_lookup(f"/author/{s2_id}")
+
+    @staticmethod
+    def recent_paper_ids(
+        author: dict, max_age: Optional[int] = _DEFAULT, max_papers: int = None
+    ) -> List[str]:
+        """Get the IDs of an author's most recently published papers.
+
+        :param author: Author metadata.
+        :param max_age: Max paper age. If None, papers of any age are kept. Defaults to the value in the config.
+        :param max_papers: Max number of papers. The most recent papers are kept.
+        :return: S2 paper IDs, newest first.
+        """
+        if max_age is _DEFAULT:
+            max_age = config.MAX_PAPER_AGE
+        min_year = -1 if max_age is None else date.today().year - max_age
+        papers = sorted(
+            (
+                paper
+                for paper in author["papers"]
+                if paper["year"] is not None and paper["year"] >= min_year
+            ),
+            key=lambda paper: paper["year"],
+            reverse=True,
+        )
+        return [paper["paperId"] for paper in papers[:max_papers]]
+
     async def author_papers(
-        self, s2_id: str, max_age=config.MAX_PAPER_AGE
+        self, s2_id: str, max_age: Optional[int] = _DEFAULT, max_papers: int = None
     ) -> List[dict]:
         """Get metadata of an author's published papers.
 
         :param s2_id: S2 author ID.
-        :param max_age: Max paper age.
+        :param max_age: Max paper age. If None, papers of any age are kept. Defaults to the value in the config.
+        :param max_papers: Max number of papers. The most recent papers are kept.
         :return: Metadata of published papers.
         """
         author = await self.author(s2_id)
-
-        min_year = -1 if max_age is None else date.today().year - max_age
         return await gather(
             *[
-                self.paper(s2_id=paper["paperId"])
-                for paper in author["papers"]
-                if paper["year"] is not None and paper["year"] >= min_year
+                self.paper(s2_id=paper_id)
+                for paper_id in SemanticScholar.recent_paper_ids(
+                    author, max_age, max_papers
+                )
             ]
         )
+
+    async def iter_author_papers(
+        self,
+        s2_id: str,
+        max_age: Optional[int] = _DEFAULT,
+        max_papers: int = None,
+        max_concurrency: int = None,
+    ) -> AsyncIterator[dict]:
+        """Get metadata of an author's published papers as they are fetched.
+
+        Papers are fetched concurrently and yielded in the order they arrive, so that they can be processed while the
+        rest are fetched. Papers that cannot be fetched are left out.
+
+        :param s2_id: S2 author ID.
+        :param max_age: Max paper age. If None, papers of any age are kept. Defaults to the value in the config.
+        :param max_papers: Max number of papers. The most recent papers are kept.
+        :param max_concurrency: Max number of papers fetched at a time. Defaults to the value in the config.
+        :return: Async iterator of metadata of published papers.
+        """
+        if max_concurrency is None:
+            max_concurrency = config.S2_AUTHOR_PAPERS_CONCURRENCY
+        author = await self.author(s2_id)
+        paper_ids = iter(SemanticScholar.recent_paper_ids(author, max_age, max_papers))
+        pending = set()
+        try:
+            while True:
+                for paper_id in paper_ids:
+                    pending.add(asyncio.ensure_future(self.paper(s2_id=paper_id)))
+                    if len(pending) >= max_concurrency:
+                        break
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        yield task.result()
+        finally:
+            # Papers that are still being fetched when the consumer stops iterating are no longer needed.
+            for task in pending:
+                task.cancel()
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import gzip
+import json
+import time
+from datetime import date, datetime, timedelta
+from typing import BinaryIO, Dict, Iterator, List, Sequence
+
+from arxivdigest_recommenders.semantic_scholar import (
+    CacheBackend,
+    SemanticScholar,
+    _cache_backends,
+)
+from arxivdigest_recommenders.log import get_logger
+from arxivdigest_recommenders import config
+
+
+logger = get_logger(__name__, "Snapshot")
+
+SNAPSHOT_VERSION = 1
+
+
+def _write_chunk(file: BinaryIO, records: Sequence[dict]):
+    # Each chunk is a separate gzip member, so that chunks are compressed as they are scanned rather than buffered
+    # until the end of the export. A file of concatenated gzip members is still a valid gzip file.
+    with gzip.GzipFile(fileobj=file, mode="wb") as chunk:
+        chunk.write("".join(json.dumps(record) + "\n" for record in records).encode())
+
+
+async def export_snapshot(
+    backend: CacheBackend,
+    path: str,
+    prefixes: Sequence[str] = ("/",),
+    chunk_size: int = 1000,
+) -> int:
+    """Write the entries of a cache backend to a snapshot file.
+
+    The snapshot is a file of gzipped JSON lines: a header, followed by one line per entry with its key and value. The
+    values are stored as they are, so the entries keep their expirations.
+
+    :param backend: Cache backend.
+    :param path: Path of the snapshot.
+    :param prefixes: Prefixes of the keys of the exported entries. Semantic Scholar responses are stored under "/".
+    :param chunk_size: Number of entries per chunk.
+    :return: Number of exported entries.
+    """
+    count = 0
+    start_time = time.monotonic()
+    with open(path, "wb") as file:
+        _write_chunk(
+            file,
+            [
+                {
+                    "version": SNAPSHOT_VERSION,
+                    "created": datetime.now().isoformat(),
+                    "prefixes": list(prefixes),
+                }
+            ],
+        )
+        for prefix in prefixes:
+            async for batch in backend.scan(prefix, chunk_size):
+                _write_chunk(
+                    file,
+                    [{"key": key, "value": value} for key, value in batch.items()],
+                )
+                count += len(batch)
+                logger.debug("Exported %d entries.", count)
+    logger.info(
+        "Exported %d entries to %s in %d seconds.",
+        count,
+        path,
+        time.monotonic() - start_time,
+    )
+    return count
+
+
+def read_snapshot(
+    path: str, chunk_size: int = 1000, skip_expired: bool = False
+) -> Iterator[Dict[str, dict]]:
+    """Read the entries of a snapshot file in chunks.
+
+    :param path: Path of the snapshot.
+    :param chunk_size: Number of entries per chunk.
+    :param skip_expired: Leave out entries that are past their expiration and the stale grace period.
+    :return: Iterator of chunks of entries by key.
+    """
+    cutoff = (date.today() - timedelta(days=config.S2_STALE_GRACE_PERIOD)).isoformat()
+    with gzip.open(path, "rt") as file:
+        header = json.loads(next(file))
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {header.get('version')}.")
+        chunk = {}
+        for line in file:
+            record = json.loads(line)
+            expiration = record["value"].get("expiration")
+            if skip_expired and expiration is not None and expiration < cutoff:
+                continue
+            chunk[record["key"]] = record["value"]
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = {}
+        if chunk:
+            yield chunk
+
+
+async def import_snapshot(
+    backend: CacheBackend,
+    path: str,
+    writers: int = 8,
+    chunk_size: int = 1000,
+    skip_expired: bool = False,
+) -> int:
+    """Load the entries of a snapshot file into a cache backend.
+
+    Chunks of entries are written concurrently by several writers, each chunk in a single batch. Existing entries with
+    the same keys are replaced.
+
+    :param backend: Cache backend.
+    :param path: Path of the snapshot.
+    :param writers: Max number of chunks that are written concurrently.
+    :param chunk_size: Number of entries per chunk.
+    :param skip_expired: Leave out entries that are past their expiration and the stale grace period.
+    :return: Number of imported entries.
+    """
+    count = 0
+    start_time = time.monotonic()
+    sem = asyncio.Semaphore(writers)
+    pending: List[asyncio.Future] = []
+
+    async def write(chunk: Dict[str, dict]):
+        try:
+            await backend.set_many(chunk)
+        finally:
+            sem.release()
+
+    try:
+        for chunk in read_snapshot(path, chunk_size, skip_expired):
+            await sem.acquire()
+            # Failed writes are raised as soon as they are noticed, rather than after the whole snapshot is read.
+            for task in [task for task in pending if task.done()]:
+                pending.remove(task)
+                task.result()
+            pending.append(asyncio.ensure_future(write(chunk)))
+            count += len(chunk)
+            logger.debug("Imported %d entries.", count)
+        await asyncio.gather(*pending)
+    finally:
+        for task in pending:
+            task.cancel()
+    logger.info(
+        "Imported %d entries from %s in %d seconds.",
+        count,
+        path,
+        time.monotonic() - start_time,
+    )
+    return count
+
+
+def _backend(name: str) -> CacheBackend:
+    if name is None:
+        return SemanticScholar.cache_backend()
+    return _cache_backends[name]()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the Semantic Scholar cache to a snapshot file, or import a snapshot into the cache."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser(
+        "export", help="Export the cache to a snapshot."
+    )
+    export_parser.add_argument("path", help="Path of the snapshot.")
+    export_parser.add_argument(
+        "--prefix",
+        action="append",
+        help='Prefix of the keys of the exported entries (defaults to "/", the Semantic Scholar responses; use '
+        '"scores/" to export stored scores). Can be given several times.',
+    )
+    import_parser = subparsers.add_parser(
+        "import", help="Import a snapshot into the cache."
+    )
+    import_parser.add_argument("path", help="Path of the snapshot.")
+    import_parser.add_argument(
+        "--writers",
+        type=int,
+        default=8,
+        help="Max number of chunks written concurrently.",
+    )
+    import_parser.add_argument(
+        "--skip-expired",
+        action="store_true",
+        help="Leave out entries that are past their expiration and the stale grace period.",
+    )
+    for subparser in (export_parser, import_parser):
+        subparser.add_argument(
+            "--backend",
+            choices=sorted(_cache_backends),
+            help="Cache backend (defaults to the configured backend).",
+        )
+        subparser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of entries per chunk.",
+        )
+    args = parser.parse_args()
+    backend = _backend(args.backend)
+    if args.command == "export":
+        asyncio.run(
+            export_snapshot(backend, args.path, args.prefix or ["/"], args.chunk_size)
+        )
+    else:
+        asyncio.run(
+            import_snapshot(
+                backend, args.path, args.writers, args.chunk_size, args.skip_expired
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,26 @@
 import asyncio
+import multiprocessing
+import sys
 import time
 import numpy as np
 import numpy.typing as npt
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import asynccontextmanager
 from urllib.parse import urlparse
-from typing import Optional, List, Tuple, Any, Sequence, TypeVar, Iterator
+from typing import (
+    Optional,
+    List,
+    Tuple,
+    Any,
+    Sequence,
+    TypeVar,
+    Iterator,
+    Callable,
+    Dict,
+    Hashable,
+    Awaitable,
+)
 
 
 T = TypeVar("T")
@@ -19,6 +36,27 @@ def extract_s2_id(user: dict) -> Optional[str]:
     return s2_id if len(s2_id) > 0 else None
 
 
+def get_user_s2_ids(connector, total_users: int) -> List[str]:
+    """Get the S2 author IDs of all users that have provided one.
+
+    :param connector: arXivDigest connector.
+    :param total_users: Number of users.
+    :return: User S2 author IDs.
+    """
+    user_s2_ids = []
+    user_count = 0
+    while user_count < total_users:
+        user_ids = connector.get_user_ids(user_count)
+        users = connector.get_user_info(user_ids)
+        user_s2_ids.extend(
+            s2_id
+            for s2_id in (extract_s2_id(user) for user in users.values())
+            if s2_id is not None
+        )
+        user_count += len(user_ids)
+    return user_s2_ids
+
+
 def pad_shortest(a: npt.ArrayLike, b: npt.ArrayLike, pad: Any = 0):
     """Pad the shortest of two arrays in order to make them the same length.
 
@@ -55,7 +93,10 @@ async def gather(*args):
 
 
 class AsyncRateLimiter:
-    """Limits the amount of times a section of code is entered within a window of time."""
+    """Limits the amount of times a section of code is entered within a window of time.
+
+    Entering the limiter returns the time (as given by time.monotonic) that it was entered at.
+    """
 
     def __init__(self, max_enters: int, window_size: int):
         """
@@ -78,6 +119,43 @@ class AsyncRateLimiter:
                 await asyncio.sleep(time_to_new_window)
                 self.enters.clear()
             self.enters.append(time.monotonic())
+            return self.enters[-1]
+
+    async def __aexit__(self, *err):
+        pass
+
+
+class SharedRateLimiter:
+    """Limits the amount of times a section of code is entered within a sliding window of time across processes.
+
+    The times of the last enters are kept in shared memory, so the limiter can be handed to processes started with
+    multiprocessing (e.g., as an argument to a pool initializer) to share a rate limit between them. Entering the
+    limiter returns the time (as given by time.monotonic) that it was entered at.
+    """
+
+    def __init__(self, max_enters: int, window_size: int, context=multiprocessing):
+        """
+        :param max_enters: Max number of enters inside a window.
+        :param window_size: Window size in seconds.
+        :param context: Multiprocessing context of the processes sharing the limiter.
+        """
+        self.max_enters = max_enters
+        self.window_size = window_size
+        self._lock = context.Lock()
+        self._enters = context.RawArray("d", [float("-inf")] * max_enters)
+        self._oldest = context.RawValue("i", 0)
+
+    async def __aenter__(self):
+        while True:
+            # The lock is only held for a few operations, so it is acquired without blocking the event loop for long.
+            with self._lock:
+                now = time.monotonic()
+                wait = self._enters[self._oldest.value] + self.window_size - now
+                if wait <= 0:
+                    self._enters[self._oldest.value] = now
+                    self._oldest.value = (self._oldest.value + 1) % self.max_enters
+                    return now
+            await asyncio.sleep(wait)
 
     async def __aexit__(self, *err):
         pass
@@ -91,3 +169,178 @@ def chunks(seq: Sequence[T], chunk_size: int) -> Iterator[Sequence[T]]:
     """
     for i in range(0, len(seq), chunk_size):
         yield seq[i : i + chunk_size]
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate the memory footprint of an object and the objects it contains.
+
+    :param obj: Object.
+    :return: Size in bytes.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k) + deep_sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item) for item in obj)
+    return size
+
+
+class LRUCache(MutableMapping):
+    """Mapping that evicts its least recently used items when the total size of its values exceeds a limit."""
+
+    def __init__(
+        self, max_size: Optional[int], sizeof: Callable[[Any], int] = deep_sizeof
+    ):
+        """
+        :param max_size: Max total size of the values. If None, nothing is evicted.
+        :param sizeof: Function used to find the size of a value. Defaults to its approximate size in bytes.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.evictions = 0
+        self._sizeof = sizeof
+        self._items = OrderedDict()
+        self._sizes = {}
+
+    def __getitem__(self, key):
+        value = self._items[key]
+        self._items.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._items:
+            del self[key]
+        self._items[key] = value
+        self._sizes[key] = self._sizeof(value)
+        self.size += self._sizes[key]
+        # The newest item is kept even if it is larger than the limit on its own.
+        while (
+            self.max_size is not None
+            and self.size > self.max_size
+            and len(self._items) > 1
+        ):
+            del self[next(iter(self._items))]
+            self.evictions += 1
+
+    def __delitem__(self, key):
+        del self._items[key]
+        self.size -= self._sizes.pop(key)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class KeyedLocks:
+    """Locks that are created on demand and discarded once no coroutine holds or waits for them."""
+
+    def __init__(self):
+        self._locks: Dict[Hashable, Tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable):
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def __len__(self):
+        return len(self._locks)
+
+
+class BatchRequestError(Exception):
+    """Raised for the keys of a batch call that failed as a whole (e.g., because it was rate limited), as opposed to
+    keys that were not found. Unlike errors of single keys, these errors are transient, so they are not remembered."""
+
+
+class MicroBatcher:
+    """Coalesces concurrent calls for single keys into batch calls.
+
+    Keys requested within a short window of the first key of a batch are fetched together in a single call. A batch is
+    fetched early once it is full, and keys that are requested several times in the same batch are fetched once.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[List[Hashable]], Awaitable[List[Any]]],
+        max_size: int,
+        window: float,
+    ):
+        """
+        :param fetch: Coroutine function that fetches a batch of keys. It returns the value of each key, in the order of
+        the keys, where values that are exceptions are raised to the callers of those keys. If it does not return one
+        value per key, BatchRequestError is raised to the callers of all the keys.
+        :param max_size: Max number of keys per batch.
+        :param window: Time (in seconds) that a batch waits for more keys before it is fetched.
+        """
+        self._fetch = fetch
+        self.max_size = max_size
+        self.window = window
+        self._batch: Dict[Hashable, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def get(self, key: Hashable) -> Any:
+        """Get the value of a key from the batch that it is fetched in.
+
+        :param key: Key.
+        :return: Value.
+        """
+        future = self._batch.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._batch[key] = loop.create_future()
+            if len(self._batch) >= self.max_size:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        # The future is shielded so that a cancelled caller does not cancel the other callers of the same key.
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._batch = self._batch, {}
+        if batch:
+            # A reference to the task is kept so that it is not garbage collected before it is done.
+            task = asyncio.ensure_future(self._fetch_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch_batch(self, batch: Dict[Hashable, asyncio.Future]):
+        try:
+            values = await self._fetch(list(batch))
+        except asyncio.CancelledError:
+            for future in batch.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            values = [e] * len(batch)
+        if len(values) != len(batch):
+            # Values cannot be matched with keys, and callers of unmatched keys would otherwise wait forever.
+            error = BatchRequestError(
+                f"Batch call returned {len(values)} values for {len(batch)} keys."
+            )
+            values = [error] * len(batch)
+        for future, value in zip(batch.values(), values):
+            if future.done():
+                continue
+            if isinstance(value, Exception):
+                future.set_exception(value)
+            else:
+                future.set_result(value)
@@ -1,12 +1,14 @@
-import asyncio
 import random
 import numpy as np
-from typing import List, Dict
+from typing import List, MutableMapping
 
-from arxivdigest_recommenders.recommender import ArxivdigestRecommender
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender, run
 from arxivdigest_recommenders.semantic_scholar import SemanticScholar
-from arxivdigest_recommenders.author_representation import venue_author_representation
-from arxivdigest_recommenders.util import pad_shortest, padded_cosine_sim
+from arxivdigest_recommenders.author_representation import (
+    stream_venue_author_representation,
+)
+from arxivdigest_recommenders.score_store import paper_fingerprint
+from arxivdigest_recommenders.util import pad_shortest, padded_cosine_sim, LRUCache
 from arxivdigest_recommenders import config
 
 
@@ -58,18 +60,31 @@ def explanation(
 class VenueCoPubRecommender(ArxivdigestRecommender):
     """Recommender system based on venue co-publishing."""
 
+    _uses_candidate_authors = True
+
     def __init__(self):
         super().__init__(config.VENUE_COPUB_API_KEY, "VenueCoPubRecommender")
         self._venues: List[str] = []
-        self._authors: Dict[str, np.ndarray] = {}
+        self._authors: MutableMapping[str, np.ndarray] = LRUCache(
+            config.MAX_CACHE_SIZE
+        )
 
     async def author_representation(self, s2_id: str) -> np.ndarray:
         if s2_id not in self._authors:
             async with SemanticScholar() as s2:
-                papers = await s2.author_papers(s2_id)
-            self._authors[s2_id] = venue_author_representation(self._venues, papers)
+                self._authors[s2_id] = await stream_venue_author_representation(
+                    self._venues,
+                    s2.iter_author_papers(
+                        s2_id, max_papers=self._plan.max_author_papers
+                    ),
+                )
         return self._authors[s2_id]
 
+    def paper_fingerprint(self, paper: dict) -> str:
+        # Recent candidate papers are among the published papers of their authors, so their venues are part of the
+        # authors' representations.
+        return paper_fingerprint(paper, paper["venue"])
+
     async def score_paper(self, user, user_s2_id, paper_id):
         async with SemanticScholar() as s2:
             paper = await s2.paper(arxiv_id=paper_id)
@@ -79,7 +94,7 @@ class VenueCoPubRecommender(ArxivdigestRecommender):
         similar_author = None
         similar_author_name = None
         score = 0
-        for author in paper["authors"]:
+        for author in paper["authors"][: self._plan.max_paper_authors]:
             if not author["authorId"]:
                 continue
             try:
@@ -108,5 +123,4 @@ class VenueCoPubRecommender(ArxivdigestRecommender):
 
 
 if __name__ == "__main__":
-    recommender = VenueCoPubRecommender()
-    asyncio.run(recommender.recommend())
+    run(VenueCoPubRecommender())
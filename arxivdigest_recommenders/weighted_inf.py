@@ -1,12 +1,13 @@
 import asyncio
-from collections import defaultdict
-from typing import List, Dict, DefaultDict
+from typing import List, Dict, MutableMapping, Sequence, Tuple
 import numpy as np
 
-from arxivdigest_recommenders.recommender import ArxivdigestRecommender
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender, run
 from arxivdigest_recommenders.semantic_scholar import SemanticScholar
-from arxivdigest_recommenders.author_representation import venue_author_representation
-from arxivdigest_recommenders.util import pad_shortest, padded_cosine_sim
+from arxivdigest_recommenders.author_representation import VenueCounts
+from arxivdigest_recommenders.score_store import paper_fingerprint
+from arxivdigest_recommenders.util import pad_shortest, LRUCache
+from arxivdigest_recommenders.executor import run_cpu
 from arxivdigest_recommenders import config
 
 
@@ -15,7 +16,7 @@ def explanation(
     user: np.ndarray,
     author: np.ndarray,
     author_name: str,
-    author_influence: DefaultDict[int, int],
+    author_influence: np.ndarray,
 ) -> str:
     user, author = pad_shortest(user, author)
     common_venue_indexes = sorted(
@@ -34,74 +35,131 @@ def explanation(
     )
 
 
+def author_scores(
+    user: np.ndarray,
+    authors: Sequence[np.ndarray],
+    influence: Sequence[Tuple[np.ndarray, np.ndarray]],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Score authors based on their influence at the venues the user has published at and their venue co-publishing
+    similarity with the user.
+
+    :param user: User representation.
+    :param authors: Author representations.
+    :param influence: Venue indexes and influence at those venues for each author.
+    :return: Author scores and a matrix containing the influence of each author at each venue.
+    """
+    length = max(len(user), *(len(author) for author in authors))
+    user = np.pad(user, (0, length - len(user)))
+    author_matrix = np.zeros((len(authors), length))
+    for i, author in enumerate(authors):
+        author_matrix[i, : len(author)] = author
+    influence_matrix = np.zeros((len(authors), length))
+    rows = np.repeat(
+        np.arange(len(authors)), [len(indexes) for indexes, _ in influence]
+    )
+    if len(rows) > 0:
+        influence_matrix[
+            rows, np.concatenate([indexes for indexes, _ in influence])
+        ] = np.concatenate([values for _, values in influence])
+    norms = np.linalg.norm(author_matrix, axis=1) * np.linalg.norm(user)
+    similarity = np.divide(
+        author_matrix @ user, norms, out=np.zeros(len(authors)), where=norms > 0
+    )
+    return (influence_matrix @ (user > 0)) * similarity, influence_matrix
+
+
 class WeightedInfRecommender(ArxivdigestRecommender):
     """Recommender system based on venue co-publishing and author influence."""
 
+    _uses_candidate_authors = True
+
     def __init__(self):
         super().__init__(config.WEIGHTED_INF_API_KEY, "WeightedInfRecommender")
         self._venues: List[str] = []
-        self._authors: Dict[str, np.ndarray] = {}
-        self._influence: Dict[str, DefaultDict[int, int]] = {}
+        self._venue_indexes: Dict[str, int] = {}
+        # Author representations are kept together with the indexes of the venues where the authors are influential and
+        # their influence at those venues, so that both are evicted at the same time.
+        self._authors: MutableMapping[
+            str, Tuple[np.ndarray, np.ndarray, np.ndarray]
+        ] = LRUCache(config.MAX_CACHE_SIZE)
 
-    async def author_representation(self, s2_id: str) -> np.ndarray:
+    async def author_representation(
+        self, s2_id: str
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         if s2_id not in self._authors:
+            counts = VenueCounts(self._venues, self._venue_indexes)
+            venue_influence: Dict[int, int] = {}
             async with SemanticScholar() as s2:
-                papers = await s2.author_papers(s2_id)
-            self._authors[s2_id] = venue_author_representation(self._venues, papers)
-            author_influence = defaultdict(int)
-            for paper in papers:
-                if paper["venue"] and paper["venue"] in self._venues:
-                    author_influence[self._venues.index(paper["venue"])] += paper[
-                        "influentialCitationCount"
-                    ]
-            self._influence[s2_id] = defaultdict(
-                int,
-                {
-                    venue_index: venue_influence
-                    for venue_index, venue_influence in author_influence.items()
-                    if venue_influence >= config.WEIGHTED_INF_MIN_INFLUENCE
-                },
+                async for paper in s2.iter_author_papers(
+                    s2_id, max_papers=self._plan.max_author_papers
+                ):
+                    venue_index = counts.add(paper)
+                    if venue_index is not None:
+                        venue_influence[venue_index] = (
+                            venue_influence.get(venue_index, 0)
+                            + paper["influentialCitationCount"]
+                        )
+            representation = counts.representation()
+            author_influence = np.zeros(len(representation), dtype=int)
+            for venue_index, influence in venue_influence.items():
+                author_influence[venue_index] = influence
+            influential_venues = np.flatnonzero(
+                author_influence >= config.WEIGHTED_INF_MIN_INFLUENCE
+            )
+            self._authors[s2_id] = (
+                representation,
+                influential_venues,
+                author_influence[influential_venues],
             )
         return self._authors[s2_id]
 
+    def paper_fingerprint(self, paper: dict) -> str:
+        # Recent candidate papers are among the published papers of their authors, so their venues and influence are
+        # part of the authors' representations.
+        return paper_fingerprint(
+            paper, paper["venue"], paper["influentialCitationCount"]
+        )
+
     async def score_paper(self, user, user_s2_id, paper_id):
         async with SemanticScholar() as s2:
             paper = await s2.paper(arxiv_id=paper_id)
         if user_s2_id in [a["authorId"] for a in paper["authors"]]:
             return
-        user_representation = await self.author_representation(user_s2_id)
-        user_venue_indexes = np.nonzero(user_representation)[0]
-        similar_author = None
-        similar_author_name = None
-        similar_author_influence = None
-        score = 0
-        for author in paper["authors"]:
-            if not author["authorId"]:
-                continue
-            try:
-                author_representation = await self.author_representation(
-                    author["authorId"]
-                )
-                author_influence = self._influence[author["authorId"]]
-            except Exception:
-                continue
-            author_score = np.sum(
-                np.vectorize(author_influence.__getitem__)(user_venue_indexes)
-            ) * padded_cosine_sim(user_representation, author_representation)
-            if author_score > score:
-                similar_author = author_representation
-                similar_author_name = author["name"]
-                similar_author_influence = author_influence
-                score = author_score
+        user_representation, _, _ = await self.author_representation(user_s2_id)
+        authors = [
+            author
+            for author in paper["authors"][: self._plan.max_paper_authors]
+            if author["authorId"]
+        ]
+        representations = await asyncio.gather(
+            *[self.author_representation(author["authorId"]) for author in authors],
+            return_exceptions=True,
+        )
+        authors = [
+            (author, representation)
+            for author, representation in zip(authors, representations)
+            if not isinstance(representation, Exception)
+        ]
+        if not authors:
+            return {"article_id": paper_id, "score": 0, "explanation": ""}
+        scores, influence = await run_cpu(
+            author_scores,
+            user_representation,
+            [representation for _, (representation, _, _) in authors],
+            [(indexes, values) for _, (_, indexes, values) in authors],
+        )
+        most_similar = int(np.argmax(scores))
+        similar_author, (similar_author_representation, _, _) = authors[most_similar]
+        score = scores[most_similar]
         return {
             "article_id": paper_id,
             "score": score,
             "explanation": explanation(
                 self._venues,
                 user_representation,
-                similar_author,
-                similar_author_name,
-                similar_author_influence,
+                similar_author_representation,
+                similar_author["name"],
+                influence[most_similar],
             )
             if score > 0
             else "",
@@ -109,5 +167,4 @@ class WeightedInfRecommender(ArxivdigestRecommender):
 
 
 if __name__ == "__main__":
-    recommender = WeightedInfRecommender()
-    asyncio.run(recommender.recommend())
+    run(WeightedInfRecommender())
@@ -0,0 +1,313 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+from arxivdigest_recommenders import config
+
+
+class Lease(NamedTuple):
+    """Lease of a work item. The item is hidden from other workers until the lease is completed or expires."""
+
+    id: str
+    item: Dict[str, Any]
+
+
+class WorkQueue(ABC):
+    """Queue of work items (e.g., user batches) shared by the coordinator and the workers of a distributed run.
+
+    Workers lease items for a visibility timeout. Items whose leases are requeued, or expire because a worker died,
+    are put back in the queue with their attempt count increased. The queue also carries the context of the run and
+    the stats that workers report back to the coordinator.
+    """
+
+    @abstractmethod
+    async def reset(self):
+        """Remove all items, leases, reports, and the run context."""
+        pass
+
+    @abstractmethod
+    async def put(self, items: List[Dict[str, Any]]):
+        pass
+
+    @abstractmethod
+    async def lease(self, visibility_timeout: float) -> Optional[Lease]:
+        """Lease the next item.
+
+        :param visibility_timeout: Time (in seconds) until the lease expires.
+        :return: Lease, or None if the queue is empty.
+        """
+        pass
+
+    @abstractmethod
+    async def extend(self, lease: Lease, visibility_timeout: float) -> bool:
+        """Extend a lease, so that the item stays hidden from other workers while it is still being processed.
+
+        :param lease: Lease.
+        :param visibility_timeout: Time (in seconds) from now until the lease expires.
+        :return: Whether the lease was still held, i.e., had not expired.
+        """
+        pass
+
+    @abstractmethod
+    async def complete(self, lease: Lease) -> bool:
+        """Remove a leased item for good.
+
+        :param lease: Lease.
+        :return: Whether the lease was still held, i.e., had not expired.
+        """
+        pass
+
+    @abstractmethod
+    async def requeue(self, lease: Lease) -> bool:
+        """Put a leased item back in the queue.
+
+        :param lease: Lease.
+        :return: Whether the lease was still held, i.e., had not expired.
+        """
+        pass
+
+    @abstractmethod
+    async def requeue_expired(self) -> int:
+        """Put items with expired leases back in the queue.
+
+        :return: Number of requeued items.
+        """
+        pass
+
+    @abstractmethod
+    async def pending(self) -> int:
+        """Get the number of items that are either queued or leased."""
+        pass
+
+    @abstractmethod
+    async def set_context(self, context: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    async def get_context(self) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def report(self, stats: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    async def reports(self) -> List[Dict[str, Any]]:
+        """Remove and return the reports received since the last call."""
+        pass
+
+
+def _requeued(raw_item: str) -> str:
+    item = json.loads(raw_item)
+    item["attempts"] = item.get("attempts", 0) + 1
+    return json.dumps(item)
+
+
+class MemoryWorkQueue(WorkQueue):
+    """In-memory work queue for runs with workers in a single process (e.g., in tests)."""
+
+    def __init__(self):
+        self._queue: Deque[str] = deque()
+        self._leases: Dict[str, float] = {}
+        self._context: Optional[Dict[str, Any]] = None
+        self._reports: List[Dict[str, Any]] = []
+
+    async def reset(self):
+        self._queue.clear()
+        self._leases.clear()
+        self._context = None
+        self._reports.clear()
+
+    async def put(self, items):
+        self._queue.extend(json.dumps(item) for item in items)
+
+    async def lease(self, visibility_timeout):
+        if not self._queue:
+            return None
+        raw_item = self._queue.popleft()
+        self._leases[raw_item] = time.monotonic() + visibility_timeout
+        return Lease(raw_item, json.loads(raw_item))
+
+    async def extend(self, lease, visibility_timeout):
+        now = time.monotonic()
+        if self._leases.get(lease.id, now) <= now:
+            return False
+        self._leases[lease.id] = now + visibility_timeout
+        return True
+
+    async def complete(self, lease):
+        return self._leases.pop(lease.id, None) is not None
+
+    async def requeue(self, lease):
+        if self._leases.pop(lease.id, None) is None:
+            return False
+        self._queue.append(_requeued(lease.id))
+        return True
+
+    async def requeue_expired(self):
+        now = time.monotonic()
+        expired = [
+            raw_item for raw_item, deadline in self._leases.items() if deadline <= now
+        ]
+        for raw_item in expired:
+            del self._leases[raw_item]
+            self._queue.append(_requeued(raw_item))
+        return len(expired)
+
+    async def pending(self):
+        return len(self._queue) + len(self._leases)
+
+    async def set_context(self, context):
+        self._context = context
+
+    async def get_context(self):
+        return self._context
+
+    async def report(self, stats):
+        self._reports.append(stats)
+
+    async def reports(self):
+        reports, self._reports = self._reports, []
+        return reports
+
+
+# Leases are kept in a sorted set scored by their deadline. Lease deadlines are based on the clock of the Redis server,
+# so that the clocks of the worker hosts do not need to be in sync.
+_LEASE_SCRIPT = """
+local raw_item = redis.call('RPOP', KEYS[1])
+if not raw_item then
+    return nil
+end
+local now = redis.call('TIME')
+redis.call('ZADD', KEYS[2], tonumber(now[1]) + tonumber(ARGV[1]), raw_item)
+return raw_item
+"""
+
+_EXTEND_SCRIPT = """
+local deadline = redis.call('ZSCORE', KEYS[1], ARGV[1])
+local now = redis.call('TIME')
+if not deadline or tonumber(deadline) <= tonumber(now[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], tonumber(now[1]) + tonumber(ARGV[2]), ARGV[1])
+return 1
+"""
+
+_REQUEUE_SCRIPT = """
+if redis.call('ZREM', KEYS[2], ARGV[1]) == 0 then
+    return 0
+end
+local item = cjson.decode(ARGV[1])
+item['attempts'] = (item['attempts'] or 0) + 1
+redis.call('LPUSH', KEYS[1], cjson.encode(item))
+return 1
+"""
+
+_REQUEUE_EXPIRED_SCRIPT = """
+local now = redis.call('TIME')
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', tonumber(now[1]))
+for _, raw_item in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], raw_item)
+    local item = cjson.decode(raw_item)
+    item['attempts'] = (item['attempts'] or 0) + 1
+    redis.call('LPUSH', KEYS[1], cjson.encode(item))
+end
+return #expired
+"""
+
+
+class RedisWorkQueue(WorkQueue):
+    """Work queue backed by a Redis list, shared by workers on different hosts."""
+
+    def __init__(self, name: str):
+        """
+        :param name: Queue name, used as prefix for the Redis keys of the queue.
+        """
+        from aioredis import Redis
+
+        self._redis = Redis(
+            host=config.REDIS_HOST, port=config.REDIS_PORT, decode_responses=True
+        )
+        self._queue_key = f"{name}:queue"
+        self._leases_key = f"{name}:leases"
+        self._context_key = f"{name}:context"
+        self._reports_key = f"{name}:reports"
+        self._lease_script = self._redis.register_script(_LEASE_SCRIPT)
+        self._extend_script = self._redis.register_script(_EXTEND_SCRIPT)
+        self._requeue_script = self._redis.register_script(_REQUEUE_SCRIPT)
+        self._requeue_expired_script = self._redis.register_script(
+            _REQUEUE_EXPIRED_SCRIPT
+        )
+
+    async def reset(self):
+        await self._redis.delete(
+            self._queue_key, self._leases_key, self._context_key, self._reports_key
+        )
+
+    async def put(self, items):
+        if items:
+            await self._redis.lpush(
+                self._queue_key, *(json.dumps(item) for item in items)
+            )
+
+    async def lease(self, visibility_timeout):
+        raw_item = await self._lease_script(
+            keys=[self._queue_key, self._leases_key], args=[visibility_timeout]
+        )
+        if raw_item is None:
+            return None
+        return Lease(raw_item, json.loads(raw_item))
+
+    async def extend(self, lease, visibility_timeout):
+        return (
+            await self._extend_script(
+                keys=[self._leases_key], args=[lease.id, visibility_timeout]
+            )
+            == 1
+        )
+
+    async def complete(self, lease):
+        return await self._redis.zrem(self._leases_key, lease.id) == 1
+
+    async def requeue(self, lease):
+        return (
+            await self._requeue_script(
+                keys=[self._queue_key, self._leases_key], args=[lease.id]
+            )
+            == 1
+        )
+
+    async def requeue_expired(self):
+        return await self._requeue_expired_script(
+            keys=[self._queue_key, self._leases_key]
+        )
+
+    async def pending(self):
+        # Both counts are read in a single transaction, since items move between the queue and the leases (e.g., when
+        # expired leases are requeued) and could otherwise be missed by both counts.
+        async with self._redis.pipeline(transaction=True) as pipe:
+            queued, leased = (
+                await pipe.llen(self._queue_key).zcard(self._leases_key).execute()
+            )
+        return queued + leased
+
+    async def set_context(self, context):
+        await self._redis.set(self._context_key, json.dumps(context))
+
+    async def get_context(self):
+        context = await self._redis.get(self._context_key)
+        return None if context is None else json.loads(context)
+
+    async def report(self, stats):
+        await self._redis.rpush(self._reports_key, json.dumps(stats))
+
+    async def reports(self):
+        async with self._redis.pipeline(transaction=True) as pipe:
+            reports, _ = (
+                await pipe.lrange(self._reports_key, 0, -1)
+                .delete(self._reports_key)
+                .execute()
+            )
+        return [json.loads(report) for report in reports]
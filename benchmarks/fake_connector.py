@@ -0,0 +1,59 @@
+from datetime import date
+from typing import Any, Dict, List, Sequence
+
+from benchmarks.synthetic import SyntheticDataset
+
+
+class FakeConnector:
+    """Stand-in for the arXivDigest connector that serves the candidate papers and users of a synthetic dataset, and
+    keeps submitted recommendations in memory."""
+
+    def __init__(
+        self, dataset: SyntheticDataset, num_users: int = None, batch_size=100
+    ):
+        """
+        :param dataset: Dataset.
+        :param num_users: Number of users (defaults to all users of the dataset).
+        :param batch_size: Number of user IDs returned by get_user_ids.
+        """
+        self._dataset = dataset
+        self._num_users = (
+            dataset.num_users
+            if num_users is None
+            else min(num_users, dataset.num_users)
+        )
+        self._batch_size = batch_size
+        self.recommendations: Dict[int, List[Dict[str, Any]]] = {}
+
+    def get_article_ids(self) -> List[str]:
+        return self._dataset.candidate_ids()
+
+    def get_article_data(self, article_ids: Sequence[str]) -> Dict[str, dict]:
+        return {
+            article_id: {"article_id": article_id, "date": date.today().isoformat()}
+            for article_id in article_ids
+        }
+
+    def get_number_of_users(self) -> int:
+        return self._num_users
+
+    def get_user_ids(self, offset: int) -> List[int]:
+        return list(range(offset, min(offset + self._batch_size, self._num_users)))
+
+    def get_user_info(self, user_ids: Sequence[int]) -> Dict[int, dict]:
+        return {
+            user_id: {
+                "semantic_scholar_profile": "https://www.semanticscholar.org/author/"
+                + self._dataset.author_id(user_id),
+                "topics": self._dataset.user_topics(user_id),
+            }
+            for user_id in user_ids
+        }
+
+    def get_interleaved_articles(self, user_ids: Sequence[int]) -> Dict[int, list]:
+        return {user_id: [] for user_id in user_ids}
+
+    def send_article_recommendations(
+        self, recommendations: Dict[int, List[Dict[str, Any]]]
+    ):
+        self.recommendations.update(recommendations)
@@ -0,0 +1,146 @@
+"""Load test a recommender end to end against a local stub Semantic Scholar server and a fake arXivDigest connector.
+
+The stub server runs in a separate process and serves a synthetic dataset, which is generated if no dataset is given.
+Responses are cached in memory, and recommendations are kept by the fake connector instead of being submitted.
+The Previously Cited and Topic Search recommender also needs Elasticsearch.
+
+Usage: python -m benchmarks.load_test RECOMMENDER [--dataset PATH] [--users N] [--latency S] [--error-rate P]
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from aiohttp import ClientSession, ClientError
+
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.metrics import metrics
+from arxivdigest_recommenders.semantic_scholar import SemanticScholar, MemoryBackend
+from arxivdigest_recommenders.util import AsyncRateLimiter
+from benchmarks.fake_connector import FakeConnector
+from benchmarks.stub_server import serve
+from benchmarks.synthetic import SyntheticDataset
+
+RECOMMENDERS = {
+    "frequent_venues": "FrequentVenuesRecommender",
+    "venue_copub": "VenueCoPubRecommender",
+    "weighted_inf": "WeightedInfRecommender",
+    "prev_cited": "PrevCitedRecommender",
+    "prev_cited_collab": "PrevCitedCollabRecommender",
+    "prev_cited_topic": "PrevCitedTopicSearchRecommender",
+}
+
+
+async def wait_for_server(url: str, timeout=60.0):
+    start = time.monotonic()
+    async with ClientSession() as session:
+        while True:
+            try:
+                async with session.get(f"{url}/stats") as res:
+                    return await res.json()
+            except ClientError:
+                if time.monotonic() - start > timeout:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+async def load_test(recommender_name: str, connector: FakeConnector, url: str) -> dict:
+    """Run a recommender against the stub server.
+
+    :param recommender_name: Module name of the recommender.
+    :param connector: Fake arXivDigest connector.
+    :param url: Base URL of the stub server.
+    :return: Run stats.
+    """
+    await wait_for_server(url)
+    module = importlib.import_module(f"arxivdigest_recommenders.{recommender_name}")
+    recommender = getattr(module, RECOMMENDERS[recommender_name])()
+    recommender.connector = lambda: connector
+    start = time.perf_counter()
+    await recommender.recommend()
+    elapsed = time.perf_counter() - start
+    async with ClientSession() as session:
+        async with session.get(f"{url}/stats") as res:
+            server_stats = await res.json()
+    return {
+        "recommender": recommender_name,
+        "users": connector.get_number_of_users(),
+        "users_with_recommendations": len(connector.recommendations),
+        "seconds": round(elapsed, 2),
+        "users_per_second": round(connector.get_number_of_users() / elapsed, 2),
+        "s2_requests": SemanticScholar.requests,
+        "s2_cache_hits": SemanticScholar.cache_hits,
+        "s2_errors": SemanticScholar.errors,
+        "server": server_stats,
+        "metrics": metrics.report(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("recommender", choices=RECOMMENDERS)
+    parser.add_argument("--dataset", help="dataset path (.npz)")
+    parser.add_argument("--authors", type=int, default=5000)
+    parser.add_argument("--papers", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-requests", type=int)
+    parser.add_argument("--window-size", type=float, default=1.0)
+    parser.add_argument(
+        "--client-max-requests",
+        type=int,
+        default=100000,
+        help="max number of requests per window made by the recommender",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="coalesce paper and author lookups into batch requests",
+    )
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset_path = args.dataset
+        if dataset_path is None:
+            dataset_path = os.path.join(tmp_dir, "dataset.npz")
+            SyntheticDataset.generate(args.authors, args.papers).save(dataset_path)
+        server = multiprocessing.get_context("spawn").Process(
+            target=serve,
+            args=(dataset_path, args.port),
+            kwargs={
+                "latency": args.latency,
+                "latency_jitter": args.latency_jitter,
+                "error_rate": args.error_rate,
+                "throttle_rate": args.throttle_rate,
+                "max_requests": args.max_requests,
+                "window_size": args.window_size,
+            },
+            daemon=True,
+        )
+        server.start()
+        url = f"http://127.0.0.1:{args.port}"
+        SemanticScholar._base_url = f"{url}/v1"
+        SemanticScholar._batch_base_url = f"{url}/v1"
+        config.S2_BATCH_REQUESTS = args.batch
+        SemanticScholar._cache = MemoryBackend()
+        SemanticScholar._limiter = AsyncRateLimiter(
+            args.client_max_requests, config.S2_WINDOW_SIZE
+        )
+        config.CHECKPOINT_DIR = None
+        connector = FakeConnector(SyntheticDataset.load(dataset_path), args.users)
+        try:
+            stats = asyncio.run(load_test(args.recommender, connector, url))
+        finally:
+            server.terminate()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
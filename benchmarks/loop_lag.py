@@ -0,0 +1,114 @@
+"""Measure how much event loop lag JSON decoding and batch scoring cause, with and without offloading them to the
+executor pools.
+
+A ticker coroutine sleeps for 1 ms at a time and records how late it wakes up, while large author documents are
+decoded and papers are scored concurrently.
+
+Usage: python -m benchmarks.loop_lag [--documents N] [--papers N]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+
+from arxivdigest_recommenders import config, executor
+from arxivdigest_recommenders.weighted_inf import author_scores
+
+TICK = 0.001
+
+
+def author_document(num_papers: int) -> str:
+    """Create a cache entry for an author with many papers and references."""
+    return json.dumps(
+        {
+            "expiration": "2100-01-01",
+            "data": {
+                "papers": [
+                    {
+                        "paperId": f"p{i}",
+                        "venue": f"Venue {i % 50}",
+                        "year": 2020,
+                        "references": [
+                            {
+                                "paperId": f"r{j}",
+                                "authors": [
+                                    {"authorId": str(k), "name": f"Author {k}"}
+                                    for k in range(5)
+                                ],
+                            }
+                            for j in range(40)
+                        ],
+                    }
+                    for i in range(num_papers)
+                ]
+            },
+        }
+    )
+
+
+async def ticker(lags, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def measure(work) -> dict:
+    lags = []
+    stop = asyncio.Event()
+    task = asyncio.create_task(ticker(lags, stop))
+    start = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await task
+    lags = np.array(lags) * 1000
+    return {
+        "seconds": round(elapsed, 3),
+        "mean_lag_ms": round(float(lags.mean()), 2),
+        "p99_lag_ms": round(float(np.percentile(lags, 99)), 2),
+        "max_lag_ms": round(float(lags.max()), 2),
+    }
+
+
+async def decode_documents(documents):
+    await asyncio.gather(*[executor.decode_json(document) for document in documents])
+
+
+async def score_papers(num_papers: int):
+    rng = np.random.default_rng(0)
+    user = rng.integers(0, 5, 2000)
+    authors = [rng.integers(0, 5, 2000) for _ in range(20)]
+    influence = [(np.arange(0, 2000, 10), rng.integers(0, 50, 200)) for _ in range(20)]
+    await asyncio.gather(
+        *[
+            executor.run_cpu(author_scores, user, authors, influence)
+            for _ in range(num_papers)
+        ]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--papers", type=int, default=500)
+    args = parser.parse_args()
+    documents = [author_document(300) for _ in range(args.documents)]
+    print(
+        f"Decoding {args.documents} documents of {len(documents[0]) / 2 ** 20:.1f} MB"
+    )
+    for threads in (0, 4):
+        config.EXECUTOR_DECODE_THREADS = threads
+        result = asyncio.run(measure(lambda: decode_documents(documents)))
+        print(f"  decode_threads={threads}: {result}")
+    print(f"Scoring {args.papers} papers")
+    for processes in (0, 4):
+        config.EXECUTOR_PROCESSES = processes
+        result = asyncio.run(measure(lambda: score_papers(args.papers)))
+        print(f"  processes={processes}: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Local stand-in for the Semantic Scholar API that serves a synthetic dataset.
+
+The server mimics the /v1/paper/{id} and /v1/author/{id} endpoints, as well as the /v1/paper/batch and
+/v1/author/batch endpoints of the Graph API, and can simulate latency, server errors, and rate limiting. Request counts
+are served at /stats.
+
+Usage: python -m benchmarks.stub_server DATASET [--port N] [--latency S] [--error-rate P] [--max-requests N]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from aiohttp import web
+from typing import Callable, Optional
+
+from benchmarks.synthetic import SyntheticDataset
+
+
+def graph_doc(doc: dict) -> dict:
+    """Convert a document to the shape of the documents of the Graph API, which has external IDs instead of arXiv IDs
+    and no topics."""
+    doc = {name: value for name, value in doc.items() if name != "topics"}
+    if "arxivId" in doc:
+        arxiv_id = doc.pop("arxivId")
+        doc["externalIds"] = {} if arxiv_id is None else {"ArXiv": arxiv_id}
+    return doc
+
+
+def create_app(
+    dataset: SyntheticDataset,
+    latency=0.0,
+    latency_jitter=0.0,
+    error_rate=0.0,
+    throttle_rate=0.0,
+    max_requests: Optional[int] = None,
+    window_size=1.0,
+    seed=0,
+) -> web.Application:
+    """Create the stub server application.
+
+    :param dataset: Dataset to serve.
+    :param latency: Mean response latency in seconds.
+    :param latency_jitter: Standard deviation of the response latency in seconds.
+    :param error_rate: Fraction of requests that are answered with 500 Internal Server Error.
+    :param throttle_rate: Fraction of requests that are answered with 429 Too Many Requests regardless of the rate.
+    :param max_requests: Max number of requests per window before requests are answered with 429 Too Many Requests.
+    :param window_size: Rate limit window size in seconds.
+    :param seed: Random seed.
+    :return: Application.
+    """
+    rng = random.Random(seed)
+    stats = {
+        "requests": 0,
+        "errors": 0,
+        "throttled": 0,
+        "not_found": 0,
+        "batch_requests": 0,
+        "batched_ids": 0,
+    }
+    window = {"start": time.monotonic(), "requests": 0}
+
+    @web.middleware
+    async def simulate(request: web.Request, handler):
+        if request.path == "/stats":
+            return await handler(request)
+        stats["requests"] += 1
+        if latency > 0 or latency_jitter > 0:
+            await asyncio.sleep(max(rng.gauss(latency, latency_jitter), 0))
+        now = time.monotonic()
+        if now - window["start"] >= window_size:
+            window.update(start=now, requests=0)
+        window["requests"] += 1
+        if (
+            max_requests is not None and window["requests"] > max_requests
+        ) or rng.random() < throttle_rate:
+            stats["throttled"] += 1
+            raise web.HTTPTooManyRequests()
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            raise web.HTTPInternalServerError()
+        return await handler(request)
+
+    async def paper(request: web.Request) -> web.Response:
+        index = dataset.find_paper(request.match_info["paper_id"])
+        if index is None:
+            stats["not_found"] += 1
+            raise web.HTTPNotFound()
+        return web.json_response(dataset.paper(index))
+
+    async def author(request: web.Request) -> web.Response:
+        index = dataset.find_author(request.match_info["author_id"])
+        if index is None:
+            stats["not_found"] += 1
+            raise web.HTTPNotFound()
+        return web.json_response(dataset.author(index))
+
+    def batch(
+        find: Callable[[str], Optional[int]],
+        build: Callable[[int], dict],
+        max_ids: int,
+    ):
+        async def handler(request: web.Request) -> web.Response:
+            ids = (await request.json())["ids"]
+            if len(ids) > max_ids:
+                raise web.HTTPBadRequest()
+            stats["batch_requests"] += 1
+            stats["batched_ids"] += len(ids)
+            fields = request.query.get("fields")
+            docs = []
+            for s2_id in ids:
+                index = find(s2_id)
+                if index is None:
+                    stats["not_found"] += 1
+                    docs.append(None)
+                    continue
+                doc = graph_doc(build(index))
+                if fields is not None:
+                    # Only the top-level part of nested fields (e.g., "references.authors") is considered.
+                    names = {field.split(".")[0] for field in fields.split(",")}
+                    doc = {name: value for name, value in doc.items() if name in names}
+                docs.append(doc)
+            return web.json_response(docs)
+
+        return handler
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app = web.Application(middlewares=[simulate])
+    app.add_routes(
+        [
+            web.get("/v1/paper/{paper_id}", paper),
+            web.get("/v1/author/{author_id}", author),
+            web.post("/v1/paper/batch", batch(dataset.find_paper, dataset.paper, 500)),
+            web.post(
+                "/v1/author/batch", batch(dataset.find_author, dataset.author, 1000)
+            ),
+            web.get("/stats", get_stats),
+        ]
+    )
+    return app
+
+
+def serve(dataset_path: str, port: int, **kwargs):
+    """Load a dataset and serve it until interrupted.
+
+    :param dataset_path: Path of the dataset.
+    :param port: Port.
+    :param kwargs: Arguments to create_app.
+    """
+    app = create_app(SyntheticDataset.load(dataset_path), **kwargs)
+    web.run_app(app, host="127.0.0.1", port=port, print=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("dataset", help="dataset path (.npz)")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-requests", type=int)
+    parser.add_argument("--window-size", type=float, default=1.0)
+    args = parser.parse_args()
+    serve(
+        args.dataset,
+        args.port,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        max_requests=args.max_requests,
+        window_size=args.window_size,
+    )
+
+
+if __name__ == "__main__":
+    main()
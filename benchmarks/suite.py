@@ -0,0 +1,397 @@
+"""Benchmarks of the recommenders' hot paths.
+
+Each benchmark is timed over several rounds, and the results are stored as JSON so that runs can be compared. A run
+is compared with a baseline run by the compare command, which exits with a non-zero status if any benchmark has
+become slower than the threshold allows.
+
+Usage:
+    python -m benchmarks.suite run [--filter SUBSTRING] [--output PATH]
+    python -m benchmarks.suite compare BASELINE CURRENT [--threshold FRACTION]
+"""
+
+import argparse
+import asyncio
+import importlib
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.author_representation import venue_author_representation
+from arxivdigest_recommenders.semantic_scholar import (
+    CacheBackend,
+    MemoryBackend,
+    MongoDbBackend,
+    RedisBackend,
+    SemanticScholar,
+    SqliteBackend,
+)
+from arxivdigest_recommenders.util import (
+    AsyncRateLimiter,
+    SharedRateLimiter,
+    padded_cosine_sim,
+)
+from benchmarks.synthetic import SyntheticDataset
+
+Benchmark = Callable[[], Union[None, Awaitable[None]]]
+
+BENCHMARKS: Dict[str, Callable[[], Awaitable[Benchmark]]] = {}
+
+# Recommenders that can be benchmarked without external services. The Previously Cited and Topic Search recommender
+# needs Elasticsearch.
+RECOMMENDERS = {
+    "frequent_venues": "FrequentVenuesRecommender",
+    "venue_copub": "VenueCoPubRecommender",
+    "weighted_inf": "WeightedInfRecommender",
+    "prev_cited": "PrevCitedRecommender",
+    "prev_cited_collab": "PrevCitedCollabRecommender",
+}
+
+
+def benchmark(name: str):
+    """Register a benchmark.
+
+    The decorated coroutine function sets up the benchmark and returns the function to time, so that setup is not
+    included in the timings. The timed function may be a coroutine function.
+
+    :param name: Benchmark name.
+    """
+
+    def register(setup: Callable[[], Awaitable[Benchmark]]):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+class WarmBackend(CacheBackend):
+    """In-memory cache backend that is filled with documents built from a synthetic dataset on first access."""
+
+    def __init__(self, dataset: SyntheticDataset):
+        self._dataset = dataset
+        self._docs = MemoryBackend()
+
+    def _build(self, key: str) -> Optional[dict]:
+        _, kind, s2_id = key.split("/", 2)
+        if kind == "paper":
+            index = self._dataset.find_paper(s2_id)
+            data = None if index is None else self._dataset.paper(index)
+        else:
+            index = self._dataset.find_author(s2_id)
+            data = None if index is None else self._dataset.author(index)
+        return None if data is None else {"expiration": "9999-12-31", "data": data}
+
+    async def exists(self, key):
+        if not await self._docs.exists(key):
+            doc = self._build(key)
+            if doc is None:
+                return False
+            await self._docs.set(key, doc)
+        return True
+
+    async def get(self, key):
+        return await self._docs.get(key)
+
+    async def set(self, key, value):
+        await self._docs.set(key, value)
+
+
+_dataset: Optional[SyntheticDataset] = None
+
+
+def dataset() -> SyntheticDataset:
+    global _dataset
+    if _dataset is None:
+        _dataset = SyntheticDataset.generate(
+            num_authors=5000, num_papers=100000, num_candidates=5000, num_users=100
+        )
+        SemanticScholar._cache = WarmBackend(_dataset)
+    return _dataset
+
+
+def benchmark_user(data: SyntheticDataset) -> int:
+    """Get a user that has published a fair number of papers."""
+    return next(
+        user for user in range(data.num_users) if len(data.author(user)["papers"]) >= 20
+    )
+
+
+@benchmark("venue_author_representation")
+async def venue_representation_benchmark() -> Benchmark:
+    rng = np.random.default_rng(0)
+    venues = [f"Venue {i}" for i in range(20000)]
+    venue_indexes = {venue: i for i, venue in enumerate(venues)}
+    papers = [{"venue": f"Venue {i}"} for i in rng.integers(0, 25000, 500)]
+    return lambda: venue_author_representation(
+        list(venues), papers, dict(venue_indexes)
+    )
+
+
+@benchmark("padded_cosine_sim")
+async def padded_cosine_sim_benchmark() -> Benchmark:
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 3, 20000) * (rng.random(20000) < 0.01)
+    b = rng.integers(0, 3, 15000) * (rng.random(15000) < 0.01)
+    return lambda: padded_cosine_sim(a, b)
+
+
+def _recommender_benchmarks(name: str, class_name: str):
+    async def create():
+        data = dataset()
+        module = importlib.import_module(f"arxivdigest_recommenders.{name}")
+        recommender = getattr(module, class_name)()
+        user = benchmark_user(data)
+        user_info = {"topics": data.user_topics(user)}
+        return recommender, user_info, data.author_id(user), data.candidate_ids()
+
+    @benchmark(f"score_paper[{name}]")
+    async def score_paper_benchmark() -> Benchmark:
+        recommender, user_info, user_s2_id, paper_ids = await create()
+        paper_ids = paper_ids[:100]
+
+        async def score_papers():
+            for paper_id in paper_ids:
+                try:
+                    await recommender.score_paper(user_info, user_s2_id, paper_id)
+                except Exception:
+                    pass
+
+        # The recommender's in-memory caches and the cache backend are warmed up before timing.
+        await score_papers()
+        return score_papers
+
+    @benchmark(f"user_ranking[{name}]")
+    async def user_ranking_benchmark() -> Benchmark:
+        recommender, user_info, user_s2_id, paper_ids = await create()
+
+        async def user_ranking():
+            await recommender.user_ranking(user_info, user_s2_id, paper_ids)
+
+        await user_ranking()
+        return user_ranking
+
+
+for recommender_name, recommender_class in RECOMMENDERS.items():
+    _recommender_benchmarks(recommender_name, recommender_class)
+
+
+def _cache_benchmarks(name: str, create_backend: Callable[[], CacheBackend]):
+    # Benchmarks of backends that need a database are skipped if the database is unreachable.
+    @benchmark(f"cache_set[{name}]")
+    async def cache_set_benchmark() -> Benchmark:
+        backend = create_backend()
+        doc = {"expiration": "9999-12-31", "data": dataset().author(0)}
+        await backend.set("/benchmark/0", doc)
+
+        async def set_docs():
+            for i in range(100):
+                await backend.set(f"/benchmark/{i}", doc)
+
+        return set_docs
+
+    @benchmark(f"cache_get[{name}]")
+    async def cache_get_benchmark() -> Benchmark:
+        backend = create_backend()
+        doc = {"expiration": "9999-12-31", "data": dataset().author(0)}
+        for i in range(100):
+            await backend.set(f"/benchmark/{i}", doc)
+
+        async def get_docs():
+            for i in range(100):
+                await backend.get(f"/benchmark/{i}")
+
+        return get_docs
+
+    @benchmark(f"cache_get_many[{name}]")
+    async def cache_get_many_benchmark() -> Benchmark:
+        backend = create_backend()
+        doc = {"expiration": "9999-12-31", "data": dataset().author(0)}
+        keys = [f"/benchmark/{i}" for i in range(100)]
+        await backend.set_many({key: doc for key in keys})
+
+        async def get_docs():
+            await backend.get_many(keys)
+
+        return get_docs
+
+
+_sqlite_dir = tempfile.TemporaryDirectory()
+
+_cache_benchmarks("memory", MemoryBackend)
+_cache_benchmarks("redis", RedisBackend)
+_cache_benchmarks("mongodb", MongoDbBackend)
+_cache_benchmarks(
+    "sqlite", lambda: SqliteBackend(os.path.join(_sqlite_dir.name, "s2cache.db"))
+)
+
+
+# The limiters' windows are so short that they never make callers wait, so only the scheduling overhead is timed.
+
+
+@benchmark("rate_limiter[async]")
+async def async_rate_limiter_benchmark() -> Benchmark:
+    limiter = AsyncRateLimiter(100, 1e-9)
+
+    async def enter():
+        for _ in range(1000):
+            async with limiter:
+                pass
+
+    return enter
+
+
+@benchmark("rate_limiter[shared]")
+async def shared_rate_limiter_benchmark() -> Benchmark:
+    limiter = SharedRateLimiter(100, 1e-9)
+
+    async def enter():
+        for _ in range(1000):
+            async with limiter:
+                pass
+
+    return enter
+
+
+async def time_benchmark(func: Benchmark, rounds: int, min_time: float) -> dict:
+    async def call():
+        result = func()
+        if inspect.isawaitable(result):
+            await result
+
+    # The number of calls per round is chosen so that each round takes at least min_time seconds.
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            await call()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 2**20:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    timings = [elapsed / number]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            await call()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "max": max(timings),
+        "rounds": rounds,
+        "number": number,
+    }
+
+
+async def run_benchmarks(
+    names: List[str], rounds: int, min_time: float
+) -> Dict[str, dict]:
+    results = {}
+    for name in names:
+        try:
+            func = await BENCHMARKS[name]()
+        except Exception as e:
+            print(f"{name}: skipped ({e!r})")
+            continue
+        results[name] = await time_benchmark(func, rounds, min_time)
+        print(f"{name}: {results[name]['median'] * 1000:.3f} ms")
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Compare the median timings of two runs.
+
+    :param baseline: Baseline run.
+    :param current: Current run.
+    :param threshold: Max allowed slowdown as a fraction of the baseline timing.
+    :return: Names of benchmarks that have regressed.
+    """
+    regressions = []
+    for name, result in sorted(current["results"].items()):
+        if name not in baseline["results"]:
+            print(f"{name}: {result['median'] * 1000:.3f} ms (new)")
+            continue
+        change = result["median"] / baseline["results"][name]["median"] - 1
+        regressed = change > threshold
+        print(
+            f"{name}: {baseline['results'][name]['median'] * 1000:.3f} ms -> "
+            f"{result['median'] * 1000:.3f} ms ({change:+.1%})"
+            f"{' REGRESSION' if regressed else ''}"
+        )
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run benchmarks")
+    run_parser.add_argument(
+        "--filter", default="", help="only run benchmarks whose name contains this"
+    )
+    run_parser.add_argument("--rounds", type=int, default=5)
+    run_parser.add_argument(
+        "--min-time", type=float, default=0.2, help="min time (in seconds) per round"
+    )
+    run_parser.add_argument("--output", "-o", help="path of the JSON results")
+    compare_parser = subparsers.add_parser("compare", help="compare two runs")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="max allowed slowdown as a fraction of the baseline timing",
+    )
+    args = parser.parse_args()
+    if args.command == "run":
+        # Benchmarks should not be affected by on-disk state or the log output of the recommenders.
+        config.CHECKPOINT_DIR = None
+        config.INCREMENTAL_ENABLED = False
+        config.LOG_LEVEL = "WARNING"
+        names = [name for name in BENCHMARKS if args.filter in name]
+        results = asyncio.run(run_benchmarks(names, args.rounds, args.min_time))
+        run = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "results": results,
+        }
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(run, file, indent=2)
+    else:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            current = json.load(file)
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Synthetic Semantic Scholar dataset with long-tailed author productivity, venue popularity, and citation counts.
+
+The dataset is stored as a handful of NumPy arrays, and paper and author documents in the format of the Semantic
+Scholar API are built on demand, so that datasets with millions of papers fit in memory.
+
+Usage: python -m benchmarks.synthetic PATH [--authors N] [--papers N] [--venues N] [--candidates N] [--users N]
+"""
+
+import argparse
+import time
+import numpy as np
+from datetime import date
+from typing import Dict, List, Optional
+
+TOPICS = [f"topic {i}" for i in range(200)]
+
+
+def _csr(counts: np.ndarray) -> np.ndarray:
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr
+
+
+def _zipf_weights(n: int, exponent: float) -> np.ndarray:
+    weights = 1 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+class SyntheticDataset:
+    """Synthetic papers and authors.
+
+    Papers are ordered by publication date, and the most recent papers are the candidate papers, which have arXiv IDs.
+    The first authors are the users.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.num_papers = len(arrays["paper_venue"])
+        self.num_authors = len(arrays["author_indptr"]) - 1
+        self.num_venues = int(arrays["num_venues"])
+        self.num_candidates = int(arrays["num_candidates"])
+        self.num_users = int(arrays["num_users"])
+        self._first_candidate = self.num_papers - self.num_candidates
+
+    @classmethod
+    def generate(
+        cls,
+        num_authors=50000,
+        num_papers=1000000,
+        num_venues=5000,
+        num_candidates=5000,
+        num_users=1000,
+        seed=0,
+    ) -> "SyntheticDataset":
+        """Generate a dataset.
+
+        :param num_authors: Number of authors.
+        :param num_papers: Number of papers.
+        :param num_venues: Number of venues.
+        :param num_candidates: Number of candidate papers.
+        :param num_users: Number of users.
+        :param seed: Random seed.
+        :return: Dataset.
+        """
+        rng = np.random.default_rng(seed)
+        # Author productivity is long-tailed, as is the number of authors per paper.
+        author_weights = rng.pareto(2.5, num_authors) + 1
+        author_weights /= author_weights.sum()
+        paper_author_counts = np.minimum(rng.geometric(0.35, num_papers), 50)
+        paper_authors = rng.choice(
+            num_authors, paper_author_counts.sum(), p=author_weights
+        ).astype(np.int32)
+        paper_indptr = _csr(paper_author_counts)
+        # Each author mostly publishes at a few preferred venues, and venue popularity follows Zipf's law.
+        venue_weights = _zipf_weights(num_venues, 1.1)
+        author_venues = rng.choice(num_venues, (num_authors, 3), p=venue_weights)
+        first_authors = paper_authors[paper_indptr[:-1]]
+        paper_venue = np.where(
+            rng.random(num_papers) < 0.7,
+            author_venues[first_authors, rng.integers(0, 3, num_papers)],
+            rng.choice(num_venues, num_papers, p=venue_weights),
+        ).astype(np.int32)
+        paper_venue[rng.random(num_papers) < 0.05] = -1
+        # Papers cite earlier papers, and citations are concentrated on a few popular papers.
+        reference_counts = rng.poisson(15, num_papers)
+        reference_indptr = _csr(reference_counts)
+        popularity = rng.permutation(num_papers)
+        references = popularity[
+            rng.choice(
+                num_papers, reference_counts.sum(), p=_zipf_weights(num_papers, 0.5)
+            )
+        ]
+        citing = np.repeat(np.arange(num_papers), reference_counts)
+        references = np.where(
+            references < citing, references, references % np.maximum(citing, 1)
+        ).astype(np.int32)
+        citation_counts = np.bincount(references, minlength=num_papers)
+        # Author-to-paper index, with each author's papers in publication order.
+        order = np.argsort(paper_authors, kind="stable")
+        author_papers = np.repeat(np.arange(num_papers), paper_author_counts)[order]
+        return cls(
+            {
+                "paper_indptr": paper_indptr,
+                "paper_authors": paper_authors,
+                "paper_venue": paper_venue,
+                "paper_topics": rng.choice(
+                    len(TOPICS),
+                    (num_papers, 2),
+                    p=_zipf_weights(len(TOPICS), 1.0),
+                ).astype(np.int16),
+                "reference_indptr": reference_indptr,
+                "references": references,
+                "influential_citations": rng.binomial(citation_counts, 0.1).astype(
+                    np.int32
+                ),
+                "author_indptr": _csr(
+                    np.bincount(paper_authors, minlength=num_authors)
+                ),
+                "author_papers": author_papers.astype(np.int32),
+                "num_venues": np.array(num_venues),
+                "num_candidates": np.array(num_candidates),
+                "num_users": np.array(num_users),
+            }
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "SyntheticDataset":
+        with np.load(path) as arrays:
+            return cls(dict(arrays))
+
+    def save(self, path: str):
+        np.savez_compressed(path, **self.arrays)
+
+    def year(self, paper: int) -> int:
+        # Papers are spread evenly over the last ten years.
+        return date.today().year - 9 + paper * 10 // self.num_papers
+
+    @staticmethod
+    def paper_id(paper: int) -> str:
+        return f"{paper:040x}"
+
+    @staticmethod
+    def author_id(author: int) -> str:
+        return str(author + 1)
+
+    def arxiv_id(self, paper: int) -> str:
+        return f"2110.{paper - self._first_candidate:05d}"
+
+    def candidate_ids(self) -> List[str]:
+        """Get the arXiv IDs of the candidate papers."""
+        return [
+            self.arxiv_id(paper)
+            for paper in range(self._first_candidate, self.num_papers)
+        ]
+
+    def user_ids(self) -> List[str]:
+        """Get the S2 author IDs of the users."""
+        return [self.author_id(author) for author in range(self.num_users)]
+
+    def user_topics(self, author: int) -> List[str]:
+        papers = self._author_paper_indexes(author)
+        topics = self.arrays["paper_topics"][papers[-5:]].flatten()
+        return [TOPICS[topic] for topic in dict.fromkeys(topics.tolist())]
+
+    def find_paper(self, paper_id: str) -> Optional[int]:
+        """Get the index of a paper from its S2 ID or "arXiv:" prefixed arXiv ID."""
+        try:
+            if paper_id.startswith("arXiv:"):
+                paper = self._first_candidate + int(paper_id.split(".")[-1])
+                return paper if paper < self.num_papers else None
+            paper = int(paper_id, 16)
+        except ValueError:
+            return None
+        return paper if 0 <= paper < self.num_papers else None
+
+    def find_author(self, author_id: str) -> Optional[int]:
+        """Get the index of an author from its S2 ID."""
+        try:
+            author = int(author_id) - 1
+        except ValueError:
+            return None
+        return author if 0 <= author < self.num_authors else None
+
+    def _paper_authors(self, paper: int) -> List[dict]:
+        indptr = self.arrays["paper_indptr"]
+        return [
+            {"authorId": self.author_id(author), "name": f"Author {author + 1}"}
+            for author in self.arrays["paper_authors"][
+                indptr[paper] : indptr[paper + 1]
+            ].tolist()
+        ]
+
+    def _author_paper_indexes(self, author: int) -> np.ndarray:
+        indptr = self.arrays["author_indptr"]
+        return self.arrays["author_papers"][indptr[author] : indptr[author + 1]]
+
+    def paper(self, paper: int) -> dict:
+        """Build the document of a paper, as returned by the /paper endpoint."""
+        venue = int(self.arrays["paper_venue"][paper])
+        indptr = self.arrays["reference_indptr"]
+        topics = [TOPICS[topic] for topic in self.arrays["paper_topics"][paper]]
+        return {
+            "paperId": self.paper_id(paper),
+            "arxivId": self.arxiv_id(paper) if paper >= self._first_candidate else None,
+            "title": f"Paper {paper} about {' and '.join(topics)}",
+            "abstract": f"This paper is about {' and '.join(topics)}.",
+            "venue": f"Venue {venue}" if venue >= 0 else "",
+            "year": self.year(paper),
+            "fieldsOfStudy": ["Computer Science"],
+            "topics": [{"topic": topic} for topic in topics],
+            "influentialCitationCount": int(
+                self.arrays["influential_citations"][paper]
+            ),
+            "authors": self._paper_authors(paper),
+            "references": [
+                {
+                    "paperId": self.paper_id(reference),
+                    "authors": self._paper_authors(reference),
+                }
+                for reference in self.arrays["references"][
+                    indptr[paper] : indptr[paper + 1]
+                ].tolist()
+            ],
+        }
+
+    def author(self, author: int) -> dict:
+        """Build the document of an author, as returned by the /author endpoint."""
+        return {
+            "authorId": self.author_id(author),
+            "name": f"Author {author + 1}",
+            "papers": [
+                {"paperId": self.paper_id(paper), "year": self.year(paper)}
+                for paper in self._author_paper_indexes(author).tolist()
+            ],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="output path (.npz)")
+    parser.add_argument("--authors", type=int, default=50000)
+    parser.add_argument("--papers", type=int, default=1000000)
+    parser.add_argument("--venues", type=int, default=5000)
+    parser.add_argument("--candidates", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    dataset = SyntheticDataset.generate(
+        args.authors, args.papers, args.venues, args.candidates, args.users, args.seed
+    )
+    dataset.save(args.path)
+    print(
+        f"Generated {dataset.num_papers} papers and {dataset.num_authors} authors in "
+        f"{time.perf_counter() - start:.1f} seconds."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,6 @@ with open("requirements.txt") as file:
 setup(
     name="arxivdigest-recommenders",
     author="Olaf Liadal",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "tests"]),
     install_requires=install_requires,
 )
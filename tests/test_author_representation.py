@@ -1,5 +1,15 @@
+import asyncio
 import unittest
-from arxivdigest_recommenders.author_representation import venue_author_representation
+from datetime import date
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.author_representation import (
+    venue_author_representation,
+    citation_author_representation,
+    stream_venue_author_representation,
+    stream_citation_author_representation,
+    AuthorInterner,
+)
+from arxivdigest_recommenders.semantic_scholar import SemanticScholar
 
 
 author_papers = [
@@ -7,6 +17,12 @@ author_papers = [
     [{"venue": "g"}],
 ]
 
+author_references = [
+    {"references": [{"authors": [{"authorId": "1"}, {"authorId": "2"}]}]},
+    {"references": [{"authors": [{"authorId": "2"}, {"authorId": None}]}]},
+    {"references": []},
+]
+
 
 class TestAuthorRepresentation(unittest.TestCase):
     def test_venue_author_representation(self):
@@ -18,6 +34,104 @@ class TestAuthorRepresentation(unittest.TestCase):
         self.assertEqual(list(author_representations[1]), [0, 0, 0, 0, 0, 0, 1])
         self.assertEqual(venues, ["a", "b", "c", "d", "e", "f", "g"])
 
+    def test_venue_author_representation_with_indexes(self):
+        venues = []
+        venue_indexes = {}
+        author_representations = [
+            venue_author_representation(venues, papers, venue_indexes)
+            for papers in author_papers
+        ]
+        self.assertEqual(list(author_representations[0]), [2, 2, 1, 1, 1, 1])
+        self.assertEqual(list(author_representations[1]), [0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(venues, ["a", "b", "c", "d", "e", "f", "g"])
+        self.assertEqual(venue_indexes, {v: i for i, v in enumerate(venues)})
+
+    def test_citation_author_representation(self):
+        interner = AuthorInterner()
+        profile = citation_author_representation(interner, author_references)
+        self.assertEqual(profile["1"], 1)
+        self.assertEqual(profile["2"], 2)
+        self.assertEqual(profile["3"], 0)
+        self.assertEqual(profile[None], 0)
+        self.assertEqual(len(profile), 2)
+        self.assertEqual(len(interner), 2)
+
+
+async def stream(papers):
+    for paper in papers:
+        await asyncio.sleep(0)
+        yield paper
+
+
+class TestStreamingAuthorRepresentation(unittest.IsolatedAsyncioTestCase):
+    async def test_stream_venue_author_representation(self):
+        venues = []
+        venue_indexes = {}
+        author_representations = [
+            await stream_venue_author_representation(
+                venues, stream(papers), venue_indexes
+            )
+            for papers in author_papers
+        ]
+        self.assertEqual(list(author_representations[0]), [2, 2, 1, 1, 1, 1])
+        self.assertEqual(list(author_representations[1]), [0, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(venues, ["a", "b", "c", "d", "e", "f", "g"])
+
+    async def test_stream_citation_author_representation(self):
+        interner = AuthorInterner()
+        profile = await stream_citation_author_representation(
+            interner, stream(author_references)
+        )
+        self.assertEqual((profile["1"], profile["2"], len(profile)), (1, 2, 2))
+
+    async def test_iter_author_papers(self):
+        s2 = SemanticScholar()
+        fetching = set()
+        max_fetching = 0
+
+        async def author(s2_id):
+            return {"papers": [{"paperId": str(i), "year": 2100} for i in range(10)]}
+
+        async def paper(s2_id):
+            nonlocal max_fetching
+            fetching.add(s2_id)
+            max_fetching = max(max_fetching, len(fetching))
+            # Papers with higher IDs arrive sooner.
+            await asyncio.sleep(0.02 * (10 - int(s2_id)))
+            fetching.remove(s2_id)
+            if s2_id == "5":
+                raise ValueError()
+            return {"paperId": s2_id}
+
+        s2.author = author
+        s2.paper = paper
+        papers = [
+            p["paperId"] async for p in s2.iter_author_papers("1", max_concurrency=3)
+        ]
+        self.assertEqual(sorted(papers), ["0", "1", "2", "3", "4", "6", "7", "8", "9"])
+        self.assertEqual(papers[0], "2")
+        self.assertEqual(max_fetching, 3)
+
+    def test_recent_paper_ids(self):
+        year = date.today().year
+        author = {
+            "papers": [
+                {"paperId": "old", "year": year - 20},
+                {"paperId": "new", "year": year},
+                {"paperId": "unknown", "year": None},
+            ]
+        }
+        max_paper_age = config.MAX_PAPER_AGE
+        config.MAX_PAPER_AGE = 5
+        try:
+            self.assertEqual(SemanticScholar.recent_paper_ids(author), ["new"])
+            # None means any age, even if the config sets a max age.
+            self.assertEqual(
+                SemanticScholar.recent_paper_ids(author, None), ["new", "old"]
+            )
+        finally:
+            config.MAX_PAPER_AGE = max_paper_age
+
 
 if __name__ == "__main__":
     unittest.main()
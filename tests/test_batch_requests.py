@@ -0,0 +1,148 @@
+import asyncio
+import unittest
+from aiohttp import ClientResponseError, ClientSession, web
+from aiohttp.test_utils import TestServer
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.semantic_scholar import (
+    SemanticScholar,
+    MemoryBackend,
+    BatchRequestError,
+)
+from arxivdigest_recommenders.util import MicroBatcher
+from benchmarks.stub_server import create_app
+from benchmarks.synthetic import SyntheticDataset
+
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+    async def test_batches(self):
+        batches = []
+
+        async def fetch(keys):
+            batches.append(keys)
+            return [KeyError(key) if key == "x" else key.upper() for key in keys]
+
+        batcher = MicroBatcher(fetch, max_size=3, window=0.01)
+        results = await asyncio.gather(
+            *[batcher.get(key) for key in ["a", "b", "a", "c", "d", "x"]],
+            return_exceptions=True,
+        )
+        self.assertEqual(results[:5], ["A", "B", "A", "C", "D"])
+        self.assertIsInstance(results[5], KeyError)
+        # The first batch is fetched as soon as it is full, and the second one when the window has passed.
+        self.assertEqual(batches, [["a", "b", "c"], ["d", "x"]])
+
+    async def test_missing_values(self):
+        async def fetch(keys):
+            return [key.upper() for key in keys[1:]]
+
+        batcher = MicroBatcher(fetch, max_size=3, window=0.01)
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                *[batcher.get(key) for key in ["a", "b", "c"]], return_exceptions=True
+            ),
+            1,
+        )
+        # Values cannot be matched with keys, so all callers fail.
+        for result in results:
+            self.assertIsInstance(result, BatchRequestError)
+
+
+class TestBatchRequests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.dataset = SyntheticDataset.generate(50, 500, 10, 50, 5)
+        # Number of batch requests that are answered with 429 Too Many Requests before requests are served again.
+        self.throttled_batches = 0
+
+        @web.middleware
+        async def throttle(request: web.Request, handler):
+            if request.path.endswith("/batch") and self.throttled_batches > 0:
+                self.throttled_batches -= 1
+                raise web.HTTPTooManyRequests()
+            return await handler(request)
+
+        app = create_app(self.dataset)
+        app.middlewares.append(throttle)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.state = (
+            SemanticScholar._base_url,
+            SemanticScholar._batch_base_url,
+            SemanticScholar._cache,
+            config.S2_BATCH_REQUESTS,
+            config.S2_BATCH_RETRIES,
+            config.S2_BATCH_RETRY_DELAY,
+        )
+        SemanticScholar._base_url = str(self.server.make_url("/v1"))
+        SemanticScholar._batch_base_url = SemanticScholar._base_url
+        SemanticScholar._cache = MemoryBackend()
+        SemanticScholar._batchers.clear()
+        config.S2_BATCH_REQUESTS = True
+        config.S2_BATCH_RETRY_DELAY = 0.01
+
+    async def asyncTearDown(self):
+        (
+            SemanticScholar._base_url,
+            SemanticScholar._batch_base_url,
+            SemanticScholar._cache,
+            config.S2_BATCH_REQUESTS,
+            config.S2_BATCH_RETRIES,
+            config.S2_BATCH_RETRY_DELAY,
+        ) = self.state
+        SemanticScholar._batchers.clear()
+        await self.server.close()
+
+    async def test_paper_batch(self):
+        arxiv_ids = self.dataset.candidate_ids()[:20]
+        async with SemanticScholar() as s2:
+            papers = await asyncio.gather(
+                *[s2.paper(arxiv_id=arxiv_id) for arxiv_id in arxiv_ids],
+                s2.paper(s2_id="not-a-paper"),
+                return_exceptions=True,
+            )
+            author = await s2.author(self.dataset.author_id(0))
+        self.assertEqual([paper["arxivId"] for paper in papers[:20]], arxiv_ids)
+        self.assertEqual(papers[0]["topics"], [])
+        self.assertEqual(papers[20].status, 404)
+        self.assertIsInstance(papers[20], ClientResponseError)
+        self.assertEqual(author["papers"], self.dataset.author(0)["papers"])
+        async with ClientSession() as session:
+            async with session.get(self.server.make_url("/stats")) as res:
+                stats = await res.json()
+        # All of the papers are looked up with a single batch request.
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["batch_requests"], 2)
+        self.assertEqual(stats["batched_ids"], 22)
+
+    async def test_throttled_batch(self):
+        config.S2_BATCH_RETRIES = 0
+        self.throttled_batches = 1
+        arxiv_ids = self.dataset.candidate_ids()[:5]
+        async with SemanticScholar() as s2:
+            papers = await asyncio.gather(
+                *[s2.paper(arxiv_id=arxiv_id) for arxiv_id in arxiv_ids],
+                return_exceptions=True,
+            )
+            self.assertTrue(all(isinstance(p, BatchRequestError) for p in papers))
+            # The failure of the batch is not remembered for the papers in it.
+            paper = await s2.paper(arxiv_id=arxiv_ids[0])
+        self.assertEqual(paper["arxivId"], arxiv_ids[0])
+
+    async def test_retried_batch(self):
+        config.S2_BATCH_RETRIES = 1
+        self.throttled_batches = 1
+        arxiv_ids = self.dataset.candidate_ids()[:5]
+        async with SemanticScholar() as s2:
+            papers = await asyncio.gather(
+                *[s2.paper(arxiv_id=arxiv_id) for arxiv_id in arxiv_ids]
+            )
+        self.assertEqual([paper["arxivId"] for paper in papers], arxiv_ids)
+        async with ClientSession() as session:
+            async with session.get(self.server.make_url("/stats")) as res:
+                stats = await res.json()
+        # The papers of the failed batch are retried together in a single batch.
+        self.assertEqual(stats["requests"], 2)
+        self.assertEqual(stats["batch_requests"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+from arxivdigest_recommenders import cassette as cassette_module, config, semantic_scholar
+from arxivdigest_recommenders.cassette import Cassette, CassetteError
+from arxivdigest_recommenders.semantic_scholar import SemanticScholar, MemoryBackend
+
+
+class FakeConnector:
+    def __init__(self):
+        self.submissions = []
+
+    def get_user_ids(self, offset):
+        return [offset, offset + 1]
+
+    def get_user_info(self, user_ids):
+        return {user_id: {"name": f"User {user_id}"} for user_id in user_ids}
+
+    def send_article_recommendations(self, recommendations):
+        self.submissions.append(recommendations)
+
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "cassette.jsonl.gz")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_replay(self):
+        cassette = Cassette(self.path, "record")
+        cassette.record("s2 /paper/1", {"title": "Title"})
+        cassette.record("s2 /paper/1", {"title": "Another title"})
+        cassette.record("s2 /author/1", status=404, message="Not Found")
+        cassette.close()
+        cassette = Cassette(self.path, "replay")
+        self.assertEqual(cassette.replay("s2 /paper/1")["response"], {"title": "Title"})
+        self.assertEqual(cassette.replay("s2 /author/1")["status"], 404)
+        with self.assertRaises(CassetteError):
+            cassette.replay("s2 /paper/2")
+
+    def test_connector(self):
+        cassette = Cassette(self.path, "record")
+        connector = FakeConnector()
+        recording = cassette.connector(connector)
+        user_ids = recording.get_user_ids(0)
+        user_info = recording.get_user_info(user_ids)
+        recording.send_article_recommendations({0: []})
+        self.assertEqual(connector.submissions, [{0: []}])
+        cassette.close()
+        connector = FakeConnector()
+        replaying = Cassette(self.path, "replay").connector(connector)
+        self.assertEqual(replaying.get_user_ids(0), user_ids)
+        # JSON object keys are always strings.
+        self.assertEqual(
+            replaying.get_user_info(user_ids),
+            {str(user_id): info for user_id, info in user_info.items()},
+        )
+        replaying.send_article_recommendations({0: []})
+        self.assertEqual(connector.submissions, [])
+        with self.assertRaises(CassetteError):
+            replaying.get_user_ids(100)
+
+
+class TestReplayCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "cassette.jsonl.gz")
+        self.state = (
+            SemanticScholar._cache,
+            cassette_module._cassette,
+            config.CASSETTE_MODE,
+            config.CASSETTE_PATH,
+            config.CASSETTE_LATENCY,
+            config.CASSETTE_RATE_LIMIT,
+            config.S2_CACHE_RESPONSES,
+            config.S2_BATCH_REQUESTS,
+        )
+        config.CASSETTE_LATENCY = 0
+        config.CASSETTE_RATE_LIMIT = False
+        config.S2_CACHE_RESPONSES = True
+        config.S2_BATCH_REQUESTS = False
+
+    def tearDown(self):
+        (
+            SemanticScholar._cache,
+            cassette_module._cassette,
+            config.CASSETTE_MODE,
+            config.CASSETTE_PATH,
+            config.CASSETTE_LATENCY,
+            config.CASSETTE_RATE_LIMIT,
+            config.S2_CACHE_RESPONSES,
+            config.S2_BATCH_REQUESTS,
+        ) = self.state
+        self.dir.cleanup()
+
+    async def test_replay_ignores_configured_cache(self):
+        recording = Cassette(self.path, "record")
+        recording.record("s2 /author/1", {"authorId": "1", "name": "recorded"})
+        recording.close()
+        # A stale entry in the configured backend would otherwise be served, and revalidated, during the replay.
+        configured = MemoryBackend()
+        await configured.set(
+            "/author/1",
+            {
+                "expiration": (date.today() - timedelta(days=1)).isoformat(),
+                "data": {"authorId": "1", "name": "cached"},
+            },
+        )
+        config.CASSETTE_MODE, config.CASSETTE_PATH = "replay", self.path
+        cassette_module._cassette = None
+        SemanticScholar._cache = None
+        with mock.patch.dict(
+            semantic_scholar._cache_backends, {config.S2_CACHE_BACKEND: lambda: configured}
+        ):
+            self.assertIsNot(SemanticScholar.cache_backend(), configured)
+            async with SemanticScholar() as s2:
+                self.assertEqual((await s2.author("1"))["name"], "recorded")
+            await SemanticScholar.wait_for_refreshes()
+        self.assertEqual((await configured.get("/author/1"))["data"]["name"], "cached")
+
+
+if __name__ == "__main__":
+    unittest.main()
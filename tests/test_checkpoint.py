@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.checkpoint import Checkpoint
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender
+
+
+class Connector:
+    def get_article_ids(self):
+        return ["2101.00003"]
+
+    def get_number_of_users(self):
+        return 0
+
+
+class NullRecommender(ArxivdigestRecommender):
+    def __init__(self):
+        super().__init__("", "NullRecommender")
+
+    def connector(self):
+        return Connector()
+
+    async def score_paper(self, user, user_s2_id, paper_id):
+        return None
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "checkpoints", "test.json")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_missing(self):
+        self.assertIsNone(Checkpoint.load(self.path))
+
+    def test_resume(self):
+        checkpoint = Checkpoint(self.path, ["2101.00001", "2101.00002"])
+        checkpoint.user_processed(
+            "1", [{"article_id": "2101.00001", "score": np.float64(0.5)}]
+        )
+        checkpoint.user_processed("2", [])
+        checkpoint = Checkpoint.load(self.path)
+        self.assertEqual(checkpoint.paper_ids, ["2101.00001", "2101.00002"])
+        self.assertEqual(checkpoint.user_offset, 0)
+        self.assertEqual(checkpoint.processed_users, ["1", "2"])
+        self.assertEqual(
+            checkpoint.pending, {"1": [{"article_id": "2101.00001", "score": 0.5}]}
+        )
+
+    def test_batch_submitted(self):
+        checkpoint = Checkpoint(self.path, [])
+        checkpoint.user_processed("1", [{"article_id": "2101.00001", "score": 1}])
+        checkpoint.batch_submitted(100)
+        checkpoint = Checkpoint.load(self.path)
+        self.assertEqual(checkpoint.user_offset, 100)
+        self.assertEqual(checkpoint.processed_users, [])
+        self.assertEqual(checkpoint.pending, {})
+        checkpoint.delete()
+        self.assertIsNone(Checkpoint.load(self.path))
+
+
+class TestCheckpointing(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.state = (config.CHECKPOINT_DIR, config.PLANNER_ENABLED)
+        config.PLANNER_ENABLED = False
+
+    def tearDown(self):
+        config.CHECKPOINT_DIR, config.PLANNER_ENABLED = self.state
+        self.dir.cleanup()
+
+    async def test_disabled(self):
+        config.CHECKPOINT_DIR = None
+        recommender = NullRecommender()
+        with mock.patch.object(Checkpoint, "save") as save:
+            await recommender.recommend(submit_recommendations=False)
+        save.assert_not_called()
+        with self.assertLogs(recommender._logger.logger, "WARNING") as logs:
+            await recommender.recommend(submit_recommendations=False, resume=True)
+        self.assertIn("Checkpointing is disabled", logs.output[0])
+
+    async def test_overwrite(self):
+        config.CHECKPOINT_DIR = self.dir.name
+        recommender = NullRecommender()
+        Checkpoint(recommender._checkpoint_path(), ["2101.00001"]).save()
+        with self.assertLogs(recommender._logger.logger, "WARNING") as logs:
+            await recommender.recommend(submit_recommendations=False)
+        self.assertIn("Overwriting the checkpoint", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import unittest
+from datetime import date, timedelta
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.frequent_venues import FrequentVenuesRecommender
+from arxivdigest_recommenders.metrics import metrics
+from arxivdigest_recommenders.semantic_scholar import SemanticScholar, MemoryBackend
+
+
+year = date.today().year
+# Papers published by the users, and candidate papers.
+published = {
+    "p1": "ICML",
+    "p2": "ICML",
+    "p3": "NeurIPS",
+    "p4": "ACL",
+    "p5": "",
+}
+candidates = {
+    "2101.00001": "ICML",
+    "2101.00002": "NeurIPS",
+    "2101.00003": "ACL",
+    "2101.00004": "SIGIR",
+    "2101.00005": "",
+    "2101.00006": "ICML",
+}
+users = {
+    "1": ["p1", "p2", "p3"],
+    "2": ["p4", "p5"],
+    "3": [],
+}
+
+
+def cache_entry(data: dict) -> dict:
+    return {"expiration": (date.today() + timedelta(days=1)).isoformat(), "data": data}
+
+
+def paper(s2_id: str, arxiv_id, venue: str) -> dict:
+    return {
+        "paperId": s2_id,
+        "arxivId": arxiv_id,
+        "venue": venue,
+        "year": year,
+        "authors": [],
+    }
+
+
+class TestFrequentVenuesRecommender(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.state = (
+            SemanticScholar._cache,
+            config.INCREMENTAL_ENABLED,
+            config.USER_TIME_BUDGET,
+        )
+        backend = SemanticScholar._cache = MemoryBackend()
+        config.INCREMENTAL_ENABLED = False
+        config.USER_TIME_BUDGET = None
+        metrics.reset()
+        entries = {}
+        for s2_id, venue in published.items():
+            entries[f"/paper/{s2_id}"] = cache_entry(paper(s2_id, None, venue))
+        for arxiv_id, venue in candidates.items():
+            entries[f"/paper/arXiv:{arxiv_id}"] = cache_entry(
+                paper(f"s2-{arxiv_id}", arxiv_id, venue)
+            )
+        for s2_id, paper_ids in users.items():
+            entries[f"/author/{s2_id}"] = cache_entry(
+                {
+                    "authorId": s2_id,
+                    "papers": [{"paperId": p, "year": year} for p in paper_ids],
+                }
+            )
+        await backend.set_many(entries)
+
+    async def asyncTearDown(self):
+        (
+            SemanticScholar._cache,
+            config.INCREMENTAL_ENABLED,
+            config.USER_TIME_BUDGET,
+        ) = self.state
+        metrics.reset()
+
+    async def test_indexed_ranking(self):
+        user_data = {
+            s2_id: {
+                "semantic_scholar_profile": f"https://www.semanticscholar.org/author/{s2_id}"
+            }
+            for s2_id in users
+        }
+        paper_ids = list(candidates)
+        recommender = FrequentVenuesRecommender()
+        indexed = await recommender.recommendations(
+            user_data, {s2_id: [] for s2_id in users}, paper_ids
+        )
+        # Only the papers published at the users' venues are scored, one at a time by the base class, which records the
+        # time spent scoring them: three ICML and NeurIPS papers for user 1 and one ACL paper for user 2.
+        self.assertEqual(
+            metrics.histograms["score_paper_seconds"][
+                (("recommender", "FrequentVenuesRecommender"),)
+            ].count,
+            4,
+        )
+        # Without an index, papers are looked up while they are scored.
+        unindexed = {}
+        for s2_id in users:
+            ranking = await FrequentVenuesRecommender().user_ranking(
+                user_data[s2_id], s2_id, paper_ids
+            )
+            if ranking:
+                unindexed[s2_id] = ranking
+        self.assertEqual(indexed.keys(), unindexed.keys())
+        for s2_id, ranking in unindexed.items():
+            self.assertCountEqual(indexed[s2_id], ranking)
+        self.assertEqual(
+            sorted((r["article_id"], r["score"]) for r in indexed["1"]),
+            [("2101.00001", 2), ("2101.00002", 1), ("2101.00006", 2)],
+        )
+        self.assertEqual([r["article_id"] for r in indexed["2"]], ["2101.00003"])
+        self.assertNotIn("3", indexed)
+
+    async def test_incremental(self):
+        config.INCREMENTAL_ENABLED = True
+        user_data = {
+            "1": {"semantic_scholar_profile": "https://www.semanticscholar.org/author/1"}
+        }
+
+        async def scores():
+            recommendations = await FrequentVenuesRecommender().recommendations(
+                user_data, {"1": []}, list(candidates)
+            )
+            return {r["article_id"]: r["score"] for r in recommendations["1"]}
+
+        self.assertEqual((await scores())["2101.00001"], 2)
+        # The paper is moved from ICML to NeurIPS, so its stored score is discarded.
+        await SemanticScholar.cache_backend().set(
+            "/paper/arXiv:2101.00001",
+            cache_entry(paper("s2-2101.00001", "2101.00001", "NeurIPS")),
+        )
+        self.assertEqual((await scores())["2101.00001"], 1)
+
+    async def test_index_reused(self):
+        recommender = FrequentVenuesRecommender()
+        await recommender.recommendations({}, {}, list(candidates))
+        index = recommender._paper_venues
+        # The index is kept for an equal list of candidate papers, and rebuilt for another one.
+        await recommender.recommendations({}, {}, list(candidates))
+        self.assertIs(recommender._paper_venues, index)
+        await recommender.recommendations({}, {}, list(candidates)[:3])
+        self.assertIsNot(recommender._paper_venues, index)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+import unittest
+
+HEAVY_MODULES = (
+    "aiohttp",
+    "aioredis",
+    "motor",
+    "pymongo",
+    "elasticsearch",
+    "arxivdigest",
+)
+
+
+class TestImports(unittest.TestCase):
+    def test_deferred_imports(self):
+        # Importing the recommenders should not load the clients of the services that they use, or read the config
+        # file.
+        code = (
+            "import importlib, pkgutil, sys\n"
+            "import arxivdigest_recommenders\n"
+            "from arxivdigest_recommenders import config\n"
+            "for module in pkgutil.iter_modules(arxivdigest_recommenders.__path__):\n"
+            "    importlib.import_module(f'arxivdigest_recommenders.{module.name}')\n"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+            "print(config._loaded)\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.split("\n"), ["", "False", ""])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+from arxivdigest_recommenders.util import LRUCache, KeyedLocks
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = LRUCache(3, sizeof=len)
+        cache["a"] = [1]
+        cache["b"] = [1, 2]
+        cache["a"]
+        cache["c"] = [1]
+        self.assertEqual(list(cache), ["a", "c"])
+        self.assertEqual(cache.size, 2)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_oversized_value(self):
+        cache = LRUCache(1, sizeof=len)
+        cache["a"] = [1]
+        cache["b"] = [1, 2, 3]
+        self.assertEqual(list(cache), ["b"])
+        self.assertEqual(cache.size, 3)
+
+    def test_replace(self):
+        cache = LRUCache(None, sizeof=len)
+        cache["a"] = [1, 2]
+        cache["a"] = [1]
+        self.assertEqual(cache.size, 1)
+        self.assertEqual(len(cache), 1)
+
+
+class TestKeyedLocks(unittest.IsolatedAsyncioTestCase):
+    async def test_cleanup(self):
+        locks = KeyedLocks()
+        order = []
+
+        async def enter(key, i):
+            async with locks(key):
+                order.append(i)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(enter("a", 0), enter("a", 1), enter("b", 2))
+        self.assertEqual(sorted(order), [0, 1, 2])
+        self.assertEqual(len(locks), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
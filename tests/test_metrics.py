@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import unittest
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.metrics import Histogram, Metrics, metrics_path
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram(self):
+        histogram = Histogram((1.0, 2.0, 4.0))
+        for value in (0.5, 1.5, 1.5, 3.0, 10.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 1])
+        self.assertEqual(histogram.count, 5)
+        self.assertAlmostEqual(histogram.sum, 16.5)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.75)
+        self.assertEqual(histogram.quantile(1.0), 4.0)
+
+    def test_merge(self):
+        a = Metrics()
+        a.observe("latency_seconds", 0.1, endpoint="paper")
+        a.increment("partial_rankings", recommender="a")
+        b = Metrics()
+        b.observe("latency_seconds", 0.2, endpoint="paper")
+        b.observe("latency_seconds", 0.3, endpoint="author")
+        b.increment("partial_rankings", 2, recommender="a")
+        a.merge(b.snapshot())
+        histograms = a.report()["histograms"]["latency_seconds"]
+        self.assertEqual(
+            [(h["labels"]["endpoint"], h["count"]) for h in histograms],
+            [("author", 1), ("paper", 2)],
+        )
+        self.assertEqual(
+            a.report()["counters"]["partial_rankings"],
+            [{"labels": {"recommender": "a"}, "value": 3}],
+        )
+
+    def test_prometheus(self):
+        metrics = Metrics()
+        with metrics.timer("latency_seconds", endpoint="paper"):
+            pass
+        metrics.increment("partial_rankings")
+        metrics.increment("unscored_papers", 3, recommender="a")
+        lines = metrics.prometheus(prefix="").splitlines()
+        self.assertIn("# TYPE latency_seconds histogram", lines)
+        self.assertIn('latency_seconds_bucket{endpoint="paper",le="+Inf"} 1', lines)
+        self.assertIn('latency_seconds_count{endpoint="paper"} 1', lines)
+        self.assertIn("# TYPE partial_rankings counter", lines)
+        self.assertIn("partial_rankings_total 1", lines)
+        self.assertIn('unscored_papers_total{recommender="a"} 3', lines)
+        self.assertNotIn("partial_rankings 1", lines)
+
+    def test_write(self):
+        metrics = Metrics()
+        metrics.observe("latency_seconds", 0.5)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "metrics.json")
+            metrics.write(path, recommender="test")
+            with open(path) as file:
+                report = json.load(file)
+            self.assertEqual(report["recommender"], "test")
+            self.assertEqual(report["histograms"]["latency_seconds"][0]["count"], 1)
+            path = os.path.join(tmp_dir, "metrics.prom")
+            metrics.write(path)
+            with open(path) as file:
+                self.assertIn("latency_seconds_sum 0.5", file.read())
+
+    def test_worker_path(self):
+        path = config.METRICS_PATH
+        try:
+            config.METRICS_PATH = "/var/lib/metrics/run.prom"
+            self.assertEqual(metrics_path(), "/var/lib/metrics/run.prom")
+            self.assertEqual(
+                metrics_path("host-1:123"), "/var/lib/metrics/run.host-1-123.prom"
+            )
+            config.METRICS_PATH = None
+            self.assertIsNone(metrics_path("host-1:123"))
+        finally:
+            config.METRICS_PATH = path
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import sys
+import unittest
+from unittest import mock
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.parallel import worker_pool
+from arxivdigest_recommenders.planner import RunPlan
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender, run
+
+
+class NullRecommender(ArxivdigestRecommender):
+    def __init__(self):
+        super().__init__("", "NullRecommender")
+
+    async def score_paper(self, user, user_s2_id, paper_id):
+        return None
+
+
+def cassette_config():
+    return config.CASSETTE_MODE, config.CASSETTE_PATH
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.cassette = (config.CASSETTE_MODE, config.CASSETTE_PATH)
+
+    def tearDown(self):
+        config.CASSETTE_MODE, config.CASSETTE_PATH = self.cassette
+
+    def test_replay(self):
+        config.CASSETTE_MODE, config.CASSETTE_PATH = "replay", "run.jsonl.gz"
+        with worker_pool(NullRecommender, 1, [], RunPlan()) as pool:
+            self.assertEqual(
+                pool.submit(cassette_config).result(), ("replay", "run.jsonl.gz")
+            )
+
+    def test_record(self):
+        config.CASSETTE_MODE, config.CASSETTE_PATH = "record", "run.jsonl.gz"
+        with self.assertRaises(ValueError):
+            worker_pool(NullRecommender, 2, [], RunPlan())
+        with mock.patch.object(
+            sys, "argv", ["recommender", "--record", "run.jsonl.gz", "--workers", "2"]
+        ), mock.patch("sys.stderr"):
+            with self.assertRaises(SystemExit):
+                run(NullRecommender())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+from unittest import mock
+from arxivdigest_recommenders import config, planner
+from arxivdigest_recommenders.planner import RunPlan, estimated_seconds, plan_run
+
+
+class FakeS2:
+    """Semantic Scholar client that serves a fixed set of cached authors and papers."""
+
+    authors = {}
+    papers = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    async def cached_author(self, s2_id):
+        return self.authors.get(s2_id)
+
+    async def cached_papers(self, s2_ids=None, arxiv_ids=None):
+        ids = s2_ids if s2_ids is not None else [f"arXiv:{i}" for i in arxiv_ids]
+        return [self.papers.get(i) for i in ids]
+
+    @staticmethod
+    def recent_paper_ids(author):
+        return [paper["paperId"] for paper in author["papers"]]
+
+
+class TestPlanner(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.state = (
+            config.S2_MAX_REQUESTS,
+            config.S2_WINDOW_SIZE,
+            config.PLANNER_DEADLINE,
+            config.S2_BATCH_REQUESTS,
+            config.S2_PAPER_BATCH_SIZE,
+            config.S2_AUTHOR_BATCH_SIZE,
+        )
+        config.S2_MAX_REQUESTS = 10
+        config.S2_WINDOW_SIZE = 60
+        config.PLANNER_DEADLINE = None
+        config.S2_BATCH_REQUESTS = False
+        # The user has 200 recent papers, and only the 20 most recent ones are cached.
+        FakeS2.authors = {
+            "u1": {
+                "authorId": "u1",
+                "papers": [{"paperId": f"p{i}"} for i in range(200)],
+            }
+        }
+        FakeS2.papers = {
+            f"p{i}": {"paperId": f"p{i}", "authors": []} for i in range(20)
+        }
+        self.patch = mock.patch.object(planner, "SemanticScholar", FakeS2)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        (
+            config.S2_MAX_REQUESTS,
+            config.S2_WINDOW_SIZE,
+            config.PLANNER_DEADLINE,
+            config.S2_BATCH_REQUESTS,
+            config.S2_PAPER_BATCH_SIZE,
+            config.S2_AUTHOR_BATCH_SIZE,
+        ) = self.state
+
+    async def plan(self, deadline_seconds=None) -> RunPlan:
+        return await plan_run(
+            [],
+            ["u1"],
+            candidate_authors=False,
+            collaborators=False,
+            deadline=None if deadline_seconds is None else deadline_seconds / 3600,
+        )
+
+    def test_estimated_seconds(self):
+        self.assertEqual(estimated_seconds(0), 0)
+        self.assertEqual(estimated_seconds(1), 60)
+        self.assertEqual(estimated_seconds(10), 60)
+        self.assertEqual(estimated_seconds(11), 120)
+
+    async def test_undegraded(self):
+        self.assertEqual(await self.plan(), RunPlan(None, None, 180, 1080))
+        self.assertEqual(await self.plan(1080), RunPlan(None, None, 180, 1080))
+
+    async def test_partially_degraded(self):
+        plan = await self.plan(300)
+        self.assertEqual(plan, RunPlan(10, 50, 30, 180))
+        self.assertTrue(plan.degraded)
+
+    async def test_fully_degraded(self):
+        # The most recent paper is not cached, so even the most degraded plan needs a window, and it is used although
+        # it misses the deadline.
+        del FakeS2.papers["p0"]
+        self.assertEqual(await self.plan(30), RunPlan(1, 5, 1, 60))
+
+    async def test_default_deadline(self):
+        config.PLANNER_DEADLINE = 300 / 3600
+        self.assertEqual(
+            await plan_run([], ["u1"], False, False), RunPlan(10, 50, 30, 180)
+        )
+        # None means there is no deadline, even if the config sets one.
+        self.assertEqual(await self.plan(), RunPlan(None, None, 180, 1080))
+
+    async def test_batched(self):
+        config.S2_BATCH_REQUESTS = True
+        config.S2_PAPER_BATCH_SIZE = 50
+        config.S2_AUTHOR_BATCH_SIZE = 100
+        # The 180 missing papers are looked up in 4 batches, which fit in a single window, so the plan is not degraded.
+        self.assertEqual(await self.plan(60), RunPlan(None, None, 4, 60))
+        # The papers and the author of an uncached user are looked up in separate batches.
+        del FakeS2.authors["u1"]
+        self.assertEqual((await self.plan()).estimated_requests, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import unittest
+from datetime import date
+from unittest import mock
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.planner import RunPlan
+from arxivdigest_recommenders.prefetch import prefetch
+from arxivdigest_recommenders.semantic_scholar import SemanticScholar, MemoryBackend
+from arxivdigest_recommenders.venue_copub import VenueCoPubRecommender
+
+
+year = date.today().year
+venues = ["ICML", "NeurIPS", "ACL"]
+# Candidate papers and their authors, and the papers of each author.
+candidates = {
+    "2101.00001": ["a1", "a2", "a3"],
+    "2101.00002": ["a2", "a4"],
+    "2101.00003": ["u1", "a5"],
+}
+author_papers = {
+    "u1": ["p1", "p2", "p3"],
+    "u2": ["p4"],
+    "a1": ["p5", "p6", "p7"],
+    "a2": ["p2", "p8"],
+    "a3": ["p9"],
+    "a4": ["p10", "p11"],
+    "a5": ["p12"],
+}
+
+
+def responses() -> dict:
+    endpoints = {}
+    for arxiv_id, authors in candidates.items():
+        endpoints[f"/paper/arXiv:{arxiv_id}"] = {
+            "paperId": f"s2-{arxiv_id}",
+            "venue": "",
+            "year": year,
+            "authors": [{"authorId": a, "name": a.upper()} for a in authors],
+        }
+    for i, (s2_id, paper_ids) in enumerate(author_papers.items()):
+        endpoints[f"/author/{s2_id}"] = {
+            "authorId": s2_id,
+            "papers": [{"paperId": p, "year": year} for p in paper_ids],
+        }
+        for paper_id in paper_ids:
+            endpoints[f"/paper/{paper_id}"] = {
+                "paperId": paper_id,
+                "venue": venues[i % len(venues)],
+                "year": year,
+                "authors": [
+                    {"authorId": a, "name": a.upper()}
+                    for a, papers in author_papers.items()
+                    if paper_id in papers
+                ],
+            }
+    return endpoints
+
+
+class TestPrefetch(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.state = (
+            SemanticScholar._cache,
+            config.S2_CACHE_RESPONSES,
+            config.S2_SINGLE_FLIGHT,
+            config.S2_BATCH_REQUESTS,
+            config.INCREMENTAL_ENABLED,
+            config.USER_TIME_BUDGET,
+        )
+        SemanticScholar._cache = MemoryBackend()
+        config.S2_CACHE_RESPONSES = True
+        config.S2_SINGLE_FLIGHT = False
+        config.S2_BATCH_REQUESTS = False
+        config.INCREMENTAL_ENABLED = False
+        config.USER_TIME_BUDGET = None
+        self.responses = responses()
+        self.fetches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        async def fetch(s2, endpoint):
+            self.fetches.append(endpoint)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.001)
+            self.in_flight -= 1
+            return self.responses[endpoint]
+
+        self.patch = mock.patch.object(SemanticScholar, "_fetch", fetch)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        (
+            SemanticScholar._cache,
+            config.S2_CACHE_RESPONSES,
+            config.S2_SINGLE_FLIGHT,
+            config.S2_BATCH_REQUESTS,
+            config.INCREMENTAL_ENABLED,
+            config.USER_TIME_BUDGET,
+        ) = self.state
+
+    async def recommend(self, plan: RunPlan) -> dict:
+        recommender = VenueCoPubRecommender()
+        recommender._plan = plan
+        users = {
+            user_id: {
+                "semantic_scholar_profile": f"https://www.semanticscholar.org/author/{user_id}"
+            }
+            for user_id in ("u1", "u2")
+        }
+        return await recommender.recommendations(
+            users, {user_id: [] for user_id in users}, list(candidates)
+        )
+
+    async def test_served_from_cache(self):
+        for plan in (RunPlan(), RunPlan(max_paper_authors=1, max_author_papers=1)):
+            with self.subTest(plan=plan):
+                SemanticScholar._cache = MemoryBackend()
+                self.fetches = []
+                await prefetch(list(candidates), ["u1", "u2"], plan=plan)
+                prefetched = len(self.fetches)
+                self.assertGreater(prefetched, 0)
+                recommendations = await self.recommend(plan)
+                self.assertTrue(recommendations)
+                # Everything the recommender needs was prefetched.
+                self.assertEqual(len(self.fetches), prefetched)
+        # Less data is prefetched for a degraded plan.
+        self.assertLess(prefetched, len(self.responses))
+
+    async def test_concurrency(self):
+        await prefetch(list(candidates), ["u1", "u2"], concurrency=2)
+        self.assertEqual(self.max_in_flight, 2)
+        self.assertCountEqual(self.fetches, self.responses)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.profiling import Profiler
+
+
+def busy(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+async def workload(profiler: Profiler):
+    for _ in range(3):
+        busy(0.1)
+        await asyncio.sleep(0.01)
+        profiler.batch_boundary()
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.profiling_dir = config.PROFILING_DIR
+        config.PROFILING_DIR = self.dir.name
+
+    def tearDown(self):
+        config.PROFILING_DIR = self.profiling_dir
+        self.dir.cleanup()
+
+    def test_artifacts(self):
+        async def main():
+            async with Profiler("test") as profiler:
+                await asyncio.ensure_future(workload(profiler))
+            return profiler
+
+        profiler = asyncio.run(main())
+        self.assertEqual(
+            sorted(os.listdir(profiler.directory)),
+            [
+                "batch-0001.tracemalloc",
+                "batch-0002.tracemalloc",
+                "batch-0003.tracemalloc",
+                "cpu.folded",
+                "loop_lag.json",
+                "summary.txt",
+            ],
+        )
+        with open(os.path.join(profiler.directory, "cpu.folded")) as file:
+            stacks = [line.rsplit(" ", 1)[0].split(";") for line in file]
+        # Samples of the busy loop are attributed to the task running the workload.
+        self.assertTrue(
+            any(
+                stack[0] == "<task workload>" and stack[-1].startswith("busy")
+                for stack in stacks
+            )
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,17 @@
+import asyncio
+import multiprocessing
 import unittest
 import time
-from arxivdigest_recommenders.util import AsyncRateLimiter
+from arxivdigest_recommenders.util import AsyncRateLimiter, SharedRateLimiter
+
+
+def _enter_shared_limiter(limiter, stamps, enters):
+    async def enter():
+        for _ in range(enters):
+            async with limiter as stamp:
+                stamps.append(stamp)
+
+    asyncio.run(enter())
 
 
 class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
@@ -16,6 +27,27 @@ class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
         for stamp in stamps[9001:]:
             self.assertAlmostEqual(stamps[9000], stamp, delta=0.1)
 
+    async def test_shared_rate_limit(self):
+        context = multiprocessing.get_context("fork")
+        limiter = SharedRateLimiter(100, 1, context)
+        with context.Manager() as manager:
+            stamps = manager.list()
+            processes = [
+                context.Process(
+                    target=_enter_shared_limiter, args=(limiter, stamps, 150)
+                )
+                for _ in range(2)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            stamps = sorted(stamps)
+        self.assertEqual(len(stamps), 300)
+        for i in range(100, 300):
+            self.assertLessEqual(stamps[i - 100] + 1, stamps[i])
+        self.assertLess(stamps[-1] - stamps[0], 2.5)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from datetime import date
+from arxivdigest_recommenders.planner import RunPlan
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender
+from arxivdigest_recommenders.semantic_scholar import CacheBackend
+from arxivdigest_recommenders.score_store import ScoreStore, paper_fingerprint
+
+
+class DictBackend(CacheBackend):
+    def __init__(self):
+        self.docs = {}
+
+    async def exists(self, key):
+        return key in self.docs
+
+    async def get(self, key):
+        return self.docs[key]
+
+    async def set(self, key, value):
+        self.docs[key] = value
+
+
+class NullRecommender(ArxivdigestRecommender):
+    def __init__(self):
+        super().__init__("", "NullRecommender")
+
+    async def score_paper(self, user, user_s2_id, paper_id):
+        return None
+
+
+class TestScoreStore(unittest.IsolatedAsyncioTestCase):
+    async def test_load_and_save(self):
+        store = ScoreStore("Recommender", DictBackend())
+        result = {"article_id": "2101.00001", "score": 2, "explanation": ""}
+        await store.save(
+            "1", "user-v1", {"2101.00001": ("a", result), "2101.00002": ("b", None)}
+        )
+        self.assertEqual(
+            await store.load("1", "user-v1"),
+            {"2101.00001": ("a", result), "2101.00002": ("b", None)},
+        )
+        self.assertEqual(await store.load("1", "user-v2"), {})
+        self.assertEqual(await store.load("2", "user-v1"), {})
+
+    def test_paper_fingerprint(self):
+        authors = [{"authorId": "1", "name": "A"}, {"authorId": None, "name": "B"}]
+        self.assertEqual(
+            paper_fingerprint({"authors": authors}),
+            paper_fingerprint({"authors": authors[::-1]}),
+        )
+        self.assertNotEqual(
+            paper_fingerprint({"authors": authors}),
+            paper_fingerprint({"authors": authors[:1]}),
+        )
+        self.assertNotEqual(
+            paper_fingerprint({"authors": authors}, "ICML"),
+            paper_fingerprint({"authors": authors}, "NeurIPS"),
+        )
+
+    def test_user_fingerprint(self):
+        year = date.today().year
+        author = {"papers": [{"paperId": "p1", "year": year}]}
+        recommender = NullRecommender()
+        fingerprints = set()
+        for plan in (
+            RunPlan(),
+            RunPlan(max_paper_authors=5),
+            RunPlan(max_author_papers=5),
+        ):
+            recommender._plan = plan
+            fingerprints.add(recommender.user_fingerprint({}, author))
+        # The user has a single paper, so it is not left out by any plan, but the scores of candidate papers still
+        # depend on the plan.
+        self.assertEqual(len(fingerprints), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.metrics import metrics
+from arxivdigest_recommenders.semantic_scholar import (
+    SemanticScholar,
+    MemoryBackend,
+    SqliteBackend,
+)
+
+
+class LeaseTests:
+    def backend(self):
+        raise NotImplementedError
+
+    async def test_lease(self):
+        backend = self.backend()
+        token = await backend.acquire_lease("/author/1", 10)
+        self.assertIsNotNone(token)
+        self.assertIsNone(await backend.acquire_lease("/author/1", 10))
+        self.assertIsNotNone(await backend.acquire_lease("/author/2", 10))
+        # Leases are only released by their holders.
+        await backend.release_lease("/author/1", "other")
+        self.assertIsNone(await backend.acquire_lease("/author/1", 10))
+        await backend.release_lease("/author/1", token)
+        self.assertIsNotNone(await backend.acquire_lease("/author/1", 10))
+
+    async def test_expiration(self):
+        backend = self.backend()
+        token = await backend.acquire_lease("/author/1", 0.05)
+        await asyncio.sleep(0.1)
+        self.assertIsNotNone(await backend.acquire_lease("/author/1", 10))
+        # The expired lease is not released by its former holder.
+        await backend.release_lease("/author/1", token)
+        self.assertIsNone(await backend.acquire_lease("/author/1", 10))
+
+
+class TestMemoryLeases(LeaseTests, unittest.IsolatedAsyncioTestCase):
+    def backend(self):
+        return MemoryBackend()
+
+
+class TestSqliteLeases(LeaseTests, unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def backend(self):
+        return SqliteBackend(os.path.join(self.dir.name, "s2cache.db"))
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.state = (
+            SemanticScholar._cache,
+            config.S2_SINGLE_FLIGHT,
+            config.S2_SINGLE_FLIGHT_TIMEOUT,
+            config.S2_SINGLE_FLIGHT_POLL_INTERVAL,
+        )
+        # The memory backend stands in for a backend that is shared by several processes.
+        SemanticScholar._cache = MemoryBackend()
+        config.S2_SINGLE_FLIGHT = True
+        config.S2_SINGLE_FLIGHT_TIMEOUT = 1
+        config.S2_SINGLE_FLIGHT_POLL_INTERVAL = 0.01
+        metrics.reset()
+        self.fetches = []
+
+    def tearDown(self):
+        (
+            SemanticScholar._cache,
+            config.S2_SINGLE_FLIGHT,
+            config.S2_SINGLE_FLIGHT_TIMEOUT,
+            config.S2_SINGLE_FLIGHT_POLL_INTERVAL,
+        ) = self.state
+        metrics.reset()
+
+    async def author(self, s2_id: str) -> dict:
+        async def fetch(s2, endpoint):
+            self.fetches.append(endpoint)
+            return {"authorId": endpoint.rsplit("/", 1)[1], "papers": []}
+
+        with mock.patch.object(SemanticScholar, "_fetch", fetch):
+            async with SemanticScholar() as s2:
+                return await s2.author(s2_id)
+
+    async def test_fetch(self):
+        self.assertEqual((await self.author("1"))["authorId"], "1")
+        self.assertEqual(self.fetches, ["/author/1"])
+        # The lease is released after the fetch.
+        self.assertIsNotNone(
+            await SemanticScholar.cache_backend().acquire_lease("/author/1", 10)
+        )
+
+    async def test_wait_for_other_process(self):
+        backend = SemanticScholar.cache_backend()
+        token = await backend.acquire_lease("/author/1", 10)
+        task = asyncio.ensure_future(self.author("1"))
+        await asyncio.sleep(0.05)
+        self.assertFalse(task.done())
+        # Another process caches the response and releases the lease.
+        expiration = (date.today() + timedelta(days=1)).isoformat()
+        await backend.set(
+            "/author/1", {"expiration": expiration, "data": {"authorId": "other"}}
+        )
+        await backend.release_lease("/author/1", token)
+        self.assertEqual((await task)["authorId"], "other")
+        self.assertEqual(self.fetches, [])
+        self.assertEqual(metrics.counters["s2_coalesced_fetches"][()], 1)
+
+    async def test_timeout(self):
+        config.S2_SINGLE_FLIGHT_TIMEOUT = 0.1
+        await SemanticScholar.cache_backend().acquire_lease("/author/1", 10)
+        self.assertEqual((await self.author("1"))["authorId"], "1")
+        self.assertEqual(self.fetches, ["/author/1"])
+        self.assertEqual(metrics.counters["s2_single_flight_timeouts"][()], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
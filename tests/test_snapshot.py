@@ -0,0 +1,61 @@
+import gzip
+import os
+import tempfile
+import unittest
+from arxivdigest_recommenders.semantic_scholar import MemoryBackend, SqliteBackend
+from arxivdigest_recommenders.snapshot import export_snapshot, import_snapshot
+
+
+class TestSnapshot(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "snapshot.jsonl.gz")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    async def test_round_trip(self):
+        source = MemoryBackend()
+        entries = {
+            f"/paper/{i}": {"expiration": "2100-01-01", "data": {"paperId": str(i)}}
+            for i in range(25)
+        }
+        entries["/author/1"] = {"expiration": "2000-01-01", "data": {"papers": []}}
+        await source.set_many(entries)
+        await source.set("scores/Recommender/1", {"expiration": "2100-01-01"})
+        self.assertEqual(await export_snapshot(source, self.path, chunk_size=10), 26)
+        # The header and each chunk are separate gzip members.
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.read().count(b"\x1f\x8b\x08"), 4)
+
+        destination = SqliteBackend(os.path.join(self.dir.name, "s2cache.db"))
+        self.assertEqual(
+            await import_snapshot(destination, self.path, writers=2, chunk_size=7), 26
+        )
+        self.assertEqual(
+            await destination.get_many(list(entries)), list(entries.values())
+        )
+        self.assertFalse(await destination.exists("scores/Recommender/1"))
+        self.assertEqual(
+            await import_snapshot(
+                MemoryBackend(), self.path, chunk_size=7, skip_expired=True
+            ),
+            25,
+        )
+
+    async def test_truncated(self):
+        source = MemoryBackend()
+        await source.set_many(
+            {f"/paper/{i}": {"expiration": "2100-01-01"} for i in range(20)}
+        )
+        await export_snapshot(source, self.path, chunk_size=10)
+        with open(self.path, "rb") as file:
+            data = file.read()
+        with open(self.path, "wb") as file:
+            file.write(data[:-5])
+        with self.assertRaises((EOFError, gzip.BadGzipFile)):
+            await import_snapshot(MemoryBackend(), self.path, chunk_size=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from arxivdigest_recommenders.semantic_scholar import SqliteBackend
+
+
+def doc(days: int, data=None) -> dict:
+    return {
+        "expiration": (date.today() + timedelta(days=days)).isoformat(),
+        "data": data,
+    }
+
+
+def write_entries(path: str, worker: int):
+    async def main():
+        backend = SqliteBackend(path)
+        for i in range(50):
+            await backend.set(f"/paper/{worker}-{i}", doc(1, i))
+
+    asyncio.run(main())
+
+
+class TestSqliteBackend(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "cache", "s2cache.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    async def test_get_set(self):
+        backend = SqliteBackend(self.path)
+        self.assertFalse(await backend.exists("/paper/a"))
+        await backend.set("/paper/a", doc(1, {"title": "A"}))
+        self.assertTrue(await backend.exists("/paper/a"))
+        self.assertEqual(await backend.get("/paper/a"), doc(1, {"title": "A"}))
+        await backend.set_many({"/paper/b": doc(1, "b"), "/paper/c": doc(1, "c")})
+        self.assertEqual(
+            await backend.get_many(["/paper/c", "/paper/x", "/paper/a"]),
+            [doc(1, "c"), None, doc(1, {"title": "A"})],
+        )
+
+    async def test_sweep(self):
+        backend = SqliteBackend(self.path)
+        # Expired entries are swept on the first write.
+        await backend.set_many({"/paper/a": doc(-1), "/paper/b": doc(0)})
+        self.assertEqual(
+            await backend.get_many(["/paper/a", "/paper/b"]), [None, doc(0)]
+        )
+        await backend.set("/paper/c", doc(-1))
+        self.assertEqual(await backend.sweep(), 1)
+        self.assertFalse(await backend.exists("/paper/c"))
+
+    async def test_processes(self):
+        context = multiprocessing.get_context("spawn")
+        workers = [
+            context.Process(target=write_entries, args=(self.path, worker))
+            for worker in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+        keys = [f"/paper/{w}-{i}" for w in range(3) for i in range(50)]
+        entries = await SqliteBackend(self.path).get_many(keys)
+        self.assertEqual([entry["data"] for entry in entries], list(range(50)) * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+from aiohttp import ClientConnectionError
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.semantic_scholar import SemanticScholar, MemoryBackend
+
+
+def cache_entry(age: int, data: dict) -> dict:
+    return {
+        "expiration": (date.today() - timedelta(days=age)).isoformat(),
+        "data": data,
+    }
+
+
+class TestStaleCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.state = (
+            SemanticScholar._cache,
+            SemanticScholar.errors,
+            SemanticScholar.stale_cache_hits,
+            config.S2_CACHE_RESPONSES,
+            config.S2_SINGLE_FLIGHT,
+            config.S2_STALE_GRACE_PERIOD,
+            config.S2_EXPIRATION_JITTER,
+        )
+        SemanticScholar._cache = MemoryBackend()
+        SemanticScholar.errors = 0
+        SemanticScholar.stale_cache_hits = 0
+        config.S2_CACHE_RESPONSES = True
+        config.S2_SINGLE_FLIGHT = False
+        config.S2_STALE_GRACE_PERIOD = 7
+        config.S2_EXPIRATION_JITTER = 0
+        self.fetches = []
+
+    def tearDown(self):
+        (
+            SemanticScholar._cache,
+            SemanticScholar.errors,
+            SemanticScholar.stale_cache_hits,
+            config.S2_CACHE_RESPONSES,
+            config.S2_SINGLE_FLIGHT,
+            config.S2_STALE_GRACE_PERIOD,
+            config.S2_EXPIRATION_JITTER,
+        ) = self.state
+
+    async def author(self, s2_id: str, error: Exception = None) -> dict:
+        async def fetch(s2, endpoint):
+            self.fetches.append(endpoint)
+            if error is not None:
+                raise error
+            return {"authorId": endpoint.rsplit("/", 1)[1], "name": "fresh"}
+
+        with mock.patch.object(SemanticScholar, "_fetch", fetch):
+            async with SemanticScholar() as s2:
+                author = await s2.author(s2_id)
+            await SemanticScholar.wait_for_refreshes()
+        return author
+
+    async def test_stale(self):
+        backend = SemanticScholar.cache_backend()
+        await backend.set(
+            "/author/1", cache_entry(3, {"authorId": "1", "name": "stale"})
+        )
+        # The stale entry is served, and it is refreshed in the background.
+        self.assertEqual((await self.author("1"))["name"], "stale")
+        self.assertEqual(SemanticScholar.stale_cache_hits, 1)
+        self.assertEqual(self.fetches, ["/author/1"])
+        refreshed = await backend.get("/author/1")
+        self.assertEqual(refreshed["data"]["name"], "fresh")
+        self.assertFalse(SemanticScholar._expired(refreshed))
+        self.assertEqual((await self.author("1"))["name"], "fresh")
+        self.assertEqual(self.fetches, ["/author/1"])
+
+    async def test_past_grace_period(self):
+        await SemanticScholar.cache_backend().set(
+            "/author/1", cache_entry(8, {"authorId": "1", "name": "stale"})
+        )
+        self.assertEqual((await self.author("1"))["name"], "fresh")
+        self.assertEqual(SemanticScholar.stale_cache_hits, 0)
+        self.assertEqual(self.fetches, ["/author/1"])
+
+    async def test_failed_refresh(self):
+        backend = SemanticScholar.cache_backend()
+        stale = cache_entry(3, {"authorId": "1", "name": "stale"})
+        await backend.set("/author/1", stale)
+        for error in (ClientConnectionError(), asyncio.TimeoutError()):
+            with self.subTest(error=error):
+                errors = SemanticScholar.errors
+                self.assertEqual((await self.author("1", error=error))["name"], "stale")
+                # The error is counted, and the stale entry is kept.
+                self.assertEqual(SemanticScholar.errors, errors + 1)
+                self.assertEqual(await backend.get("/author/1"), stale)
+                self.assertEqual(SemanticScholar._refreshes, {})
+        self.assertEqual(len(self.fetches), 2)
+
+    def test_expiration_jitter(self):
+        today = date.today()
+        config.S2_EXPIRATION_JITTER = 0
+        self.assertEqual(
+            SemanticScholar._cache_doc({}, 20)["expiration"],
+            (today + timedelta(days=20)).isoformat(),
+        )
+        config.S2_EXPIRATION_JITTER = 0.25
+        expirations = {
+            date.fromisoformat(SemanticScholar._cache_doc({}, 20)["expiration"])
+            for _ in range(500)
+        }
+        self.assertEqual(min(expirations), today + timedelta(days=20))
+        self.assertEqual(max(expirations), today + timedelta(days=25))
+
+
+if __name__ == "__main__":
+    unittest.main()
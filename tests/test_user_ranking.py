@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.metrics import metrics
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender
+
+
+class SleepyRecommender(ArxivdigestRecommender):
+    def __init__(self, delays):
+        super().__init__("", "SleepyRecommender")
+        self.delays = delays
+        self.scored = []
+
+    async def score_paper(self, user, user_s2_id, paper_id):
+        await asyncio.sleep(self.delays.get(paper_id, 0))
+        self.scored.append(paper_id)
+        return {"article_id": paper_id, "score": 1, "explanation": ""}
+
+
+class TestUserRanking(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.user_time_budget = config.USER_TIME_BUDGET
+        self.incremental_enabled = config.INCREMENTAL_ENABLED
+        config.INCREMENTAL_ENABLED = False
+        metrics.reset()
+
+    def tearDown(self):
+        config.USER_TIME_BUDGET = self.user_time_budget
+        config.INCREMENTAL_ENABLED = self.incremental_enabled
+        metrics.reset()
+
+    async def test_unlimited(self):
+        config.USER_TIME_BUDGET = None
+        recommender = SleepyRecommender({"3": 0.1})
+        ranking = await recommender.user_ranking({}, "1", ["1", "2", "3"])
+        self.assertEqual(sorted(r["article_id"] for r in ranking), ["1", "2", "3"])
+        self.assertNotIn("partial_rankings", metrics.counters)
+
+    async def test_partial_ranking(self):
+        config.USER_TIME_BUDGET = 0.2
+        paper_ids = [str(i) for i in range(12)]
+        # The first chunk finishes within the budget, the second one runs out of it while paper 7 is being scored,
+        # and the third chunk is never started.
+        recommender = SleepyRecommender({"5": 0.1, "7": 0.5})
+        ranking = await recommender.user_ranking({}, "1", paper_ids)
+        self.assertEqual(
+            sorted(r["article_id"] for r in ranking),
+            ["0", "1", "2", "3", "4", "5", "6", "8", "9"],
+        )
+        labels = (("recommender", "SleepyRecommender"),)
+        self.assertEqual(metrics.counters["partial_rankings"][labels], 1)
+        self.assertEqual(metrics.counters["unscored_papers"][labels], 3)
+        # The unfinished scoring keeps running in the background.
+        self.assertNotIn("7", recommender.scored)
+        await recommender.wait_for_background_scoring()
+        self.assertIn("7", recommender.scored)
+        self.assertNotIn("10", recommender.scored)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import unittest
+import numpy as np
+from arxivdigest_recommenders.weighted_inf import author_scores
+
+
+user = np.array([2, 0, 1])
+authors = [np.array([1, 1]), np.array([0, 0, 0, 3]), np.array([1, 0, 1])]
+influence = [
+    (np.array([0, 1]), np.array([20, 30])),
+    (np.array([3]), np.array([40])),
+    (np.array([], dtype=int), np.array([], dtype=int)),
+]
+
+
+class TestWeightedInfRecommender(unittest.TestCase):
+    def test_author_scores(self):
+        scores, influence_matrix = author_scores(user, authors, influence)
+        self.assertAlmostEqual(scores[0], 20 * 2 / (np.sqrt(2) * np.sqrt(5)))
+        self.assertEqual(scores[1], 0)
+        self.assertEqual(scores[2], 0)
+        self.assertEqual(list(influence_matrix[0]), [20, 30, 0, 0])
+        self.assertEqual(list(influence_matrix[1]), [0, 0, 0, 40])
+
+
+if __name__ == "__main__":
+    unittest.main()
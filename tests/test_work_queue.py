@@ -0,0 +1,150 @@
+import asyncio
+import unittest
+from arxivdigest_recommenders import config
+from arxivdigest_recommenders.planner import RunPlan
+from arxivdigest_recommenders.recommender import ArxivdigestRecommender
+from arxivdigest_recommenders.work_queue import MemoryWorkQueue
+
+
+class Connector:
+    def get_article_ids(self):
+        return []
+
+    def get_number_of_users(self):
+        return 3
+
+    def get_user_ids(self, offset):
+        return [str(offset)]
+
+
+class SlowReportQueue(MemoryWorkQueue):
+    """Work queue where reports take a while to arrive, as with a remote queue."""
+
+    async def report(self, stats):
+        await asyncio.sleep(0.05)
+        await super().report(stats)
+
+
+class SlowRecommender(ArxivdigestRecommender):
+    def __init__(self, seconds):
+        super().__init__("", "SlowRecommender")
+        self.seconds = seconds
+        self.batches = []
+
+    def connector(self):
+        return Connector()
+
+    async def recommend_batch(self, connector, user_ids, paper_ids, *args, **kwargs):
+        self.batches.extend(user_ids)
+        await asyncio.sleep(self.seconds)
+        return {user_id: [] for user_id in user_ids}
+
+    async def score_paper(self, user, user_s2_id, paper_id):
+        return None
+
+
+class TestMemoryWorkQueue(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.queue = MemoryWorkQueue()
+        await self.queue.put(
+            [{"offset": 0, "attempts": 0}, {"offset": 100, "attempts": 0}]
+        )
+
+    async def test_lease(self):
+        first = await self.queue.lease(60)
+        second = await self.queue.lease(60)
+        self.assertEqual(first.item["offset"], 0)
+        self.assertEqual(second.item["offset"], 100)
+        self.assertIsNone(await self.queue.lease(60))
+        self.assertEqual(await self.queue.pending(), 2)
+        self.assertTrue(await self.queue.complete(first))
+        self.assertFalse(await self.queue.complete(first))
+        self.assertEqual(await self.queue.pending(), 1)
+
+    async def test_requeue(self):
+        lease = await self.queue.lease(60)
+        self.assertTrue(await self.queue.requeue(lease))
+        self.assertEqual((await self.queue.lease(60)).item["offset"], 100)
+        lease = await self.queue.lease(60)
+        self.assertEqual(lease.item, {"offset": 0, "attempts": 1})
+
+    async def test_requeue_expired(self):
+        expired = await self.queue.lease(0.01)
+        await self.queue.lease(60)
+        await asyncio.sleep(0.02)
+        self.assertEqual(await self.queue.requeue_expired(), 1)
+        self.assertFalse(await self.queue.complete(expired))
+        self.assertEqual(
+            (await self.queue.lease(60)).item, {"offset": 0, "attempts": 1}
+        )
+        self.assertEqual(await self.queue.pending(), 2)
+
+    async def test_extend(self):
+        lease = await self.queue.lease(0.05)
+        self.assertTrue(await self.queue.extend(lease, 60))
+        await asyncio.sleep(0.1)
+        self.assertEqual(await self.queue.requeue_expired(), 0)
+        self.assertTrue(await self.queue.complete(lease))
+        self.assertFalse(await self.queue.extend(lease, 60))
+        expired = await self.queue.lease(0.01)
+        await asyncio.sleep(0.02)
+        self.assertFalse(await self.queue.extend(expired, 60))
+
+    async def test_reports(self):
+        await self.queue.report({"offset": 0})
+        await self.queue.report({"offset": 100})
+        self.assertEqual(await self.queue.reports(), [{"offset": 0}, {"offset": 100}])
+        self.assertEqual(await self.queue.reports(), [])
+
+
+class TestWork(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.state = (
+            config.WORK_QUEUE_VISIBILITY_TIMEOUT,
+            config.WORK_QUEUE_POLL_INTERVAL,
+            config.METRICS_PATH,
+        )
+        config.WORK_QUEUE_VISIBILITY_TIMEOUT = 0.15
+        config.WORK_QUEUE_POLL_INTERVAL = 0.01
+        config.METRICS_PATH = None
+
+    def tearDown(self):
+        (
+            config.WORK_QUEUE_VISIBILITY_TIMEOUT,
+            config.WORK_QUEUE_POLL_INTERVAL,
+            config.METRICS_PATH,
+        ) = self.state
+
+    async def test_long_batch(self):
+        queue = MemoryWorkQueue()
+        await queue.put([{"offset": 0, "attempts": 0}])
+        await queue.set_context({"paper_ids": [], "plan": RunPlan()._asdict()})
+        workers = [SlowRecommender(0.5), SlowRecommender(0)]
+        await asyncio.gather(
+            *[w.work(queue, submit_recommendations=False) for w in workers]
+        )
+        # The batch takes longer than the visibility timeout, but its lease is extended, so it is not handed to the
+        # other worker.
+        self.assertEqual([w.batches for w in workers], [["0"], []])
+        self.assertEqual(
+            [(r["status"], r["attempts"]) for r in await queue.reports()],
+            [("done", 0)],
+        )
+
+
+    async def test_reports_before_completion(self):
+        queue = SlowReportQueue()
+        coordinator = SlowRecommender(0)
+        worker = SlowRecommender(0)
+        reports, _ = await asyncio.gather(
+            coordinator.coordinate(queue),
+            worker.work(queue, submit_recommendations=False),
+        )
+        # The coordinator only stops once the reports of all batches have arrived.
+        self.assertEqual(
+            sorted((r["offset"], r["status"]) for r in reports),
+            [(0, "done"), (1, "done"), (2, "done")],
+        )
+
+if __name__ == "__main__":
+    unittest.main()